@@ -14,10 +14,16 @@
 # OR (2) TO PROVIDE TECHNICAL SUPPORT TO USERS.
 
 import os
+import time
 import datetime
+import multiprocessing
 import numpy as np
 from pytz import timezone
-from .util.ek60_raw_file import RawSimradFile, SimradEOF
+from .util.ek60_raw_file import RawSimradFile, RawSimradMmapFile, SimradEOF, \
+        RawFilePrefetcher
+from .util.byte_source import as_byte_source, source_name
+from .util.read_stats import ReadStats
+from .util.date_conversion import nt_to_datetime64, datetime64_to_nt
 from .util.nmea_data import nmea_data
 from ..ping_data import PingData
 from ..processing.processed_data import ProcessedData
@@ -54,12 +60,25 @@ class EK60(object):
             numbers.
         nmea_data: reference to a NmeaData class instance that will contain
             the NMEA data from the data files.
+        read_stats: A ReadStats object containing the datagram counts and
+            the time spent in each stage of the last read_raw, iter_pings
+            or follow call.
         read_incremental; Boolean value controlling whether files are read
-            incrementally or all at once. The default value is False.
+            incrementally or all at once. The default value is False. Files
+            are read incrementally using the iter_pings method.
         read_angles: Boolean control variable to set whether or not to store
             angle data.
         read_power: Boolean control variable to set whether or not to store
             the power data.
+        read_compact_power: Boolean control variable to set whether or not
+            power data are stored as the indexed int16 values read from the
+            files instead of being converted to power in dB when read.
+        read_packed_angles: Boolean control variable to set whether or not
+            angle data are stored as the packed uint16 values read from the
+            files instead of being split into electrical angles when read.
+        read_ragged: Boolean control variable to set whether or not the
+            sample data are stored in ragged arrays, which only store the
+            samples of each ping, instead of rectangular arrays.
         read_max_sample_count: Integer value to specify the max sample count
             to read. This property can be used to limit the number of samples
             read (and memory used) when your data of interest is less than
@@ -82,8 +101,48 @@ class EK60(object):
         read_channel_ids = List of strings specifying the channel_ids
             (i,e, 'GPT  38 kHz 009072033fa2 1-1 ES38B') of the channels to
             read. An empty list will result in all channels being read.
+        read_use_index: Boolean control variable to set whether or not to
+            use (and create if needed) a sidecar datagram index for each raw
+            file so datagrams outside the time/ping bounds and channels we're
+            not reading are never read from disk.
+        read_memory_map: Boolean control variable to set whether or not raw
+            files are memory-mapped when reading.
+        read_prescan: Boolean control variable to set whether or not the
+            datagram headers of the files are scanned before reading to
+            determine the final size of the data arrays.
+        read_workers: Integer number of worker processes used to read the
+            .raw files in parallel. Files are read serially if this is None.
+        read_transmit_modes: List of integers specifying the transmit modes
+            of the pings to read. An empty list will result in all pings
+            being read.
+        read_pulse_lengths: List of floats specifying the pulse lengths of
+            the pings to read. An empty list will result in all pings being
+            read.
+        read_prefetch: Integer number of bytes to read ahead of the file
+            being read in a background thread, or True to read ahead
+            PREFETCH_SIZE bytes. Files are not read ahead if this is None.
+        read_stats_callback: A callable that is passed the file name and a
+            ReadStats object containing the statistics of the file after
+            each file is read. No callback is made if this is None.
     """
 
+    # Define the number of datagrams read from the file at a time.  Runs of
+    # RAW datagrams within a batch have their headers decoded in bulk.
+    DATAGRAM_BATCH_SIZE = 500
+
+    # Pulse lengths are stored as 32 bit floats.  Define the relative
+    # tolerance used when matching them to the pulse_lengths read option.
+    PULSE_LENGTH_RTOL = 1e-4
+
+    # Datagrams aren't always written in time order.  Define how far past
+    # the end time a datagram must be before we stop reading a file and how
+    # far before the start time we start reading when skipping ahead.
+    TIME_BOUND_TOLERANCE = np.timedelta64(60, 's')
+
+    # Define the default number of bytes read ahead of the file being read
+    # when the prefetch read option is set to True.
+    PREFETCH_SIZE = 64 * 1024 * 1024
+
 
     def __init__(self):
         """Initializes EK60 class object.
@@ -128,10 +187,14 @@ class EK60(object):
         #  A dictionary to store the NMEA object.
         self.nmea_data = nmea_data()
 
+        # read_stats contains the statistics of the last read.
+        self.read_stats = ReadStats()
+
         # Define the class's "private" properties.  Generally, these should not
         # be directly manipulated by the user.
 
-        # Specify if we should read files incrementally or all at once.
+        # Specify if we should read files incrementally or all at once.  Files
+        # are read incrementally using iter_pings.
         self.read_incremental = False
 
         # Define an internal state variable that is set when we initiate
@@ -144,6 +207,19 @@ class EK60(object):
         # Set read_angles to true to store power data.
         self.read_power = True
 
+        # Set read_compact_power to True to store the indexed power values.
+        # They are converted to power when the power data are requested.
+        self.read_compact_power = False
+
+        # Set read_packed_angles to True to store the packed angle values.
+        # They are converted to electrical angles when the angle data are
+        # requested.
+        self.read_packed_angles = False
+
+        # Set read_ragged to True to store the sample data without padding
+        # the pings to the same number of samples.
+        self.read_ragged = False
+
         # Specify the maximum sample count to read.  This property can be used
         # to limit the number of samples read (and memory used) when your data
         # of interest is large.
@@ -177,6 +253,40 @@ class EK60(object):
         # channels being read.
         self.read_channel_ids = []
 
+        # Set read_use_index to True to use a sidecar datagram index to seek
+        # directly to the datagrams we need instead of reading every datagram.
+        self.read_use_index = False
+
+        # Set read_memory_map to True to memory-map the raw files instead of
+        # reading them through a buffered reader.
+        self.read_memory_map = False
+
+        # Set read_prescan to True to scan the files before reading so the
+        # data arrays can be allocated once at their final size.
+        self.read_prescan = False
+
+        # Set read_workers to an integer greater than 1 to read files in
+        # parallel using a pool of worker processes.
+        self.read_workers = None
+
+        # read_transmit_modes and read_pulse_lengths can be set to lists of
+        # transmit modes and pulse lengths to only read pings with those
+        # settings.  Empty lists will result in all pings being read.
+        self.read_transmit_modes = []
+        self.read_pulse_lengths = []
+
+        # Set read_prefetch to read ahead of the file being read in a
+        # background thread.
+        self.read_prefetch = None
+
+        # Set read_stats_callback to a callable to have it passed the
+        # statistics of each file after it is read.
+        self.read_stats_callback = None
+
+        # _chunk_width is the number of pings the RawData objects we create
+        # grow their arrays by.
+        self._chunk_width = 500
+
         # This is the internal per file channel map, which maps the channels
         # in the file to the channels being read.  This map is only valid for
         # the file currently being read.  This property should not be altered
@@ -189,6 +299,16 @@ class EK60(object):
         # we're storing.
         self._file_channel_map = []
 
+        # Bottom detections read from the current .bot or .out file. These
+        # are stored in bulk when we're done reading the file.
+        self._bottom_datagrams = []
+
+        # The statistics of the file currently being read and the time we
+        # started reading it.  These are added to read_stats when we're done
+        # reading the file.
+        self._file_stats = ReadStats()
+        self._file_start_time = None
+
 
     def read_bot(self, bot_files):
         """Passes a list of .bot filenames to read_raw.
@@ -220,7 +340,11 @@ class EK60(object):
                  max_sample_count=None, start_time=None, end_time=None,
                  start_ping=None, end_ping=None, frequencies=None,
                  channel_ids=None, time_format_string='%Y-%m-%d %H:%M:%S',
-                 incremental=None, start_sample=None, end_sample=None):
+                 incremental=None, start_sample=None, end_sample=None,
+                 use_index=None, memory_map=None, prescan=None,
+                 workers=None, transmit_modes=None, pulse_lengths=None,
+                 prefetch=None, stats_callback=None, compact_power=None,
+                 packed_angles=None, ragged=None):
         """Reads one or more Simrad EK60 ES60/70 .raw files.
 
         This method also reads .out and .bot files, but you must read the
@@ -230,7 +354,10 @@ class EK60(object):
 
         Args:
             raw_files (list): List containing full paths to data files to be
-                read.
+                read. Files compressed with gzip, bz2 or xz are decompressed
+                as they are read. Files can also be read from byte sources
+                (e.g. an HTTPRangeSource for files in an object store) or
+                bytes-like objects.
             power (bool): Controls whether power data is stored
             angles (bool): Controls whether angle data is stored
             max_sample_count (int): Specify the max sample count to read
@@ -251,19 +378,1652 @@ class EK60(object):
             channel_ids (list): A list of strings that contain the unique
                 channel IDs to read. If no list is supplied, all channels are
                 read.
-            time_format_string (str): String containing the format of the
-                start and end time arguments. Format is used to create datetime
-                objects start and end time strings
-            incremental (bool): A value of True indicates object will read
-                files incrementally. Otherwise, files are read in their
-                entirety.
-            start_sample (int): Specify starting sample number if not
-                reading from first sample.
-            end_sample (int): Specify ending sample number if not
-                reading to last sample.
+            time_format_string (str): String containing the format of the
+                start and end time arguments. Format is used to create datetime
+                objects start and end time strings
+            incremental (bool): This option is not used by read_raw. Use
+                iter_pings to read files incrementally.
+            start_sample (int): Specify starting sample number if not
+                reading from first sample.
+            end_sample (int): Specify ending sample number if not
+                reading to last sample. Only the samples between start_sample
+                and end_sample (and below max_sample_count) are read from the
+                files and the sample data that aren't stored are skipped.
+            use_index (bool): Set to True to use a sidecar datagram index to
+                read only the datagrams within the time and ping bounds for
+                the channels being read. The index is built and saved next
+                to the .raw file the first time a file is read and reused as
+                long as the file's size and modification time don't change.
+            memory_map (bool): Set to True to memory-map the raw files. Sample
+                data are parsed directly from the mapping which avoids
+                copying the data before they are stored.
+            prescan (bool): Set to True to scan the datagram headers of all
+                of the files before reading. The number of pings and the
+                maximum sample count of each channel are determined by the
+                scan so the data arrays are allocated once at their final
+                size instead of being grown as pings are read.
+            workers (int): Set to an integer greater than 1 to read the .raw
+                files in parallel using a pool of this many worker processes.
+                Each file is read in its own process and the results are
+                merged in file order so the data, channel numbering and
+                channel metadata match a serial read. .bot and .out files
+                are read serially after the .raw files.
+            transmit_modes (list): List of integer transmit modes (0 =
+                active, 1 = passive, 2 = test) if you only want to read pings
+                with specific transmit modes.
+            pulse_lengths (list): List of floats (i.e. 0.001024) if you only
+                want to read pings with specific pulse lengths.
+            prefetch (int): Set to a number of bytes to read ahead of the file
+                being read in a background thread, or True to read ahead
+                PREFETCH_SIZE bytes. The data are read into the operating
+                system's file cache while the current datagrams are parsed.
+                This speeds up reading from network drives and other high
+                latency storage.
+            stats_callback (callable): A function that is called with the
+                file name and a ReadStats object containing the statistics
+                of the file after each file is read. The statistics of the
+                entire read are stored in the read_stats property.
+            compact_power (bool): Set to True to store the power data as the
+                int16 indexed values read from the files. This halves the
+                memory used for power. The values are converted to power in
+                dB by get_power and the other methods that use the power
+                data.
+            packed_angles (bool): Set to True to store the angle data as the
+                packed uint16 values read from the files instead of two
+                arrays of electrical angles. This uses a quarter of the
+                memory. The values are split and converted to electrical
+                angles by get_electrical_angles and get_physical_angles.
+            ragged (bool): Set to True to store the sample data of each ping
+                without padding it to the number of samples of the longest
+                ping. This saves memory when the recording range changes
+                while recording. The pings are padded when the data are
+                requested. Ragged storage can't be used with rolling arrays.
+
+        The channel, frequency, time, transmit mode and pulse length options
+        are checked using the header of each RAW datagram as it is read. The
+        sample data of datagrams that we aren't storing are skipped without
+        being read.
+
+        When reading a time range, files that lie entirely outside the range
+        are skipped and reading of a file stops once its datagrams are past
+        the end time. If no ping bounds are set, reading skips ahead to the
+        start time without reading the datagrams before it so the start_ping
+        and end_ping properties do not count the skipped pings. Once past the
+        end ping, the sample data of the remaining RAW datagrams are skipped.
+        """
+
+        # Update the reading state variables.
+        self._set_read_options(power=power, angles=angles,
+                max_sample_count=max_sample_count, start_time=start_time,
+                end_time=end_time, start_ping=start_ping, end_ping=end_ping,
+                frequencies=frequencies, channel_ids=channel_ids,
+                time_format_string=time_format_string,
+                incremental=incremental, start_sample=start_sample,
+                end_sample=end_sample, use_index=use_index,
+                memory_map=memory_map, prescan=prescan, workers=workers,
+                transmit_modes=transmit_modes, pulse_lengths=pulse_lengths,
+                prefetch=prefetch, stats_callback=stats_callback,
+                compact_power=compact_power, packed_angles=packed_angles,
+                ragged=ragged)
+
+        # Ensure that the raw_files argument is a list.
+        if isinstance(raw_files, str) or as_byte_source(raw_files) is not None:
+            raw_files = [raw_files]
+
+        # Start collecting the statistics of this read.
+        self.read_stats = ReadStats()
+        start_time = time.perf_counter()
+
+        # Initialize a file counter.
+        n_files = 0
+
+        # Determine how we're accessing the files.
+        if self.read_memory_map:
+            raw_file_class = RawSimradMmapFile
+        else:
+            raw_file_class = RawSimradFile
+
+        # If we're reading in parallel, read the .raw files using our worker
+        # pool. The bottom files are then read serially below.
+        if self.read_workers and self.read_workers > 1:
+            n_files, raw_files = self._read_raw_parallel(raw_files,
+                                                         raw_file_class)
+
+        # If we're prescanning, determine the final array sizes.
+        if self.read_prescan:
+            array_sizes, _ = self._prescan(raw_files, raw_file_class)
+        else:
+            array_sizes = {}
+
+        # If we're prefetching, start reading ahead of the files.
+        prefetcher = self._start_prefetch(raw_files)
+
+        # Iterate through the list of .raw files to read.
+        try:
+            for file_number, filename in enumerate(raw_files):
+
+                # Read the configuration datagrams and then the rest of the
+                # datagrams in the file.
+                with raw_file_class(filename, 'r') as fid:
+
+                    if prefetcher is not None:
+                        prefetcher.set_reader(file_number, fid)
+
+                    # Skip files that are outside of our time and ping bounds.
+                    if not self._file_in_bounds(fid):
+                        self.read_stats.n_files_skipped += 1
+                        continue
+
+                    self._start_file_stats(fid)
+                    self._read_configuration(fid, filename, n_files == 0,
+                                             array_sizes)
+
+                    # Read the rest of the datagrams.
+                    self._read_datagrams(fid, self.read_incremental)
+                    self._finish_file_stats(filename)
+
+                    n_files += 1
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+
+        # Trim excess data from arrays after reading.  Channels that haven't
+        # stored any pings don't have data arrays yet.
+        for channel_id in self.channel_ids:
+            if self.raw_data[channel_id].n_pings >= 0:
+                self.raw_data[channel_id].trim()
+        self.nmea_data.trim()
+
+        self.read_stats.wall_time = time.perf_counter() - start_time
+
+
+    def iter_pings(self, raw_files, block_size=1000, **kwargs):
+        """Reads one or more Simrad EK60 ES60/70 .raw files incrementally.
+
+        iter_pings is a generator that reads the files in blocks of
+        block_size pings and yields a dictionary, keyed by channel ID, of
+        RawData objects containing the data of each block. The reader state
+        is kept across file boundaries so a block can contain data from more
+        than one file. Only the current block is held in memory. Pings are
+        counted the same way read_raw counts them, so a block contains the
+        pings of up to block_size ping numbers for each channel.
+
+        NMEA data are accumulated in the nmea_data property for the entire
+        read so they can be used with any block. .bot and .out files should
+        be read using read_raw since bottom detections are matched to the
+        pings in memory.
+
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                read.
+            block_size (int): The number of pings in each block.
+            **kwargs: Any of the read options accepted by read_raw.
+
+        Yields:
+            A dictionary, keyed by channel ID, of RawData objects. Channels
+            that have no pings in a block are not included.
+        """
+
+        # Update the reading state variables.  The prescan and workers
+        # options don't apply when reading incrementally.
+        kwargs.pop('prescan', None)
+        kwargs.pop('workers', None)
+        self._set_read_options(**kwargs)
+
+        # Ensure that the raw_files argument is a list.
+        if isinstance(raw_files, str) or as_byte_source(raw_files) is not None:
+            raw_files = [raw_files]
+
+        # Determine how we're accessing the files.
+        if self.read_memory_map:
+            raw_file_class = RawSimradMmapFile
+        else:
+            raw_file_class = RawSimradFile
+
+        # Our RawData objects never need to hold more than one block.
+        chunk_width = self._chunk_width
+        self._chunk_width = block_size
+
+        self.read_stats = ReadStats()
+        n_files = 0
+        prefetcher = self._start_prefetch(raw_files)
+        try:
+            block_start = self.n_pings
+            for file_number, filename in enumerate(raw_files):
+                with raw_file_class(filename, 'r') as fid:
+
+                    if prefetcher is not None:
+                        prefetcher.set_reader(file_number, fid)
+
+                    # Skip files that are outside of our time and ping bounds.
+                    if not self._file_in_bounds(fid):
+                        self.read_stats.n_files_skipped += 1
+                        continue
+
+                    self._start_file_stats(fid)
+                    self._read_configuration(fid, filename, n_files == 0)
+
+                    for new_datagram in self._bounded_datagrams(fid):
+
+                        # Check if this datagram belongs in the next block.
+                        if new_datagram['type'].startswith('RAW'):
+                            ping_number = self.n_pings + \
+                                    int(self._starts_ping(new_datagram))
+                            if ping_number - block_start > block_size:
+                                block = self._get_block()
+                                block_start = ping_number - 1
+                                if block:
+                                    yield block
+
+                        self._process_datagram(new_datagram)
+
+                    self._finish_file_stats(filename)
+                    n_files += 1
+
+            # Return the last, possibly partial, block.
+            self.nmea_data.trim()
+            block = self._get_block()
+            if block:
+                yield block
+
+        finally:
+            self._chunk_width = chunk_width
+            if prefetcher is not None:
+                prefetcher.close()
+
+
+    def _start_prefetch(self, raw_files):
+        """Starts reading ahead of the files if the prefetch read option is
+        set.
+
+        Args:
+            raw_files (list): The files that will be read.
+
+        Returns:
+            A RawFilePrefetcher object, or None if we're not prefetching.
+        """
+
+        if not self.read_prefetch:
+            return None
+
+        if self.read_prefetch is True:
+            prefetch_size = self.PREFETCH_SIZE
+        else:
+            prefetch_size = int(self.read_prefetch)
+
+        return RawFilePrefetcher(raw_files, max_bytes=prefetch_size)
+
+
+    def scan(self, raw_files, use_index=None, memory_map=None):
+        """Scans one or more Simrad EK60 ES60/70 .raw files for metadata.
+
+        scan returns information about the contents of the files without
+        reading the sample data or allocating any data arrays. Only the
+        configuration datagram and the headers of the RAW and NMEA datagrams
+        are read. The read options and data of this object are not changed.
+
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                scanned.
+            use_index (bool): Set to True to save the datagram index built
+                while scanning a file next to the file (or to use an existing
+                index). By default the read_use_index property is used.
+            memory_map (bool): Set to True to memory-map the files. By default
+                the read_memory_map property is used.
+
+        Returns:
+            A dictionary keyed by file name. Each value is a dictionary
+            containing the survey_name, transect_name, sounder_name and
+            version from the configuration datagram, the start_time and
+            end_time of the file, a sorted list of the NMEA message types
+            (talker + message ID, i.e. 'GPGGA') in nmea_types and a channels
+            dictionary keyed by channel ID. Each channel dictionary contains
+            the channel_number, the CON0 transceiver configuration in
+            transceiver, the first_ping_time and last_ping_time, n_pings and
+            arrays of the distinct pulse_lengths, sample_intervals,
+            sample_counts and transmit_modes.
+        """
+
+        if use_index is None:
+            use_index = self.read_use_index
+        if memory_map is None:
+            memory_map = self.read_memory_map
+
+        # Ensure that the raw_files argument is a list.
+        if isinstance(raw_files, str) or as_byte_source(raw_files) is not None:
+            raw_files = [raw_files]
+
+        # Determine how we're accessing the files.
+        if memory_map:
+            raw_file_class = RawSimradMmapFile
+        else:
+            raw_file_class = RawSimradFile
+
+        file_info = {}
+        for filename in raw_files:
+            with raw_file_class(filename, 'r') as fid:
+
+                # Read the CON0 configuration datagram.
+                config_datagram = fid.read(1)
+                info = {'survey_name': config_datagram['survey_name'],
+                        'transect_name': config_datagram['transect_name'],
+                        'sounder_name': config_datagram['sounder_name'],
+                        'version': config_datagram['version'],
+                        'start_time': np.datetime64(
+                                config_datagram['timestamp'], '[ms]'),
+                        'end_time': None,
+                        'nmea_types': [],
+                        'channels': {}}
+
+                # Get the index of the rest of the datagrams.
+                index = fid.get_index(save=use_index)
+                index = index[index['offset'] >= fid._tell_bytes()]
+                if index.shape[0] > 0:
+                    info['end_time'] = self._index_times(index).max()
+
+                # Read the RAW datagram headers.
+                is_raw = np.char.startswith(index['type'], b'RAW')
+                headers = fid.read_headers(index[is_raw])
+                ping_time = self._index_times(headers)
+
+                for channel, transceiver in \
+                        config_datagram['transceivers'].items():
+                    channel_headers = headers['channel'] == channel
+                    channel_info = {'channel_number': channel,
+                                    'transceiver': transceiver,
+                                    'n_pings': int(np.count_nonzero(
+                                            channel_headers)),
+                                    'first_ping_time': None,
+                                    'last_ping_time': None}
+                    if channel_info['n_pings'] > 0:
+                        channel_info['first_ping_time'] = \
+                                ping_time[channel_headers].min()
+                        channel_info['last_ping_time'] = \
+                                ping_time[channel_headers].max()
+                    for key, field in [('pulse_lengths', 'pulse_length'),
+                                       ('sample_intervals', 'sample_interval'),
+                                       ('sample_counts', 'count'),
+                                       ('transmit_modes', 'transmit_mode')]:
+                        channel_info[key] = \
+                                np.unique(headers[field][channel_headers])
+
+                    info['channels'][transceiver['channel_id']] = channel_info
+
+                # Get the NMEA message types from the start of the NMEA
+                # strings.  The strings follow the 12 byte datagram header.
+                is_nmea = np.char.startswith(index['type'], b'NME')
+                nmea_types = set()
+                for prefix in fid.read_prefixes(index[is_nmea], 19):
+                    nmea_header = prefix[12:19]
+                    if nmea_header[:1] == b'$' and nmea_header[6:7] == b',' \
+                            and nmea_header[1:6].isalpha():
+                        nmea_types.add(nmea_header[1:6].decode().upper())
+                info['nmea_types'] = sorted(nmea_types)
+
+                file_info[filename] = info
+
+        return file_info
+
+
+    def _starts_ping(self, new_datagram):
+        """Checks if a RAW datagram will increment the ping counter.
+
+        Pings are counted using the channel 1 RAW datagrams that are within
+        our time bounds.
+
+        Args:
+            new_datagram (dict): The datagram as returned by RawSimradFile.
+        """
+
+        if new_datagram['channel'] != 1:
+            return False
+
+        timestamp = np.datetime64(new_datagram['timestamp'], '[ms]')
+        if self.read_start_time is not None:
+            if timestamp < self.read_start_time:
+                return False
+        if self.read_end_time is not None:
+            if timestamp > self.read_end_time:
+                return False
+
+        return True
+
+
+    def _get_block(self):
+        """Returns the RawData objects of the current block and replaces
+        them with new, empty RawData objects.
+
+        The new RawData objects share the current channel metadata so pings
+        from the rest of the current file are associated with it.
+        """
+
+        block = {}
+        for channel_id in self.channel_ids:
+            raw_data = self.raw_data[channel_id]
+            if raw_data.n_pings > 0:
+                raw_data.trim()
+                block[channel_id] = raw_data
+
+                self.raw_data[channel_id] = self._create_raw_data(channel_id)
+                self.raw_data[channel_id].current_metadata = \
+                        raw_data.current_metadata
+
+        return block
+
+
+    def follow(self, raw_file, poll_interval=1.0, idle_timeout=None, **kwargs):
+        """Reads a .raw file that is still being recorded.
+
+        follow is a generator that reads the complete datagrams in raw_file
+        and then polls the file for new datagrams every poll_interval
+        seconds. New pings are appended to the RawData objects as they are
+        written. A partially written datagram at the end of the file is left
+        and read by a later poll once it has been completely written. When
+        the file stops growing and a new .raw file appears in the same
+        directory (the next file in sorted order), the rest of the current
+        file is read and reading continues with the new file.
+
+        The data arrays aren't trimmed between polls so they keep the room
+        they have for new pings. Only the first n_pings pings of the arrays
+        contain data. Use RawData.snapshot to get a copy of the data with
+        arrays of the exact size.
+
+        Args:
+            raw_file (str): The full path to the file to follow.
+            poll_interval (float): The number of seconds to wait between
+                checks for new data.
+            idle_timeout (float): Stop following after this many seconds
+                without new data. Set to None to follow until the generator
+                is closed.
+            **kwargs: Any of the read options accepted by read_raw. The
+                memory_map, use_index, prescan, workers and prefetch options
+                are not used when following a file.
+
+        Yields:
+            A dictionary, keyed by channel ID, containing the number of pings
+            added to each channel by a poll. Only polls that add pings are
+            yielded.
+        """
+
+        # Update the reading state variables.
+        for option in ['memory_map', 'use_index', 'prescan', 'workers',
+                       'prefetch']:
+            kwargs.pop(option, None)
+        self._set_read_options(**kwargs)
+
+        self.read_stats = ReadStats()
+        filename = raw_file
+        fid = RawSimradFile(filename, 'r')
+        self._start_file_stats(fid)
+        first_file = True
+        configured = False
+        idle_time = 0.0
+
+        try:
+            while True:
+
+                # Read the configuration datagrams once they've been written.
+                if not configured and fid.dgram_complete():
+                    self._read_configuration(fid, filename, first_file)
+                    first_file = False
+                    configured = True
+
+                if configured:
+                    new_pings = self._follow_poll(fid)
+                    if new_pings:
+                        idle_time = 0.0
+                        yield new_pings
+                        continue
+
+                    # Check if recording has moved on to the next file.  If
+                    # so, make sure we have read the end of this file.
+                    next_file = self._next_raw_file(filename)
+                    if next_file is not None:
+                        new_pings = self._follow_poll(fid)
+                        if new_pings:
+                            yield new_pings
+
+                        fid.close()
+                        self._finish_file_stats(filename)
+                        filename = next_file
+                        fid = RawSimradFile(filename, 'r')
+                        self._start_file_stats(fid)
+                        configured = False
+                        idle_time = 0.0
+                        continue
+
+                # Wait for more data.
+                if idle_timeout is not None and idle_time >= idle_timeout:
+                    return
+                time.sleep(poll_interval)
+                idle_time += poll_interval
+
+        finally:
+            fid.close()
+            self._finish_file_stats(filename)
+
+
+    def _follow_poll(self, fid):
+        """Reads and stores the complete datagrams that have been written
+        since the last poll.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+
+        Returns:
+            A dictionary, keyed by channel ID, containing the number of pings
+            added to each channel.
+        """
+
+        old_pings = {}
+        for channel_id in self.channel_ids:
+            old_pings[channel_id] = max(self.raw_data[channel_id].n_pings, 0)
+
+        for new_datagram in fid.read_complete():
+            self._process_datagram(new_datagram)
+
+        new_pings = {}
+        for channel_id in self.channel_ids:
+            raw_data = self.raw_data[channel_id]
+            n_new = max(raw_data.n_pings, 0) - old_pings.get(channel_id, 0)
+            if n_new > 0:
+                new_pings[channel_id] = n_new
+
+        return new_pings
+
+
+    def _next_raw_file(self, filename):
+        """Returns the file that follows filename in its directory.
+
+        Files with the same extension are sorted by name, which for files
+        named by the recording software is the order they were recorded.
+
+        Args:
+            filename (str): The full path to the current file.
+
+        Returns:
+            The path to the next file or None if there isn't one.
+        """
+
+        directory, name = os.path.split(filename)
+        extension = os.path.splitext(name)[1].lower()
+        next_files = sorted([f for f in os.listdir(directory or '.') if
+                os.path.splitext(f)[1].lower() == extension and f > name])
+        if next_files:
+            return os.path.join(directory, next_files[0])
+        else:
+            return None
+
+
+    def write_raw(self, filename, channel_ids=None, start_time=None,
+                  end_time=None, start_ping=None, end_ping=None,
+                  time_format_string='%Y-%m-%d %H:%M:%S'):
+        """Writes a subset of the loaded data to a .raw file.
+
+        This can be used to split files by time or ping and to extract
+        channels.  The file starts with a CON0 configuration datagram created
+        from the channel metadata of the first ping written for each channel.
+        This is followed by the NMEA and RAW datagrams in time order.  Power
+        and angle data are converted back to their indexed values and the
+        sample blocks are written directly from the arrays.
+
+        Only the data that were stored when reading are written. Annotation
+        and bottom data are not written.
+
+        Args:
+            filename (str): The full path of the file to write.  Existing
+                files are overwritten.
+            channel_ids (list): A list of the channel IDs to write.  Set to
+                None to write all channels.
+            start_time (datetime64 or str): Specify a start time if you do
+                not want to start writing from the first ping.
+            end_time (datetime64 or str): Specify an end time if you do not
+                want to write to the last ping.
+            start_ping (int): Specify a start ping number if you do not want
+                to start writing from the first ping.
+            end_ping (int): Specify an end ping number if you do not want to
+                write to the last ping.
+            time_format_string (str): String containing the format of the
+                start and end time arguments.
+
+        Raises:
+            ValueError: There are no pings in the subset.
+        """
+
+        if channel_ids is None:
+            channel_ids = self.channel_ids
+        if start_time is not None:
+            start_time = self._convert_time_bound(start_time,
+                    time_format_string)
+        if end_time is not None:
+            end_time = self._convert_time_bound(end_time, time_format_string)
+
+        # Get the pings we're writing from each channel.
+        channels = []
+        for channel_id in channel_ids:
+            raw_data = self.raw_data[channel_id]
+            if raw_data.n_pings <= 0:
+                continue
+            pings = raw_data.get_indices(start_ping=start_ping,
+                    end_ping=end_ping, start_time=start_time,
+                    end_time=end_time, time_order=False)
+            if pings.size > 0:
+                channels.append((raw_data, pings))
+        if not channels:
+            raise ValueError('There are no pings to write.')
+
+        ping_times = np.concatenate([raw_data.ping_time[pings] for
+                raw_data, pings in channels])
+
+        # Get the NMEA datagrams in the time span we're writing.  If the
+        # subset is only bounded by pings, use the ping times.
+        nmea_times = self.nmea_data.nmea_times[:self.nmea_data.n_raw]
+        nmea_mask = np.full(nmea_times.shape, True)
+        if start_time is not None:
+            nmea_mask &= nmea_times >= start_time
+        elif start_ping is not None:
+            nmea_mask &= nmea_times >= ping_times.min()
+        if end_time is not None:
+            nmea_mask &= nmea_times <= end_time
+        elif end_ping is not None:
+            nmea_mask &= nmea_times <= ping_times.max()
+        nmea_index = np.nonzero(nmea_mask)[0]
+
+        # Sort the datagrams by time.  NMEA datagrams are written before RAW
+        # datagrams with the same time and RAW datagrams are written in
+        # channel order.
+        times = np.concatenate([nmea_times[nmea_index], ping_times])
+        channel = np.concatenate([np.zeros(nmea_index.size, dtype=int)] +
+                [np.full(pings.size, idx + 1) for idx, (_, pings) in
+                 enumerate(channels)])
+        position = np.concatenate([nmea_index] + [np.arange(pings.size) for
+                _, pings in channels])
+        order = np.lexsort((channel, times))
+        low_date, high_date = datetime64_to_nt(times)
+
+        # Get the RAW datagram headers and sample data for each channel.
+        raw_datagrams = [self._raw_datagram_data(raw_data, pings) for
+                raw_data, pings in channels]
+
+        config_datagram = self._config_datagram(channels)
+        config_low, config_high = datetime64_to_nt(times.min())
+        config_datagram['low_date'] = int(config_low)
+        config_datagram['high_date'] = int(config_high)
+
+        with RawSimradFile(filename, 'w') as fid:
+            fid.write(config_datagram)
+
+            for idx, channel_number, pos, low, high in zip(order.tolist(),
+                    channel[order].tolist(), position[order].tolist(),
+                    low_date[order].tolist(), high_date[order].tolist()):
+
+                if channel_number == 0:
+                    fid.write({'type': 'NME0', 'low_date': low,
+                               'high_date': high, 'nmea_string':
+                               self.nmea_data.raw_datagrams[pos]})
+                else:
+                    headers, power, angle = raw_datagrams[channel_number - 1]
+                    datagram = {'type': 'RAW0', 'low_date': low,
+                                'high_date': high, 'channel': channel_number,
+                                'spare0': ''}
+                    for field, values in headers.items():
+                        datagram[field] = values[pos]
+                    count = datagram['count']
+                    if datagram['mode'] & 1:
+                        datagram['power'] = power[pos, :count]
+                    if datagram['mode'] & 2:
+                        datagram['angle'] = angle[pos, :count]
+                    fid.write(datagram)
+
+
+    def _raw_datagram_data(self, raw_data, pings):
+        """Returns the RAW datagram header values and sample data for pings.
+
+        Args:
+            raw_data (RawData): The RawData object containing the pings.
+            pings (array): The indices of the pings.
+
+        Returns:
+            A tuple containing a dictionary of lists of the header values,
+            keyed by header field, and the indexed power and angle arrays.
+        """
+
+        headers = {}
+        for field in ['transducer_depth', 'frequency', 'transmit_power',
+                      'pulse_length', 'bandwidth', 'sample_interval',
+                      'sound_velocity', 'absorption_coefficient', 'heave',
+                      'roll', 'pitch', 'temperature', 'heading',
+                      'transmit_mode']:
+            headers[field] = getattr(raw_data, field)[pings].tolist()
+        headers['offset'] = raw_data.sample_offset[pings].tolist()
+
+        # Convert the power and angle data back to indexed values.  Pings
+        # without power or angle data have NaNs in their first sample.
+        mode = np.zeros(pings.size, dtype=int)
+        n_samples = 0
+        power = None
+        angle = None
+        with np.errstate(invalid='ignore'):
+            if (raw_data.store_power and raw_data._has_sample_data('power')
+                    and raw_data.compact_power):
+                # Compact power data are already indexed.
+                power = raw_data._sample_array('power', pings)
+                n_samples = power.shape[1]
+                if n_samples > 0:
+                    mode[power[:, 0] != raw_data.POWER_FILL] |= 1
+            elif (raw_data.store_power and
+                    raw_data._has_sample_data('power')):
+                power = np.rint(raw_data._sample_array('power', pings) /
+                        raw_data.INDEX2POWER)
+                n_samples = power.shape[1]
+                if n_samples > 0:
+                    mode[~np.isnan(power[:, 0])] |= 1
+                power = np.nan_to_num(power).astype('int16')
+
+            if (raw_data.store_angles and
+                    raw_data._has_sample_data('angles_packed') and
+                    raw_data.packed_angles):
+                # Packed angle data are already indexed.
+                angle = raw_data._sample_array('angles_packed', pings)
+                n_samples = max(n_samples, angle.shape[1])
+
+                # Only split beam channels have angle data.
+                split_beam = np.array([metadata.beam_type == 1 for metadata in
+                        raw_data.channel_metadata[pings]], dtype=bool)
+                if angle.shape[1] > 0:
+                    mode[split_beam & (raw_data.angle_sample_count[pings] >
+                                       0)] |= 2
+
+            elif (raw_data.store_angles and
+                    raw_data._has_sample_data('angles_alongship_e')):
+                alongship = np.rint(raw_data._sample_array(
+                        'angles_alongship_e', pings) / raw_data.INDEX2ELEC)
+                athwartship = np.rint(raw_data._sample_array(
+                        'angles_athwartship_e', pings) / raw_data.INDEX2ELEC)
+                n_samples = max(n_samples, alongship.shape[1])
+
+                # Only split beam channels have angle data.
+                split_beam = np.array([metadata.beam_type == 1 for metadata in
+                        raw_data.channel_metadata[pings]], dtype=bool)
+                if alongship.shape[1] > 0:
+                    mode[split_beam & ~np.isnan(alongship[:, 0])] |= 2
+
+                # The upper 8 bits are the alongship angle and the lower 8
+                # bits are the athwartship angle.
+                angle = ((np.nan_to_num(alongship).astype('int8').view(
+                        'uint8').astype('uint16') << 8) | np.nan_to_num(
+                        athwartship).astype('int8').view('uint8'))
+
+        count = np.minimum(raw_data.sample_count[pings], n_samples)
+        count[mode == 0] = 0
+        headers['mode'] = mode.tolist()
+        headers['count'] = count.tolist()
+
+        return headers, power, angle
+
+
+    def _config_datagram(self, channels):
+        """Creates a CON0 datagram for the channels being written.
+
+        Args:
+            channels (list): A list of (RawData, ping indices) tuples.  The
+                configuration of each channel is taken from the channel
+                metadata of its first ping.
+
+        Returns:
+            The configuration datagram as a dictionary.
+        """
+
+        transceivers = {}
+        for idx, (raw_data, pings) in enumerate(channels):
+            metadata = raw_data.channel_metadata[pings[0]]
+            transceivers[idx + 1] = {'channel_id': raw_data.channel_id[0],
+                'beam_type': metadata.beam_type,
+                'frequency': metadata.frequency_hz,
+                'gain': metadata.gain,
+                'equivalent_beam_angle': metadata.equivalent_beam_angle,
+                'beamwidth_alongship': metadata.beamwidth_alongship,
+                'beamwidth_athwartship': metadata.beamwidth_athwartship,
+                'angle_sensitivity_alongship':
+                    metadata.angle_sensitivity_alongship,
+                'angle_sensitivity_athwartship':
+                    metadata.angle_sensitivity_athwartship,
+                'angle_offset_alongship': metadata.angle_offset_alongship,
+                'angle_offset_athwartship': metadata.angle_offset_athwartship,
+                'pos_x': metadata.pos_x, 'pos_y': metadata.pos_y,
+                'pos_z': metadata.pos_z, 'dir_x': metadata.dir_x,
+                'dir_y': metadata.dir_y, 'dir_z': metadata.dir_z,
+                'pulse_length_table': metadata.pulse_length_table,
+                'spare1': '',
+                'gain_table': metadata.gain_table,
+                'spare2': metadata.spare2,
+                'sa_correction_table': metadata.sa_correction_table,
+                'spare3': metadata.spare3,
+                'gpt_software_version': metadata.gpt_firmware_version,
+                'spare4': metadata.spare4}
+
+        metadata = channels[0][0].channel_metadata[channels[0][1][0]]
+
+        return {'type': 'CON0', 'survey_name': metadata.survey_name,
+                'transect_name': metadata.transect_name,
+                'sounder_name': metadata.sounder_name,
+                'version': metadata.version, 'spare0': '',
+                'transceiver_count': len(transceivers),
+                'transceivers': transceivers}
+
+
+    def _read_datagrams(self, fid, incremental):
+        """Reads datagrams.
+
+        An internal method to read all of the datagrams contained in a file.
+
+        Args:
+            fid (file object): Pointer to currently open file object. This is a
+                RawSimradFile file object and not the standard Python file
+                object.
+            incremental (bool): Not used. Incremental reading is implemented
+                by iter_pings.
+        """
+
+        for new_datagram in self._bounded_datagrams(fid):
+            self._process_datagram(new_datagram)
+
+        # Store the bottom detections from .bot and .out files.
+        self._store_bottom_detections()
+
+
+    def _bounded_datagrams(self, fid):
+        """Generator that returns the datagrams of the current file that
+        could be within our read bounds.
+
+        When only time bounds are set, the file is first positioned just
+        before the start time. The generator stops after the first datagram
+        that is past the end time, so each datagram must be processed before
+        the next one is requested.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+        """
+
+        # If we're only bounded by time, skip ahead to the start time.  We
+        # can't do this when reading a ping range since we count the pings.
+        # Files that can't be read at random would be read from the start
+        # to find the start time so we simply read them.
+        if (self.read_start_time is not None and not self.read_use_index and
+                self.read_start_ping is None and self.read_end_ping is None and
+                fid.random_access):
+            low_date, high_date = datetime64_to_nt(
+                    self.read_start_time - self.TIME_BOUND_TOLERANCE)
+            fid.seek_time((int(high_date) << 32) + int(low_date))
+
+        # Stop once we're past our end bounds.
+        for new_datagram in self._get_datagrams(fid):
+            yield new_datagram
+            if self._past_read_end(new_datagram):
+                break
+
+
+    def _past_read_end(self, new_datagram):
+        """Checks if we have read past the end time.
+
+        Args:
+            new_datagram (dict): The last datagram processed.
+
+        Returns:
+            True if no datagrams after new_datagram will be stored.
+        """
+
+        if self.read_end_time is not None:
+            if new_datagram['timestamp'] > (self.read_end_time +
+                                            self.TIME_BOUND_TOLERANCE):
+                return True
+
+        return False
+
+
+    def _file_in_bounds(self, fid):
+        """Checks if a file could contain data within our read bounds.
+
+        Files that start after the end time and files that end before the
+        start time are out of bounds. The start
+        time of the file is the time of its CON0 datagram and the end time is
+        taken from the last few datagrams in the file.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+                The file pointer must be at the start of the file.
+
+        Returns:
+            False if the file can be skipped.
+        """
+
+        if self.read_end_time is not None:
+            header = fid.peek()
+            file_start = nt_to_datetime64(header['low_date'],
+                                          header['high_date'])
+            if file_start > self.read_end_time + self.TIME_BOUND_TOLERANCE:
+                return False
+
+        # We can't skip files before the start time if we're counting pings.
+        # Finding the end time of a file that can't be read at random means
+        # reading the whole file so we don't check these.
+        if (self.read_start_time is not None and
+                self.read_start_ping is None and self.read_end_ping is None and
+                fid.random_access):
+            tail_headers = fid.peek_tail()
+            if tail_headers:
+                file_end = max([nt_to_datetime64(header['low_date'],
+                        header['high_date']) for header in tail_headers])
+                if file_end < self.read_start_time - self.TIME_BOUND_TOLERANCE:
+                    return False
+
+        return True
+
+
+    def _get_datagrams(self, fid):
+        """Returns our source of datagrams for the current file.
+
+        If we're using an index we only read the datagrams we need, otherwise
+        we read them all.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+        """
+
+        if self.read_use_index:
+            return self._indexed_datagrams(fid)
+        else:
+            return self._all_datagrams(fid)
+
+
+    def _process_datagram(self, new_datagram):
+        """Stores the data from a datagram.
+
+        Args:
+            new_datagram (dict): The datagram as returned by RawSimradFile.
+        """
+
+        # Convert the timestamp to a datetime64 object.
+        start_time = time.perf_counter()
+        new_datagram['timestamp'] = \
+                np.datetime64(new_datagram['timestamp'], '[ms]')
+        self._file_stats.timestamp_time += time.perf_counter() - start_time
+
+        # Check if data should be stored based on time bounds.
+        if self.read_start_time is not None:
+            if new_datagram['timestamp'] < self.read_start_time:
+                self._file_stats.skipped += 1
+                return
+        if self.read_end_time is not None:
+            if new_datagram['timestamp'] > self.read_end_time:
+                self._file_stats.skipped += 1
+                return
+
+        # Update the end_time property.
+        if self.end_time is not None:
+            # We can't assume data will be read in time order.
+            if self.end_time < new_datagram['timestamp']:
+                self.end_time = new_datagram['timestamp']
+        else:
+            self.end_time = new_datagram['timestamp']
+
+        # Process the datagrams by type.
+
+        # RAW datagrams store raw acoustic data for a channel.
+        if new_datagram['type'].startswith('RAW'):
+
+            if new_datagram['channel'] == 1:
+                self.n_pings += 1
+
+            # Check if we should store this data based on ping bounds.
+            if self.read_start_ping is not None:
+                if self.n_pings < self.read_start_ping:
+                    self._file_stats.skipped += 1
+                    return
+            if self.read_end_ping is not None:
+                if self.n_pings > self.read_end_ping:
+                    self._file_stats.skipped += 1
+                    return
+
+            # Check if we're supposed to store this channel.  We don't store
+            # datagrams whose sample data were skipped by our RAW filter.
+            if (new_datagram['channel'] in self._channel_map and
+                    not new_datagram.get('filtered', False)):
+
+                # Set the first ping number we read.
+                if not self.start_ping:
+                    self.start_ping = self.n_pings
+                # Update the last ping number.
+                self.end_ping = self.n_pings
+
+                # Get the channel id.
+                channel_id = self._channel_map[new_datagram['channel']]
+
+                # Call the appropriate channel's append_ping method.
+                # The sample window was applied when the datagram was read.
+                start_time = time.perf_counter()
+                self.raw_data[channel_id].append_ping(new_datagram)
+                self._file_stats.append_time += \
+                        time.perf_counter() - start_time
+
+            else:
+                self._file_stats.skipped += 1
+
+        # NME datagrams store ancillary data as NMEA-0817 style ASCII data.
+        elif new_datagram['type'].startswith('NME'):
+            # Add the datagram to our nmea_data object.
+            self.nmea_data.add_datagram(new_datagram['timestamp'],
+                                        new_datagram['nmea_string'])
+
+        # TAG datagrams contain time-stamped annotations inserted via the
+        # recording software.  They are counted in read_stats.
+        elif new_datagram['type'].startswith('TAG'):
+            #  TODO: Implement annotation reading
+            pass
+
+        # BOT datagrams contain sounder detected bottom depths from ".bot"
+        # files and DEP datagrams contain sounder detected bottom depths
+        # from ".out" files as well as "reflectivity" data. These are
+        # buffered and stored by _store_bottom_detections once the file
+        # has been read.
+        elif (new_datagram['type'].startswith('BOT') or
+              new_datagram['type'].startswith('DEP')):
+            self._bottom_datagrams.append(new_datagram)
+        else:
+            self._file_stats.add_unknown(new_datagram['type'])
+
+
+    def _start_file_stats(self, fid):
+        """Starts collecting the statistics of a file.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+        """
+
+        self._file_stats = ReadStats()
+        self._file_stats.n_files = 1
+        self._file_start_time = time.perf_counter()
+        fid.stats = self._file_stats
+
+
+    def _finish_file_stats(self, filename):
+        """Adds the statistics of the file we've finished reading to
+        read_stats and passes them to the read_stats_callback.
+
+        Args:
+            filename (str): The file we've finished reading.
+        """
+
+        if self._file_start_time is None:
+            return
+
+        self._file_stats.wall_time = time.perf_counter() - \
+                self._file_start_time
+        self._file_start_time = None
+        self.read_stats.merge(self._file_stats)
+
+        if self.read_stats_callback is not None:
+            self.read_stats_callback(source_name(filename), self._file_stats)
+
+
+    def _store_bottom_detections(self):
+        """Stores the buffered bottom detections.
+
+        The detections from the BOT and DEP datagrams in the file are
+        collected into arrays and passed to each channel's append_bots
+        method, which matches them to the ping times in one pass.
+        """
+
+        if not self._bottom_datagrams:
+            return
+
+        # Split the datagrams by type since only DEP datagrams include
+        # reflectivity.
+        for has_reflectivity in [False, True]:
+            datagrams = [dgram for dgram in self._bottom_datagrams if
+                         ('reflectivity' in dgram) == has_reflectivity]
+            if not datagrams:
+                continue
+
+            detection_times = np.array([dgram['timestamp'] for dgram in
+                                        datagrams], dtype='datetime64[ms]')
+            depths = np.array([dgram['depth'] for dgram in datagrams])
+            if has_reflectivity:
+                reflectivity = np.array([dgram['reflectivity'] for dgram in
+                                         datagrams])
+
+            # Map the channels to their detections and update each channel.
+            for channel_id in self.channel_ids:
+                idx = self._file_channel_map.index(channel_id)
+                if has_reflectivity:
+                    self.raw_data[channel_id].append_bots(detection_times,
+                            depths[:, idx], reflectivity=reflectivity[:, idx])
+                else:
+                    self.raw_data[channel_id].append_bots(detection_times,
+                            depths[:, idx])
+
+        self._bottom_datagrams = []
+
+
+    def _create_raw_data(self, channel_id):
+        """Creates a new RawData object using our read options.
+
+        Args:
+            channel_id (str): The channel ID of the new RawData object.
+        """
+
+        return RawData(channel_id, chunk_width=self._chunk_width,
+                       store_power=self.read_power,
+                       store_angles=self.read_angles,
+                       max_sample_number=self.read_max_sample_count,
+                       compact_power=self.read_compact_power,
+                       packed_angles=self.read_packed_angles,
+                       ragged=self.read_ragged)
+
+
+    def _read_configuration(self, fid, filename, first_file,
+                            array_sizes=None):
+        """Reads the configuration datagrams at the start of a file.
+
+        The CON0 datagram will come first.  If this is an ME70 .raw file, the
+        CON1 datagram will follow. RawData objects are created for any new
+        channels we are reading and the channel metadata of each channel
+        is updated.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+            filename (str): The full path to the file being read.
+            first_file (bool): Set to True if this is the first file read.
+                The start_time property is set to the time of the CON0
+                datagram of the first file.
+            array_sizes (dict): Optional dictionary, keyed by channel ID, of
+                (n_pings, n_samples) tuples used to allocate the data arrays
+                of new RawData objects.
+        """
+
+        # Read the CON0 configuration datagram.
+        config_datagram = fid.read(1)
+        config_datagram['timestamp'] = \
+                np.datetime64(config_datagram['timestamp'], '[ms]')
+        if first_file:
+            self.start_time = config_datagram['timestamp']
+
+        # Create a mapping of channel numbers to channel IDs for all
+        # transceivers in the file.
+        self._file_channel_map = [None] * \
+            config_datagram['transceiver_count']
+        for idx in config_datagram['transceivers'].keys():
+            self._file_channel_map[idx-1] = \
+                config_datagram['transceivers'][idx]['channel_id']
+
+        # Check if reading an ME70 file with a CON1 datagram.
+        next_datagram = fid.peek()
+        if next_datagram == 'CON1':
+            CON1_datagram = fid.read(1)
+        else:
+            CON1_datagram = None
+
+        # The configuration hash identifies files with the same configuration.
+        config_hash = config_datagram.get('config_hash')
+        if CON1_datagram is not None and config_hash is not None:
+            config_hash += CON1_datagram.get('config_hash', '')
+
+        # Check if a RawData object for this channel needs to be
+        # created.
+        self._channel_map = {}
+        for channel in config_datagram['transceivers']:
+            # Get the channel ID.
+            channel_id = config_datagram['transceivers'][channel][
+                'channel_id']
+
+            # Check if we are reading this channel.
+            if not self._is_channel_read(
+                    config_datagram['transceivers'][channel]):
+                continue
+
+            # Check if a RawData object exists for this channel.  If
+            # not, create it, add it to the list of channel_ids,
+            # and update the public channel id map.
+            if channel_id not in self.raw_data:
+                self.raw_data[channel_id] = self._create_raw_data(channel_id)
+
+                # If we prescanned the files, allocate the arrays
+                # at their final size.
+                if array_sizes and channel_id in array_sizes:
+                    self.raw_data[channel_id].preallocate(
+                            *array_sizes[channel_id])
+
+                self.channel_ids.append(channel_id)
+
+                self.n_channels += 1
+                self.channel_id_map[self.n_channels] = channel_id
+
+            # Update the internal mapping of channel number to
+            # channel ID used when reading the datagrams.  This
+            # mapping is only valid for the current file that is
+            # being read.
+            self._channel_map[channel] = channel_id
+
+            # Create a channel_metadata object to store this channel's
+            # configuration and rawfile metadata.  If the configuration
+            # hasn't changed since the previous file, the new object shares
+            # the previous file's transceiver configuration.
+            transceiver = config_datagram['transceivers'][channel]
+            previous = self.raw_data[channel_id].current_metadata
+            if (previous is not None and config_hash is not None and
+                    previous.config_hash == config_hash):
+                transceiver = previous.transceiver
+            metadata = ChannelMetadata(source_name(filename),
+                        transceiver,
+                        config_datagram['survey_name'],
+                        config_datagram['transect_name'],
+                        config_datagram['sounder_name'],
+                        config_datagram['version'],
+                        self.raw_data[channel_id].n_pings,
+                        config_datagram['timestamp'],
+                        extended_configuration=CON1_datagram,
+                        config_hash=config_hash)
+
+            # Update the channel_metadata property of the RawData
+            # object.
+            self.raw_data[channel_id].current_metadata = metadata
+
+        # If we aren't storing every RAW datagram, filter them using their
+        # headers so the sample data of the ones we skip aren't read.
+        if (len(self._channel_map) < len(self._file_channel_map) or
+                self.read_start_time is not None or
+                self.read_end_time is not None or
+                self.read_end_ping is not None or
+                self.read_transmit_modes or self.read_pulse_lengths):
+            fid.raw_filter = self._raw_header_filter
+
+        # Only read the samples and sample data we're storing.
+        fid.sample_window = self._sample_window()
+
+
+    def _raw_header_filter(self, header):
+        """Checks if we are storing a RAW datagram using its header.
+
+        This method is called by RawSimradFile for each RAW datagram before
+        the sample data are read. The ping counter is only updated as the
+        datagrams are processed so it can lag behind the reader. The start
+        ping can't be checked here but since the counter only increases,
+        once it is past the end ping no more sample data will be stored.
+
+        Args:
+            header (dict): The decoded RAW datagram header.
+
+        Returns:
+            True if the datagram's sample data should be read.
+        """
+
+        # Check if we're reading this channel.
+        if header['channel'] not in self._channel_map:
+            return False
+
+        # Check if we're past the end ping.
+        if self.read_end_ping is not None and self.n_pings > self.read_end_ping:
+            return False
+
+        # Check the transmit mode and pulse length.
+        if (self.read_transmit_modes and header['transmit_mode'] not in
+                self.read_transmit_modes):
+            return False
+        if self.read_pulse_lengths:
+            pulse_length = header['pulse_length']
+            if not any(abs(pulse_length - p) <= self.PULSE_LENGTH_RTOL * p
+                       for p in self.read_pulse_lengths):
+                return False
+
+        # Check the time bounds.
+        if self.read_start_time is not None or self.read_end_time is not None:
+            timestamp = nt_to_datetime64(header['low_date'],
+                                         header['high_date'])
+            if (self.read_start_time is not None and
+                    timestamp < self.read_start_time):
+                return False
+            if (self.read_end_time is not None and
+                    timestamp > self.read_end_time):
+                return False
+
+        return True
+
+
+    def _sample_window(self):
+        """Returns the sample window used to read the RAW datagrams.
+
+        The window is set by the start_sample, end_sample and
+        max_sample_count read options. The max sample count is applied to the
+        sample numbers in the datagram so it caps the end of the window. The
+        window also specifies if the power and angle data are read.
+
+        Returns:
+            A (start_sample, stop_sample, power, angles) tuple as used by
+            RawSimradFile.sample_window where stop_sample is one past the last
+            sample read (or None to read to the last sample). None is returned
+            if all of the sample data are read.
+        """
+
+        start_sample = self.read_start_sample or 0
+        stop_sample = None
+        if self.read_end_sample:
+            stop_sample = self.read_end_sample + 1
+        if self.read_max_sample_count:
+            if stop_sample is None:
+                stop_sample = self.read_max_sample_count
+            else:
+                stop_sample = min(stop_sample, self.read_max_sample_count)
+
+        if (start_sample == 0 and stop_sample is None and self.read_power and
+                self.read_angles):
+            return None
+
+        return (start_sample, stop_sample, bool(self.read_power),
+                bool(self.read_angles))
+
+
+    def _window_sample_count(self, count):
+        """Returns the number of samples within our sample window.
+
+        Args:
+            count (array): Array of datagram sample counts.
+
+        Returns:
+            An array containing the number of samples that will be read from
+            datagrams with the given sample counts.
+        """
+
+        window = self._sample_window()
+        if window is None:
+            return count
+        start_sample, stop_sample, power, angles = window
+        if not (power or angles):
+            return np.zeros_like(count)
+        if stop_sample is not None:
+            count = np.minimum(count, stop_sample)
+
+        return np.maximum(count - start_sample, 0)
+
+
+    def _header_mask(self, headers):
+        """Applies the transmit mode and pulse length options to an array
+        of RAW datagram headers.
+
+        Args:
+            headers (array): RAW datagram headers as returned by
+                RawSimradFile.read_headers.
+
+        Returns:
+            A boolean array that is True for the datagrams we would store.
+        """
+
+        mask = np.full(headers.shape[0], True)
+        if self.read_transmit_modes:
+            mask &= np.isin(headers['transmit_mode'], self.read_transmit_modes)
+        if self.read_pulse_lengths:
+            mask &= np.isclose(headers['pulse_length'][:, np.newaxis],
+                    np.array(self.read_pulse_lengths)[np.newaxis, :],
+                    rtol=self.PULSE_LENGTH_RTOL, atol=0).any(axis=1)
+
+        return mask
+
+
+    def _all_datagrams(self, fid):
+        """Generator that returns every datagram from the current file
+        position to the end of the file.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+        """
+
+        # Datagrams are read in batches so runs of RAW datagrams can have
+        # their headers decoded in bulk.
+        while True:
+            new_datagrams = fid.read_batch(self.DATAGRAM_BATCH_SIZE)
+            if not new_datagrams:
+                break
+
+            for new_datagram in new_datagrams:
+                yield new_datagram
+
+
+    def _indexed_datagrams(self, fid):
+        """Generator that returns only the datagrams we will store.
+
+        This method uses the file's datagram index to select the datagrams
+        after the current file position that fall within the time bounds
+        and, for RAW datagrams, the ping bounds and channels being read. Only
+        these datagrams are read from the file. The ping counter and end time
+        are updated for the datagrams that are skipped so the results are the
+        same as if every datagram had been read.
+
+        Args:
+            fid (file object): Pointer to currently open RawSimradFile object.
+        """
+
+        index = fid.get_index()
+        index = index[index['offset'] >= fid._tell_bytes()]
+        if index.shape[0] == 0:
+            return
+
+        index, keep, is_raw, in_time, ping_number, ping_time = \
+                self._select_datagrams(index, self._channel_map, self.n_pings)
+        self._file_stats.skipped += int(np.count_nonzero(~keep))
+
+        # Read the datagrams we're keeping.  Set the ping counter so the
+        # datagram reading loop will arrive at the correct ping number.  They
+        # are read with read_batch so RAW datagrams are decoded as they are
+        # when reading every datagram.
+        for idx in np.flatnonzero(keep):
+            fid._seek_bytes(int(index['offset'][idx]))
+            try:
+                new_datagrams = fid.read_batch(1)
+            except SimradEOF:
+                break
+            if not new_datagrams:
+                break
+            new_datagram = new_datagrams[0]
+
+            if is_raw[idx]:
+                self.n_pings = int(ping_number[idx])
+                if index['channel'][idx] == 1:
+                    self.n_pings -= 1
+
+            yield new_datagram
+
+        # Update the ping counter and end time to account for any datagrams
+        # we skipped at the end of the file.
+        self.n_pings = int(ping_number[-1])
+        if np.any(in_time):
+            last_time = ping_time[in_time].max()
+            if self.end_time is None or self.end_time < last_time:
+                self.end_time = last_time
+
+
+    def _index_times(self, index):
+        """Returns the times of the datagrams in a datagram index.
+
+        Args:
+            index (array): Datagram index or header array with low_date and
+                high_date fields.
+
+        Returns:
+            A numpy datetime64[ms] array of the datagram times.
+        """
+
+        return nt_to_datetime64(index['low_date'], index['high_date'])
+
+
+    def _select_datagrams(self, index, channel_map, n_pings):
+        """Determines which datagrams in a datagram index will be stored.
+
+        When only time bounds are set, the index is first sliced down to the
+        datagrams near the time bounds so the masks and the ping count are
+        only computed for them.
+
+        Args:
+            index (array): Datagram index as returned by
+                RawSimradFile.get_index.
+            channel_map (dict): Dictionary whose keys are the channel numbers
+                in the file that we are reading.
+            n_pings (int): The ping count before the first datagram in index.
+
+        Returns:
+            A tuple of arrays (index, keep, is_raw, in_time, ping_number,
+            ping_time) where index is the part of the datagram index that the
+            other arrays describe, keep is True for the datagrams that are
+            stored, is_raw is True for RAW datagrams, in_time is True for
+            datagrams within the time bounds, ping_number is the value of the
+            ping counter at each datagram and ping_time is the datagram time
+            as datetime64[ms].
+        """
+
+        ping_time = self._index_times(index)
+
+        # Without ping bounds only the datagrams within the time bounds count
+        # so we can drop the rest of the index.  The datagrams are only
+        # roughly in time order so we keep those within TIME_BOUND_TOLERANCE
+        # of the bounds and apply the bounds exactly below.
+        if self.read_start_ping is None and self.read_end_ping is None:
+            start = 0
+            end = index.shape[0]
+            if self.read_start_time is not None:
+                start = np.searchsorted(ping_time, self.read_start_time -
+                        self.TIME_BOUND_TOLERANCE, side='left')
+            if self.read_end_time is not None:
+                end = np.searchsorted(ping_time, self.read_end_time +
+                        self.TIME_BOUND_TOLERANCE, side='right')
+            # Keep at least one datagram so there is a ping count to return.
+            # It is outside the time bounds so it isn't stored or counted.
+            if end <= start:
+                start = min(start, index.shape[0] - 1)
+                end = start + 1
+            index = index[start:end]
+            ping_time = ping_time[start:end]
+
+        # Determine which datagrams are within our time bounds.
+        in_time = np.full(index.shape[0], True)
+        if self.read_start_time is not None:
+            in_time &= ping_time >= self.read_start_time
+        if self.read_end_time is not None:
+            in_time &= ping_time <= self.read_end_time
+
+        # Compute the ping number for every datagram.  Pings are counted using
+        # the channel 1 RAW datagrams that are within our time bounds.
+        is_raw = np.char.startswith(index['type'], b'RAW')
+        ping_number = n_pings + np.cumsum(is_raw & in_time &
+                                          (index['channel'] == 1))
+
+        # Select the RAW datagrams that are within our ping bounds for the
+        # channels we're reading.
+        keep_raw = np.isin(index['channel'], list(channel_map.keys()))
+        if self.read_start_ping is not None:
+            keep_raw &= ping_number >= self.read_start_ping
+        if self.read_end_ping is not None:
+            keep_raw &= ping_number <= self.read_end_ping
+        keep = in_time & (~is_raw | keep_raw)
+
+        return index, keep, is_raw, in_time, ping_number, ping_time
+
+
+    def _prescan(self, raw_files, raw_file_class):
+        """Scans the datagram headers of the files we're about to read.
+
+        The datagram index of each file is used to count the pings that will
+        be stored for each channel and to find the maximum sample count of
+        those pings. The indexes are only written to disk if read_use_index
+        is set.
+
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                read.
+            raw_file_class (class): The RawSimradFile class used to read the
+                files.
+
+        Returns:
+            A tuple (array_sizes, file_pings) where array_sizes is a
+            dictionary, keyed by channel ID, of (n_pings, n_samples) tuples
+            and file_pings is a list containing the value of the ping counter
+            at the start of each file.
+        """
+
+        ping_counts = {}
+        sample_counts = {}
+        file_pings = []
+        n_pings = self.n_pings
+
+        for filename in raw_files:
+            file_pings.append(n_pings)
+            with raw_file_class(filename, 'r') as fid:
+
+                # Map the channel numbers of the channels we're reading to
+                # their channel IDs.
+                config_datagram = fid.read(1)
+                channel_map = {}
+                for channel, transceiver in \
+                        config_datagram['transceivers'].items():
+                    if self._is_channel_read(transceiver):
+                        channel_map[channel] = transceiver['channel_id']
+
+                index = fid.get_index(save=self.read_use_index)
+                index = index[index['offset'] >= fid._tell_bytes()]
+                if index.shape[0] == 0:
+                    continue
+
+                index, keep, is_raw, in_time, ping_number, ping_time = \
+                        self._select_datagrams(index, channel_map, n_pings)
+                n_pings = int(ping_number[-1])
+
+                # Apply the transmit mode and pulse length options.  These
+                # require reading the RAW datagram headers.
+                if self.read_transmit_modes or self.read_pulse_lengths:
+                    keep_raw = keep & is_raw
+                    keep[keep_raw] = self._header_mask(
+                            fid.read_headers(index[keep_raw]))
+
+                # Update the ping and sample counts of each channel.
+                for channel, channel_id in channel_map.items():
+                    stored = keep & is_raw & (index['channel'] == channel)
+                    n_stored = int(np.count_nonzero(stored))
+                    if n_stored == 0:
+                        continue
+                    ping_counts[channel_id] = \
+                            ping_counts.get(channel_id, 0) + n_stored
+                    sample_counts[channel_id] = \
+                            max(sample_counts.get(channel_id, 0),
+                                int(self._window_sample_count(
+                                    index['count'][stored]).max()))
+
+        # Match the array sizes that append_ping would create.  Arrays are
+        # always created with max_sample_count samples when it is set.
+        array_sizes = {}
+        for channel_id in ping_counts:
+            if self.read_max_sample_count:
+                n_samples = self.read_max_sample_count
+            else:
+                n_samples = sample_counts[channel_id]
+            array_sizes[channel_id] = (ping_counts[channel_id], n_samples)
+
+        return array_sizes, file_pings
+
+
+    def _set_read_options(self, power=None, angles=None,
+                          max_sample_count=None, start_time=None,
+                          end_time=None, start_ping=None, end_ping=None,
+                          frequencies=None, channel_ids=None,
+                          time_format_string='%Y-%m-%d %H:%M:%S',
+                          incremental=None, start_sample=None,
+                          end_sample=None, use_index=None, memory_map=None,
+                          prescan=None, workers=None, transmit_modes=None,
+                          pulse_lengths=None, prefetch=None,
+                          stats_callback=None, compact_power=None,
+                          packed_angles=None, ragged=None):
+        """Updates the reading state variables.
+
+        The arguments are described in read_raw. Arguments that are None
+        leave the current value unchanged.
         """
 
-        # Update the reading state variables.
         if start_time:
             self.read_start_time = self._convert_time_bound(
                                    start_time, format_string=time_format_string)
@@ -278,9 +2038,9 @@ class EK60(object):
             self.read_start_sample = start_sample
         if end_sample:
             self.read_end_sample = end_sample
-        if power:
+        if power is not None:
             self.read_power = power
-        if angles:
+        if angles is not None:
             self.read_angles = angles
         if max_sample_count:
             self.read_max_sample_count = max_sample_count
@@ -290,261 +2050,262 @@ class EK60(object):
             self.read_channel_ids = channel_ids
         if incremental:
             self.read_incremental = incremental
+        if use_index:
+            self.read_use_index = use_index
+        if memory_map:
+            self.read_memory_map = memory_map
+        if prescan:
+            self.read_prescan = prescan
+        if workers:
+            self.read_workers = workers
+        if transmit_modes:
+            self.read_transmit_modes = transmit_modes
+        if pulse_lengths:
+            self.read_pulse_lengths = pulse_lengths
+        if prefetch:
+            self.read_prefetch = prefetch
+        if stats_callback:
+            self.read_stats_callback = stats_callback
+        if compact_power is not None:
+            self.read_compact_power = compact_power
+        if packed_angles is not None:
+            self.read_packed_angles = packed_angles
+        if ragged is not None:
+            self.read_ragged = ragged
+
+
+    def _read_raw_parallel(self, raw_files, raw_file_class):
+        """Reads .raw files in parallel using a pool of worker processes.
+
+        Each .raw file is read by a separate EK60 object in a worker process
+        using this object's read options. The results are then merged into
+        this object in file order. When ping bounds are set, the files are
+        prescanned first so each worker can start with the ping counter at
+        the value it would have in a serial read.
 
-        #TODO:  Implement incremental reading.
-        #       This is going to take some re-org since we can't simply
-        #       iterate thru the list of files. We need to be able to read a
-        #       subset of data from a file and if required open the next
-        #       file in the list and continue reading the subset.
-
-        # Ensure that the raw_files argument is a list.
-        if isinstance(raw_files, str):
-            raw_files = [raw_files]
+        Args:
+            raw_files (list): List containing full paths to data files to be
+                read.
+            raw_file_class (class): The RawSimradFile class used to read the
+                files.
 
-        # Initialize a file counter.
-        n_files = 0
+        Returns:
+            A tuple (n_files, bottom_files) where n_files is the number of
+            files read and bottom_files is the list of .bot and .out files
+            that still need to be read.
+        """
 
-        # Iterate through the list of .raw files to read.
-        for filename in raw_files:
+        # Separate the bottom files.  These must be read after the .raw data.
+        bottom_files = [filename for filename in raw_files if
+                os.path.splitext(source_name(filename))[1].lower() in
+                ['.bot', '.out']]
+        raw_files = [filename for filename in raw_files if filename not in
+                bottom_files]
+        if not raw_files:
+            return 0, bottom_files
+
+        # Determine the starting ping number of each file if needed.
+        if self.read_start_ping is not None or self.read_end_ping is not None:
+            _, file_pings = self._prescan(raw_files, raw_file_class)
+        else:
+            file_pings = [0] * len(raw_files)
+
+        # Copy our read options.  The workers read their files serially.
+        options = {}
+        for name, value in self.__dict__.items():
+            if name.startswith('read_'):
+                options[name] = value
+        options['read_workers'] = None
+        options['read_prescan'] = False
+
+        # The workers collect their own statistics and we make the callbacks
+        # once their results are returned.
+        del options['read_stats']
+        options['read_stats_callback'] = None
+
+        pool = multiprocessing.Pool(self.read_workers)
+        try:
+            readers = pool.map(_read_raw_file, [(filename, options, n_pings)
+                    for filename, n_pings in zip(raw_files, file_pings)],
+                    chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        # Add the statistics of the files read by the workers.
+        for filename, reader in zip(raw_files, readers):
+            self.read_stats.merge(reader.read_stats)
+            if self.read_stats_callback is not None:
+                self.read_stats_callback(source_name(filename),
+                                         reader.read_stats)
+
+        # Work out the ping number shift for each reader.  If the workers
+        # didn't start with the correct ping numbers we shift them here.
+        n_pings = self.n_pings
+        ping_shifts = []
+        for reader, start_pings in zip(readers, file_pings):
+            ping_shifts.append(n_pings - start_pings)
+            n_pings += reader.n_pings - start_pings
+
+        # Update our time and ping spans.  Readers of skipped files have no
+        # start time.
+        start_times = [reader.start_time for reader in readers if
+                       reader.start_time is not None]
+        if start_times:
+            self.start_time = min(start_times)
+        for reader, shift in zip(readers, ping_shifts):
+            if reader.end_time is not None:
+                if self.end_time is None or self.end_time < reader.end_time:
+                    self.end_time = reader.end_time
+            if reader.start_ping:
+                if not self.start_ping:
+                    self.start_ping = reader.start_ping + shift
+                self.end_ping = reader.end_ping + shift
+        self.n_pings = n_pings
+
+        # Create the RawData objects in the order a serial read would and
+        # allocate the arrays to hold the data from all of the readers.
+        ping_counts = {}
+        sample_counts = {}
+        for reader in readers:
+            for channel_id in reader.channel_ids:
+                if channel_id not in self.raw_data:
+                    self.raw_data[channel_id] = \
+                            self._create_raw_data(channel_id)
+                    self.channel_ids.append(channel_id)
+                    self.n_channels += 1
+                    self.channel_id_map[self.n_channels] = channel_id
+
+                reader_data = reader.raw_data[channel_id]
+                if reader_data.n_pings > 0:
+                    ping_counts[channel_id] = ping_counts.get(channel_id, 0) + \
+                            reader_data.n_pings
+                    sample_counts[channel_id] = max(
+                            sample_counts.get(channel_id, 0),
+                            reader_data.n_samples)
+
+        channel_pings = {}
+        for channel_id in self.channel_ids:
+            raw_data = self.raw_data[channel_id]
+            channel_pings[channel_id] = raw_data.n_pings
+            if channel_id not in ping_counts:
+                continue
+            if raw_data.n_pings < 0:
+                raw_data.preallocate(ping_counts[channel_id],
+                        sample_counts[channel_id])
+            else:
+                raw_data.resize(raw_data.n_pings + ping_counts[channel_id],
+                        max(raw_data.n_samples, sample_counts[channel_id]))
 
-            # Read data from the file and add to self.raw_data.  Then read the
-            # configuration datagrams.  The CON0 datagram will come first.  If
-            # this is an ME70 .raw file, the CON1 datagram will follow.
-            with RawSimradFile(filename, 'r') as fid:
+        # Copy the data from the readers.
+        for reader in readers:
+            for channel_id in reader.channel_ids:
+                self._merge_raw_data(self.raw_data[channel_id],
+                        reader.raw_data[channel_id], channel_pings[channel_id])
+                if reader.raw_data[channel_id].n_pings > 0:
+                    channel_pings[channel_id] = \
+                            max(channel_pings[channel_id], 0) + \
+                            reader.raw_data[channel_id].n_pings
 
-                # Read the CON0 configuration datagram.
-                config_datagram = fid.read(1)
-                config_datagram['timestamp'] = \
-                        np.datetime64(config_datagram['timestamp'], '[ms]')
-                if n_files == 0:
-                    self.start_time = config_datagram['timestamp']
-
-                # Create a mapping of channel numbers to channel IDs for all
-                # transceivers in the file.
-                self._file_channel_map = [None] * \
-                    config_datagram['transceiver_count']
-                for idx in config_datagram['transceivers'].keys():
-                    self._file_channel_map[idx-1] = \
-                        config_datagram['transceivers'][idx]['channel_id']
-
-                # Check if reading an ME70 file with a CON1 datagram.
-                next_datagram = fid.peek()
-                if next_datagram == 'CON1':
-                    CON1_datagram = fid.read(1)
-                else:
-                    CON1_datagram = None
-
-                # Check if a RawData object for this channel needs to be
-                # created.
-                self._channel_map = {}
-                for channel in config_datagram['transceivers']:
-                    # Get the channel ID.
-                    channel_id = config_datagram['transceivers'][channel][
-                        'channel_id']
-
-                    # Check if we are reading this channel.
-                    if (self.read_channel_ids and channel_id not in
-                            self.read_channel_ids):
-                        # There are specific channel IDs specified and this
-                        # is *NOT* one of them, so continue.
-                        continue
+            # Add the NMEA data.
+            for idx in range(reader.nmea_data.n_raw):
+                self.nmea_data.add_datagram(reader.nmea_data.nmea_times[idx],
+                        reader.nmea_data.raw_datagrams[idx])
 
-                    # Check if we are reading this frequency.
-                    frequency = config_datagram['transceivers'][channel][
-                        'frequency']
-                    if self.read_frequencies and frequency not in \
-                            self.read_frequencies:
-                        # There are specific frequencies specified and this
-                        # is *NOT* one of them, so continue.
-                        continue
+        for channel_id in ping_counts:
+            self.raw_data[channel_id].n_pings = channel_pings[channel_id]
 
-                    # Check if a RawData object exists for this channel.  If
-                    # not, create it, add it to the list of channel_ids,
-                    # and update the public channel id map.
-                    if channel_id not in self.raw_data:
-                        self.raw_data[channel_id] = RawData(channel_id,
-                                store_power=self.read_power,
-                                store_angles=self.read_angles,
-                                max_sample_number=self.read_max_sample_count)
-
-                        self.channel_ids.append(channel_id)
-
-                        self.n_channels += 1
-                        self.channel_id_map[self.n_channels] = channel_id
-
-                    # Update the internal mapping of channel number to
-                    # channel ID used when reading the datagrams.  This
-                    # mapping is only valid for the current file that is
-                    # being read.
-                    self._channel_map[channel] = channel_id
-
-                    # Create a channel_metadata object to store this channel's
-                    # configuration and rawfile metadata.
-                    metadata = ChannelMetadata(filename,
-                                config_datagram['transceivers'][channel],
-                                config_datagram['survey_name'],
-                                config_datagram['transect_name'],
-                                config_datagram['sounder_name'],
-                                config_datagram['version'],
-                                self.raw_data[channel_id].n_pings,
-                                config_datagram['timestamp'],
-                                extended_configuration=CON1_datagram)
-
-                    # Update the channel_metadata property of the RawData
-                    # object.
-                    self.raw_data[channel_id].current_metadata = metadata
-
-                # Read the rest of the datagrams.
-                self._read_datagrams(fid, self.read_incremental)
-
-                n_files += 1
-
-        # Trim excess data from arrays after reading.
-        for channel_id in self.channel_ids:
-            self.raw_data[channel_id].trim()
-        self.nmea_data.trim()
+        # Keep the per file channel maps of the last file read.
+        self._channel_map = readers[-1]._channel_map
+        self._file_channel_map = readers[-1]._file_channel_map
 
+        return len(raw_files), bottom_files
 
-    def _read_datagrams(self, fid, incremental):
-        """Reads datagrams.
 
-        An internal method to read all of the datagrams contained in a file.
+    def _merge_raw_data(self, raw_data, reader_data, n_pings):
+        """Copies the data read by a worker into one of our RawData objects.
 
         Args:
-            fid (file object): Pointer to currently open file object. This is a
-                RawSimradFile file object and not the standard Python file
-                object.
-            incremental (bool): Boolean to control incremental reading. True
-                = incremental reading, False reads entire file.
+            raw_data (RawData): The RawData object to copy the data into. The
+                arrays must already be allocated to hold the data.
+            reader_data (RawData): The RawData object read by the worker.
+            n_pings (int): The ping count of raw_data before the data are
+                copied. This is -1 if no pings have been added.
         """
 
-        #TODO: implement incremental reading
-        #      The user should be able to specify incremental reading in
-        #      their call to read_raw. incremental reading should read in the
-        #      specified number of "pings", save the reader state,
-        #      then return. Subsequent calls would pick up where the reading
-        #      left off.  As stated above, the exact mechanics need to be
-        #      worked out since it will not work as currently implemented.
-
-
-        #TODO:  figure out what if anything we want to do with these.
-        #       Either expose in some useful way or remove.
-        num_sample_datagrams = 0
-        num_sample_datagrams_skipped = 0
-        num_datagrams_parsed = 0
-        num_bot_datagrams = 0
-
-        # While datagrams are available, try to read in the next datagram.
-        while True:
-            try:
-                new_datagram = fid.read(1)
-            except SimradEOF:
-                break
-
-            # Convert the timestamp to a datetime64 object.
-            new_datagram['timestamp'] = \
-                    np.datetime64(new_datagram['timestamp'], '[ms]')
-
-            # Check if data should be stored based on time bounds.
-            if self.read_start_time is not None:
-                if new_datagram['timestamp'] < self.read_start_time:
-                    continue
-            if self.read_end_time is not None:
-                if new_datagram['timestamp'] > self.read_end_time:
-                    continue
-
-            num_datagrams_parsed += 1
-
-            # Update the end_time property.
-            if self.end_time is not None:
-                # We can't assume data will be read in time order.
-                if self.end_time < new_datagram['timestamp']:
-                    self.end_time = new_datagram['timestamp']
-            else:
-                self.end_time = new_datagram['timestamp']
-
-            # Process the datagrams by type.
-
-            # RAW datagrams store raw acoustic data for a channel.
-            if new_datagram['type'].startswith('RAW'):
-
-                if new_datagram['channel'] == 1:
-                    self.n_pings += 1
+        # The worker's channel metadata were created as if this channel had
+        # no pings.  Update the ping numbers to match a serial read.  If the
+        # configuration is the same as the previous file's, share the previous
+        # file's transceiver configuration, as a serial read does.
+        previous = raw_data.current_metadata
+        metadata = [reader_data.current_metadata]
+        if reader_data.n_pings > 0:
+            metadata = list(reader_data.channel_metadata[:reader_data.n_pings]) \
+                    + metadata
+        for channel_metadata in {id(md): md for md in metadata}.values():
+            channel_metadata.start_ping = n_pings
+            if channel_metadata.end_ping:
+                channel_metadata.end_ping += max(n_pings, 0)
+            if (previous is not None and channel_metadata.config_hash is not
+                    None and channel_metadata.config_hash ==
+                    previous.config_hash):
+                channel_metadata.set_configuration(previous.transceiver)
+            previous = channel_metadata
+        raw_data.current_metadata = reader_data.current_metadata
+
+        if reader_data.n_pings <= 0:
+            return
 
-                # Check if we should store this data based on ping bounds.
-                if self.read_start_ping is not None:
-                    if self.n_pings < self.read_start_ping:
-                        continue
-                if self.read_end_ping is not None:
-                    if self.n_pings > self.read_end_ping:
-                        continue
+        # Copy the data arrays, padding the sample data with NaNs (or the
+        # fill value of compact power data).
+        start = max(n_pings, 0)
+        end = start + reader_data.n_pings
+        for attr_name in reader_data._data_attributes:
+            if not hasattr(reader_data, attr_name):
+                continue
+            data = getattr(reader_data, attr_name)
+            attr = getattr(raw_data, attr_name)
+            if data.ndim == 1:
+                attr[start:end] = data
+            elif data.ndim == 2:
+                attr[start:end, 0:data.shape[1]] = data
+                attr[start:end, data.shape[1]:] = \
+                        raw_data._fill_value(attr_name)
+
+        # Ragged sample data are appended to our sample buffers and the
+        # buffer offsets are shifted to point to the copied samples.
+        if raw_data.ragged:
+            raw_data.buffer_offset[start:end] += \
+                    raw_data._append_sample_buffers(reader_data)
+
+
+    def _is_channel_read(self, transceiver):
+        """Checks if a channel is selected by the channel ID and frequency
+        read options.
 
-                # Check if we're supposed to store this channel.
-                if new_datagram['channel'] in self._channel_map:
+        Args:
+            transceiver (dict): The transceiver configuration from the CON0
+                datagram.
 
-                    # Set the first ping number we read.
-                    if not self.start_ping:
-                        self.start_ping = self.n_pings
-                    # Update the last ping number.
-                    self.end_ping = self.n_pings
+        Returns:
+            True if the channel should be read.
+        """
 
-                    # Get the channel id.
-                    channel_id = self._channel_map[new_datagram['channel']]
+        # Check if we are reading this channel.
+        if (self.read_channel_ids and transceiver['channel_id'] not in
+                self.read_channel_ids):
+            # There are specific channel IDs specified and this is *NOT* one
+            # of them.
+            return False
 
-                    # Call the appropriate channel's append_ping method.
-                    self.raw_data[channel_id].append_ping(new_datagram,
-                            start_sample=self.read_start_sample,
-                            end_sample=self.read_end_sample)
+        # Check if we are reading this frequency.
+        if (self.read_frequencies and transceiver['frequency'] not in
+                self.read_frequencies):
+            # There are specific frequencies specified and this is *NOT* one
+            # of them.
+            return False
 
-                    num_sample_datagrams += 1
-                else:
-                    num_sample_datagrams_skipped += 1
-
-            # NME datagrams store ancillary data as NMEA-0817 style ASCII data.
-            elif new_datagram['type'].startswith('NME'):
-                # Add the datagram to our nmea_data object.
-                self.nmea_data.add_datagram(new_datagram['timestamp'],
-                                            new_datagram['nmea_string'])
-
-            # TAG datagrams contain time-stamped annotations inserted via the
-            # recording software.
-            elif new_datagram['type'].startswith('TAG'):
-                #  TODO: Implement annotation reading
-                print(new_datagram)
-                pass
-
-            # BOT datagrams contain sounder detected bottom depths from ".bot"
-            # files.
-            elif new_datagram['type'].startswith('BOT'):
-                # Iterate through our channels, extract the depth, and update
-                # the channel.
-                for channel_id in self.channel_ids:
-                    idx = self._file_channel_map.index(channel_id)
-                    bottom_depth = new_datagram['depth'][idx]
-                    # Call the appropriate channel's append_bot method.
-                    self.raw_data[channel_id].append_bot(new_datagram[
-                                                             'timestamp'],
-                                                         bottom_depth)
-
-                num_bot_datagrams += 1
-
-            # DEP datagrams contain sounder detected bottom depths from ".out"
-            # files as well as "reflectivity" data.
-            elif new_datagram['type'].startswith('DEP'):
-                # Iterate through our channels, extract the depth, and update
-                # the channel.
-                for channel_id in self.channel_ids:
-                    idx = self._file_channel_map.index(channel_id)
-                    bottom_depth = new_datagram['depth'][idx]
-                    reflectivity = new_datagram['reflectivity'][idx]
-                    # Call the appropriate channel's append_bot method,including
-                    # reflectivity
-                    self.raw_data[channel_id].append_bot(new_datagram[
-                        'timestamp'], bottom_depth, reflectivity=reflectivity)
-
-                num_bot_datagrams += 1
-            else:
-                print("Unknown datagram type: " + str(new_datagram['type']))
+        return True
 
 
     def _convert_time_bound(self, time, format_string):
@@ -561,11 +2322,12 @@ class EK60(object):
             string of '2017-02-28 23:34:01'
 
         Returns:
-            Datetime object normalized to UTC time.
+            Datetime64[ms] object normalized to UTC time.
         """
-        # If given a datetime64[ms] object, there's nothing to convert.
-        if time.dtype == '<M8[ms]':
-            return
+        # If given a datetime64 object, we only need to ensure the precision
+        # matches our ping times.
+        if isinstance(time, np.datetime64):
+            return time.astype('datetime64[ms]')
 
         utc = timezone('utc')
 
@@ -573,11 +2335,12 @@ class EK60(object):
         if isinstance(time, str):
             time = datetime.datetime.strptime(time, format_string)
 
-        # Convert datetime object to UTC.
-        if isinstance(time, datetime.datetime):
-            time = utc.localize(time)
+        # Convert datetime object to UTC.  Naive datetimes are assumed to be
+        # UTC.  datetime64 has no notion of timezones so we drop the tzinfo.
+        if isinstance(time, datetime.datetime) and time.tzinfo is not None:
+            time = time.astimezone(utc).replace(tzinfo=None)
 
-        return time
+        return np.datetime64(time, '[ms]')
 
 
     def get_raw_data(self, channel_number=None, channel_id=None):
@@ -687,13 +2450,19 @@ class RawData(PingData):
     # Create a constant to convert indexed power to power.
     INDEX2POWER = (10.0 * np.log10(2.0) / 256.0)
 
+    # Define the indexed power value that marks empty samples when power is
+    # stored as indexed values (compact_power=True).  This is the smallest
+    # int16 value, which is approximately -385 dB.
+    POWER_FILL = np.iinfo(np.int16).min
+
     # Create a constant to convert from indexed angles to electrical angles.
     INDEX2ELEC = 180.0 / 128.0
 
 
     def __init__(self, channel_id, n_pings=100, n_samples=1000,
                  rolling=False, chunk_width=500, store_power=True,
-                 store_angles=True, max_sample_number=None):
+                 store_angles=True, max_sample_number=None,
+                 compact_power=False, packed_angles=False, ragged=False):
         """Creates a new, empty RawData object.
 
         The RawData class stores raw echosounder data from a single channel
@@ -704,14 +2473,20 @@ class RawData(PingData):
 
         If rolling is True, arrays of size (n_pings, n_samples) are created
         for power and angle data upon instantiation and are filled with NaNs.
-        These arrays are fixed in size and if a ping is added beyond the
-        "width" of the array the array is "rolled left", and the new ping is
-        added at the end of the array. This feature is to support future
-        development of streaming data sources such as telegram broadcasts and
-        the client/server interface.
-
-        chunk_width specifies the number of columns to add to data arrays when
-        they fill up when rolling == False.
+        These arrays are fixed in size and are used as circular buffers. Once
+        the arrays are full, each new ping replaces the oldest ping without
+        moving the other pings, so the pings aren't stored in order in the
+        arrays. get_indices returns the indices of the pings in time order
+        (or in the order they were added) and ping numbers count from the
+        oldest ping. Use snapshot to get a copy of the data with the pings
+        in order. This feature is to support streaming data sources such as
+        telegram broadcasts and the client/server interface.
+
+        When rolling == False the data arrays grow by half of their size, or
+        at least chunk_width columns, when they fill up. When a ping has more
+        samples than the arrays, the arrays grow by half of their number of
+        samples, or to the ping's number of samples if it's larger. The
+        extra samples are removed by trim.
 
         Args:
             channel_id (str): The channel ID of channel whose data are stored
@@ -722,17 +2497,36 @@ class RawData(PingData):
                 arrays. Default value is 1000 samples. Arrays can be
                 re-sized later.
             rolling (bool): True = arrays have fixed sizes set when class is
-                instantiated If additional pings are read array is rolled
-                left, dropping oldest ping and adding newest.
-            chunk_width (int): Sets the number of pings (columns) to expand
-                arrays when needed to hold additional pings. This is used when
-                rolling=False.
+                instantiated. If additional pings are read the newest ping
+                replaces the oldest ping.
+            chunk_width (int): Sets the minimum number of pings (columns) to
+                expand arrays when needed to hold additional pings. This is
+                used when rolling=False.
             store_power (bool): Boolean to control whether power data are
                 stored in this RawData object.
             store_angles (bool): Boolean to control whether angle data are
                 stored in this RawData object.
             max_sample_number (int): Integer specifying the maximum number of
                 samples that will be stored in this instance's data arrays.
+            compact_power (bool): Set to True to store the power data as the
+                int16 indexed values from the raw datagrams. Empty samples
+                are set to POWER_FILL instead of NaN. The values are
+                converted to power when the power data are requested.
+            packed_angles (bool): Set to True to store the angle data as the
+                packed uint16 values from the raw datagrams in the
+                angles_packed attribute instead of the angles_alongship_e
+                and angles_athwartship_e attributes. Every packed value is a
+                valid pair of angles so the number of angle samples stored
+                for each ping is kept in the angle_sample_count attribute.
+                The values are converted to electrical angles when the angle
+                data are requested.
+            ragged (bool): Set to True to store the sample data of each ping
+                without padding. The samples of all pings are stored end to
+                end in 1d sample buffers and the buffer_offset and
+                buffer_count attributes store the position and number of
+                samples of each ping. The pings are padded to n_samples
+                samples when the data are requested. Ragged storage can't be
+                used with rolling arrays.
         """
         super(RawData, self).__init__()
 
@@ -741,6 +2535,10 @@ class RawData(PingData):
         # necessary to hold additional data (False).
         self.rolling_array = bool(rolling)
 
+        # _ring_head is the index of the oldest ping in rolling arrays.  It is
+        # 0 until the arrays are full.
+        self._ring_head = 0
+
         # Current_metadata stores a reference to the current channel_metadata
         # object.  The channel_metadata class stores raw file and channel
         # configuration properties contained in the .raw file header.  When
@@ -762,10 +2560,36 @@ class RawData(PingData):
         self.store_power = store_power
         self.store_angles = store_angles
 
+        # Keep note if we store the power data as indexed values.
+        self.compact_power = compact_power
+        if self.compact_power:
+            self._fill_values['power'] = self.POWER_FILL
+
+        # Keep note if we store the angle data as packed values.
+        self.packed_angles = packed_angles
+        if self.packed_angles:
+            self._fill_values['angles_packed'] = 0
+
         # Max_sample_number can be set to an integer specifying the maximum
         # number of samples that will be stored in the sample data arrays.
         self.max_sample_number = max_sample_number
 
+        # Keep note if we store the sample data in ragged arrays.  When we
+        # do, _sample_buffers maps the names of the sample data attributes to
+        # their 1d sample buffers and _buffer_size is the number of samples
+        # in the buffers that are used.
+        self.ragged = ragged
+        if self.ragged and self.rolling_array:
+            raise ValueError('Ragged sample data cannot be stored in rolling '
+                             'arrays.')
+        self._sample_buffers = {}
+        self._buffer_size = 0
+
+        # _sample_slack is the number of samples at the end of the sample
+        # data arrays that were added to leave room for longer pings and
+        # don't contain data.
+        self._sample_slack = 0
+
         # Data_attributes is an internal list that contains the names of all
         # of the class's "data" properties. The echolab2 package uses this
         # attribute to generalize various functions that manipulate these
@@ -788,10 +2612,24 @@ class RawData(PingData):
                                   'heading',
                                   'transmit_mode',
                                   'sample_offset',
-                                  'sample_count',
-                                  'power',
-                                  'angles_alongship_e',
-                                  'angles_athwartship_e']
+                                  'sample_count']
+
+        # The sample data arrays are only created if we're storing them.
+        # Ragged sample data are stored in sample buffers that aren't data
+        # attributes since they aren't indexed by ping.
+        self._sample_attributes = []
+        if self.store_power:
+            self._sample_attributes += ['power']
+        if self.store_angles and self.packed_angles:
+            self._sample_attributes += ['angles_packed']
+            self._data_attributes += ['angle_sample_count']
+        elif self.store_angles:
+            self._sample_attributes += ['angles_alongship_e',
+                                        'angles_athwartship_e']
+        if self.ragged:
+            self._data_attributes += ['buffer_offset', 'buffer_count']
+        else:
+            self._data_attributes += self._sample_attributes
 
         # If we're using a fixed data array size, we can allocate the arrays
         # now, and since we assume rolling arrays will be used in a visual or
@@ -828,7 +2666,10 @@ class RawData(PingData):
                              rolling=self.rolling_array, chunk_width=n_pings,
                              store_power=self.store_power,
                              store_angles=self.store_angles,
-                             max_sample_number=self.max_sample_number)
+                             max_sample_number=self.max_sample_number,
+                             compact_power=self.compact_power,
+                             packed_angles=self.packed_angles,
+                             ragged=self.ragged)
 
         return self._like(empty_obj, n_pings, np.nan, empty_times=True)
 
@@ -845,6 +2686,9 @@ class RawData(PingData):
             insert_after (bool):
             index_array (array):
         """
+        # The parent's insert requires the pings to be in order.
+        self._unroll()
+
         # Determine how many pings we're inserting.
         if index_array is None:
             in_idx = self.get_indices(start_time=ping_time, end_time=ping_time,
@@ -863,11 +2707,198 @@ class RawData(PingData):
             raise TypeError('The object you are inserting must be an instance '
                             + 'of EK60.RawData')
 
+        # Check that the sample data are stored the same way.
+        if (obj_to_insert.compact_power != self.compact_power or
+                obj_to_insert.packed_angles != self.packed_angles or
+                obj_to_insert.ragged != self.ragged):
+            raise TypeError('The object you are inserting must have the same '
+                            + 'compact_power, packed_angles and ragged '
+                            + 'settings as this object')
+        obj_to_insert._unroll()
+
+        # Ragged sample data are appended to our sample buffers.  The buffer
+        # offsets of the inserted pings are shifted to point to the copied
+        # samples while the parent inserts the ping data.
+        if self.ragged:
+            buffer_offset = obj_to_insert.buffer_offset
+            obj_to_insert.buffer_offset = buffer_offset + \
+                    self._append_sample_buffers(obj_to_insert)
+
         # We are now coexisting in harmony - call parent's insert.
-        super(RawData, self).insert(obj_to_insert, ping_number=ping_number,
-                                     ping_time=ping_time,
-                                     insert_after=insert_after,
-                                     index_array=index_array)
+        try:
+            super(RawData, self).insert(obj_to_insert, ping_number=ping_number,
+                                         ping_time=ping_time,
+                                         insert_after=insert_after,
+                                         index_array=index_array)
+        finally:
+            if self.ragged:
+                obj_to_insert.buffer_offset = buffer_offset
+
+
+    def resize(self, new_ping_dim, new_sample_dim):
+        """Resizes the data arrays.
+
+        All of the samples of the resized arrays are considered to contain
+        data so trim won't remove them.
+
+        Args:
+            new_ping_dim (int): The new number of pings.
+            new_sample_dim (int): The new number of samples.
+        """
+
+        self._unroll()
+        super(RawData, self).resize(new_ping_dim, new_sample_dim)
+        self._sample_slack = 0
+
+
+    def delete(self, start_ping=None, end_ping=None, start_time=None,
+               end_time=None, remove=True, index_array=None):
+        """Deletes pings.
+
+        This method unrolls rolling arrays and then calls the parent's
+        delete. The arguments are described in PingData.delete. The indices
+        in index_array are indices into the data arrays as returned by
+        get_indices. When the pings are removed, the ping count only
+        includes the pings that have been added and weren't deleted, even
+        if the arrays have room for more pings.
+        """
+
+        if index_array is None:
+            index_array = self.get_indices(start_time=start_time,
+                    end_time=end_time, start_ping=start_ping,
+                    end_ping=end_ping)
+        if self.rolling_array:
+            index_array = (np.asarray(index_array) - self._ring_head) % \
+                    self.ping_time.shape[0]
+        self._unroll()
+
+        n_pings = self.n_pings
+        super(RawData, self).delete(remove=remove, index_array=index_array)
+        if remove:
+            self.n_pings = n_pings - np.unique(index_array).shape[0]
+
+
+    def get_indices(self, start_ping=None, end_ping=None, start_time=None,
+                    end_time=None, time_order=True):
+        """Returns the indices of the pings in the range defined by the
+        times and/or ping numbers provided.
+
+        The pings of rolling arrays aren't stored in order once the arrays
+        are full. Their ping numbers count from the oldest ping and the
+        returned indices are the positions of the pings in the data arrays,
+        in time order or in the order the pings were added if time_order is
+        False. The other arguments are described in PingData.get_indices.
+
+        Returns:
+            The indices that are included in the specified range.
+        """
+
+        if not self.rolling_array:
+            return super(RawData, self).get_indices(start_ping=start_ping,
+                    end_ping=end_ping, start_time=start_time,
+                    end_time=end_time, time_order=time_order)
+
+        # Select the pings in the order they were added and map the
+        # selection to the data arrays.
+        ring_index = self._ring_index()
+        return ring_index[self._get_indices(self.ping_time[ring_index],
+                start_ping=start_ping, end_ping=end_ping,
+                start_time=start_time, end_time=end_time,
+                time_order=time_order)]
+
+
+    def snapshot(self):
+        """Returns a copy of this object with the pings in order.
+
+        The data arrays of the copy only contain the pings that have been
+        added, in the order they were added, and the copy doesn't use
+        rolling arrays. This is how to get contiguous data arrays from
+        rolling arrays without unrolling them.
+
+        Returns:
+            A new RawData object.
+        """
+
+        snapshot = RawData(self.channel_id, rolling=False,
+                           chunk_width=self.chunk_width,
+                           store_power=self.store_power,
+                           store_angles=self.store_angles,
+                           max_sample_number=self.max_sample_number,
+                           compact_power=self.compact_power,
+                           packed_angles=self.packed_angles,
+                           ragged=self.ragged)
+        snapshot.current_metadata = self.current_metadata
+        snapshot.sample_dtype = self.sample_dtype
+        snapshot._data_attributes = list(self._data_attributes)
+        snapshot._fill_values = dict(self._fill_values)
+
+        # Copy the pings in order, leaving out the samples that don't
+        # contain data.
+        ring_index = self._ring_index()
+        n_samples = self.n_samples - self._sample_slack
+        for attr_name in self._data_attributes:
+            data = getattr(self, attr_name)
+            if data.ndim == 2:
+                data = data[ring_index, 0:n_samples]
+            else:
+                data = data[ring_index]
+            setattr(snapshot, attr_name, data)
+        snapshot.n_pings = ring_index.shape[0]
+        snapshot.n_samples = n_samples
+        for name, buffer in self._sample_buffers.items():
+            snapshot._sample_buffers[name] = buffer[0:self._buffer_size].copy()
+        snapshot._buffer_size = self._buffer_size
+
+        return snapshot
+
+
+    def _ring_index(self):
+        """Returns the indices of the pings in the data arrays in the order
+        they were added.
+        """
+
+        n_pings = max(self.n_pings, 0)
+        if self._ring_head == 0:
+            return np.arange(n_pings)
+        return (self._ring_head + np.arange(n_pings)) % self.ping_time.shape[0]
+
+
+    def _unroll(self):
+        """Moves the pings of rolling arrays to the start of the data arrays
+        in the order they were added.
+
+        The data arrays are only copied if the oldest ping isn't the first
+        ping of the arrays.
+        """
+
+        if self._ring_head == 0:
+            return
+
+        for attr_name in self._data_attributes:
+            setattr(self, attr_name, np.roll(getattr(self, attr_name),
+                                             -self._ring_head, axis=0))
+        self._ring_head = 0
+
+
+    def trim(self, n_pings=None, n_samples=None):
+        """Trims the data arrays to a given length.
+
+        By default the arrays are trimmed to the pings that have been added
+        and the samples that contain data. Ragged sample buffers are also
+        trimmed to the samples that are used.
+
+        Args:
+            n_pings (int): Number of pings (horizontal axis).
+            n_samples (int): Number of samples (vertical axis).
+        """
+
+        if not n_samples:
+            n_samples = self.n_samples - self._sample_slack
+        super(RawData, self).trim(n_pings=n_pings, n_samples=n_samples)
+
+        for name, buffer in self._sample_buffers.items():
+            if buffer.shape[0] > self._buffer_size:
+                self._sample_buffers[name] = buffer[0:self._buffer_size].copy()
 
 
     def append_bot(self, detection_time, detection_depth, reflectivity=None):
@@ -889,26 +2920,94 @@ class RawData(PingData):
             reflectivity (float): The reflectivity value that is being inserted
                 (optional).
         """
+        if reflectivity is not None:
+            reflectivity = [reflectivity]
+        self.append_bots([detection_time], [detection_depth],
+                         reflectivity=reflectivity)
+
+
+    def append_bots(self, detection_times, detection_depths,
+                    reflectivity=None):
+        """Inserts bottom detection depths into the detected_bottom array.
+
+        This is the bulk version of append_bot. The detections are sorted
+        by time and the ping times are matched to them with searchsorted
+        instead of comparing every detection to every ping time. Detections
+        whose times don't match a ping time are ignored. If more than one
+        detection has the same time, the last one is used.
+
+        Args:
+            detection_times (array): A datetime64 array of the times the
+                bottom detection depths were recorded.
+            detection_depths (array): The depth values that are being
+                inserted.
+            reflectivity (array): The reflectivity values that are being
+                inserted (optional).
+        """
         # Check if the detected_bottom attribute exists and create it if it
-        # does not.
+        # does not.  When the .bot file is read along with the .raw files
+        # the arrays haven't been trimmed yet, so the attributes are sized
+        # to the arrays instead of n_pings and are added directly.
         if not hasattr(self, 'detected_bottom'):
-            data = np.full(self.ping_time.shape[0], np.nan)
-            self.add_attribute('detected_bottom', data)
+            self.detected_bottom = np.full(self.ping_time.shape[0], np.nan)
+            self._data_attributes.append('detected_bottom')
 
         # If storing reflectivity, check if it exists and create it if it
         # does not.
         if reflectivity is not None:
             if not hasattr(self, 'bottom_reflectivity'):
-                data = np.full(self.ping_time.shape[0], np.nan)
-                self.add_attribute('bottom_reflectivity', data)
-
-        # Determine the array element associated with this ping and update it
-        # with the detection depth and optional reflectivity.
-        idx_array = self.ping_time == detection_time
-        if np.any(idx_array):
-            self.detected_bottom[idx_array] = detection_depth
+                self.bottom_reflectivity = np.full(self.ping_time.shape[0],
+                                                   np.nan)
+                self._data_attributes.append('bottom_reflectivity')
+
+        detection_times = np.asarray(detection_times,
+                                     dtype=self.ping_time.dtype)
+        if detection_times.shape[0] == 0:
+            return
+
+        # Sort the detections by time. The sort is stable so the last of a
+        # group of detections with the same time sorts last.
+        sort_idx = np.argsort(detection_times, kind='stable')
+        sorted_times = detection_times[sort_idx]
+
+        # Find the last detection at or before each ping time and keep the
+        # pings where the times match.
+        idx_array = np.searchsorted(sorted_times, self.ping_time,
+                                    side='right') - 1
+        matched = idx_array >= 0
+        matched[matched] = (sorted_times[idx_array[matched]] ==
+                            self.ping_time[matched])
+        if np.any(matched):
+            detection_idx = sort_idx[idx_array[matched]]
+            self.detected_bottom[matched] = \
+                    np.asarray(detection_depths)[detection_idx]
             if reflectivity is not None:
-                self.bottom_reflectivity[idx_array] = reflectivity
+                self.bottom_reflectivity[matched] = \
+                        np.asarray(reflectivity)[detection_idx]
+
+
+    def preallocate(self, n_pings, n_samples):
+        """Allocates the data arrays before any pings are appended.
+
+        When the final number of pings and samples are known ahead of time,
+        allocating the arrays once avoids the repeated resizing done by
+        append_ping. If more pings or samples are appended the arrays will
+        still be resized as needed.
+
+        Args:
+            n_pings (int): Number of pings to allocate.
+            n_samples (int): Number of samples to allocate.
+        """
+
+        if self.rolling_array:
+            raise ValueError('Rolling arrays are allocated when the RawData '
+                             'object is created.')
+
+        self._create_arrays(n_pings, n_samples)
+
+        # Initialize the ping counter to indicate that our data arrays
+        # have been allocated.
+        self.n_pings = 0
 
 
     def append_ping(self, sample_datagram, start_sample=None, end_sample=None):
@@ -921,13 +3020,13 @@ class RawData(PingData):
         values for the current file.
 
         Managing the data array sizes is the bulk of what this method does. It
-        will either resize the array if rolling == False or roll the array if it
-        is full and rolling == True.
+        will either resize the array if rolling == False or replace the oldest
+        ping if it is full and rolling == True.
 
         The data arrays will change size in 2 ways:
 
-            Adding pings will add columns (or roll the array if all of the
-            columns are filled and rolling == true.) This can easily be
+            Adding pings will add columns (or replace the oldest ping if all
+            of the columns are filled and rolling == true.) This can easily be
             handled by allocating columns in chunks using the resize method
             of the numpy array and maintaining an index into the *next*
             available column (self.n_pings). Empty pings can be left
@@ -975,13 +3074,10 @@ class RawData(PingData):
             # have been allocated.
             self.n_pings  = 0
 
-        # Determine the greatest number of existing samples and the greatest
-        # number of samples in this datagram. In theory the power and angle
-        # arrays should always be the same size, but we'll check all to make
-        # sure.
-        max_data_samples = max(self.power.shape[1],
-                               self.angles_alongship_e.shape[1],
-                               self.angles_athwartship_e.shape[1])
+        # Determine the number of existing samples and the greatest number of
+        # samples in this datagram.  The power and angle arrays are always the
+        # same size but we may not be storing both of them.
+        max_data_samples = self.n_samples
         max_new_samples = max([power_samps, angle_samps])
 
         # Check if we need to truncate the sample data.
@@ -1005,23 +3101,37 @@ class RawData(PingData):
             ping_resize = False
             sample_resize = False
 
+            # Determine the number of samples that contain data after this
+            # ping is added.
+            data_samples = max(max_data_samples - self._sample_slack,
+                               max_new_samples)
+
             # Check the ping dimension.
             if self.n_pings == ping_dims:
                 # Need to resize the ping dimension.
                 ping_resize = True
-                # Calculate the new ping dimension.
-                ping_dims = ping_dims + self.chunk_width
+                # Calculate the new ping dimension.  The arrays grow
+                # geometrically so appending pings takes amortized constant
+                # time.
+                ping_dims = ping_dims + max(self.chunk_width, ping_dims // 2)
 
             # Check the samples dimension.
             if max_new_samples > max_data_samples:
                 # Need to resize the samples dimension.
                 sample_resize = True
-                # Calculate the new samples dimension.
+                # Calculate the new samples dimension.  Ragged data aren't
+                # padded so the sample buffers don't need room to grow.
                 sample_dims = max_new_samples
+                if not self.ragged:
+                    sample_dims = max(sample_dims,
+                                      max_data_samples + max_data_samples // 2)
+                    if self.max_sample_number:
+                        sample_dims = min(sample_dims, self.max_sample_number)
 
             # Determine if we resize.
             if ping_resize or sample_resize:
                 self.resize(ping_dims, sample_dims)
+            self._sample_slack = self.n_samples - data_samples
 
             # Get an index into the data arrays for this ping and increment
             # our ping counter.
@@ -1029,15 +3139,17 @@ class RawData(PingData):
             self.n_pings += 1
 
         else:
-            # Check if we need to roll.
-            if self.n_pings == ping_dims - 1:
-                # When a rolling array is "filled" we stop incrementing the
-                # ping counter and repeatedly append pings to the last ping
-                # index in the array.
-                this_ping = self.n_pings
-
-                # Roll our array 1 ping.
-                self._roll_arrays(1)
+            # Rolling arrays are circular buffers.  Until the arrays are full
+            # pings are added after the newest ping.  When a rolling array is
+            # "filled" we stop incrementing the ping counter and the newest
+            # ping replaces the oldest, which moves the head of the buffer to
+            # the next oldest ping.
+            if self.n_pings < ping_dims:
+                this_ping = (self._ring_head + self.n_pings) % ping_dims
+                self.n_pings += 1
+            else:
+                this_ping = self._ring_head
+                self._ring_head = (self._ring_head + 1) % ping_dims
 
         # Insert the channel_metadata object reference for this ping.
         self.channel_metadata[this_ping] = self.current_metadata
@@ -1064,7 +3176,10 @@ class RawData(PingData):
         self.heading[this_ping] = sample_datagram['heading']
         self.transmit_mode[this_ping] = sample_datagram['transmit_mode']
 
-        # Do the book keeping if we're storing a subset of samples.
+        # Do the book keeping if we're storing a subset of samples.  If no
+        # subset is specified, the datagram's offset and count are used.  These
+        # describe the subset of samples when the datagram was read using a
+        # sample window.
         if start_sample:
             self.sample_offset[this_ping] = start_sample
             if end_sample:
@@ -1072,82 +3187,198 @@ class RawData(PingData):
             else:
                 self.sample_count[this_ping] = sample_datagram['count'] - \
                                                start_sample
-        else:
+        elif end_sample:
             self.sample_offset[this_ping] = 0
             start_sample = 0
-            if end_sample:
-                self.sample_count[this_ping] = end_sample + 1
-            else:
-                self.sample_count[this_ping] = sample_datagram['count']
-                end_sample = sample_datagram['count']
+            self.sample_count[this_ping] = end_sample + 1
+        else:
+            self.sample_offset[this_ping] = sample_datagram['offset']
+            start_sample = 0
+            self.sample_count[this_ping] = sample_datagram['count']
+        end_sample = start_sample + self.sample_count[this_ping]
 
         # Now store the 2d "sample" data.  Determine what we need to store
         # based on operational mode.
         # 1 = Power only, 2 = Angle only 3 = Power & Angle
+        samples = {}
 
         # Check if we need to store power data.
         if sample_datagram['mode'] != 2 and self.store_power:
 
             # Get the subset of samples we're storing.
-            power = sample_datagram['power'][start_sample:self.sample_count[
-                this_ping]]
-
-            # Convert the indexed power data to power dB.
-            power = power.astype(self.sample_dtype) * self.INDEX2POWER
-
-            # Check if we need to pad or trim our sample data.
-            sample_pad = sample_dims - power.shape[0]
-            if sample_pad > 0:
-                # The data array has more samples than this datagram - we
-                # need to pad the datagram.
-                self.power[this_ping,:] = np.pad(power,(0,sample_pad),
-                        'constant', constant_values=np.nan)
-            elif sample_pad < 0:
-                # The data array has fewer samples than this datagram - we
-                # need to trim the datagram.
-                self.power[this_ping,:] = power[0:sample_pad]
-            else:
-                # The array has the same number of samples.
-                self.power[this_ping,:] = power
+            power = sample_datagram['power'][start_sample:end_sample]
+
+            # Convert the indexed power data to power dB unless we're storing
+            # the indexed values.
+            if not self.compact_power:
+                power = power.astype(self.sample_dtype) * self.INDEX2POWER
+            samples['power'] = power
+
+        # Check if we need to store packed angle data.
+        if (sample_datagram['mode'] != 1 and self.store_angles and
+                self.packed_angles):
+            # Store the packed angles as they are.  They're split and
+            # converted when the angles are requested.
+            angle = sample_datagram['angle'][start_sample:end_sample]
+            samples['angles_packed'] = angle
+            self.angle_sample_count[this_ping] = min(angle.shape[0],
+                                                     sample_dims)
+
+        elif self.store_angles and self.packed_angles:
+            # This ping doesn't have angle data.
+            self.angle_sample_count[this_ping] = 0
 
         # Check if we need to store angle data.
-        if sample_datagram['mode'] != 1 and self.store_angles:
+        elif sample_datagram['mode'] != 1 and self.store_angles:
             # First extract the alongship and athwartship angle data.  The low
             # 8 bits are the athwartship values and the upper 8 bits are
             # alongship.
-            alongship_e = (sample_datagram['angle'][
-                           start_sample:self.sample_count[this_ping]] >>
+            alongship_e = (sample_datagram['angle'][start_sample:end_sample] >>
                            8).astype('int8')
-            athwartship_e = (sample_datagram['angle'][
-                             start_sample:self.sample_count[this_ping]] &
+            athwartship_e = (sample_datagram['angle'][start_sample:end_sample] &
                              0xFF).astype('int8')
 
             # Convert from indexed to electrical angles.
-            alongship_e = alongship_e.astype(self.sample_dtype) * \
-                          self.INDEX2ELEC
-            athwartship_e = athwartship_e.astype(self.sample_dtype) * \
-                            self.INDEX2ELEC
-
-            # Check if we need to pad or trim our sample data.
-            sample_pad = sample_dims - athwartship_e.shape[0]
-            if sample_pad > 0:
-                # The data array has more samples than this datagram - we
-                # need to pad the datagram
-                self.angles_alongship_e[this_ping,:] = np.pad(alongship_e,(0,
-                        sample_pad), 'constant', constant_values=np.nan)
-                self.angles_athwartship_e[this_ping,:] = np.pad(
-                    athwartship_e,(0,sample_pad),
-                        'constant', constant_values=np.nan)
-            elif sample_pad < 0:
-                # The data array has fewer samples than this datagram - we
-                # need to trim the datagram.
-                self.angles_alongship_e[this_ping,:] = alongship_e[0:sample_pad]
-                self.angles_athwartship_e[this_ping,:] = athwartship_e[
-                                                         0:sample_pad]
+            samples['angles_alongship_e'] = alongship_e.astype(
+                    self.sample_dtype) * self.INDEX2ELEC
+            samples['angles_athwartship_e'] = athwartship_e.astype(
+                    self.sample_dtype) * self.INDEX2ELEC
+
+        # Store the samples.
+        if self.ragged:
+            self._append_samples(this_ping, samples)
+        else:
+            for name, data in samples.items():
+                # Copy the samples into this ping's row, trimming them if the
+                # data array has fewer samples than this datagram and padding
+                # the row if it has more.
+                row = getattr(self, name)[this_ping,:]
+                n_samples = min(data.shape[0], row.shape[0])
+                row[0:n_samples] = data[0:n_samples]
+                row[n_samples:] = self._fill_value(name)
+
+
+    def _append_samples(self, this_ping, samples):
+        """Appends a ping's samples to the ragged sample buffers.
+
+        The samples are trimmed to n_samples samples. Sample data that the
+        ping doesn't have (i.e. the angles of a power only ping) are filled
+        with NaNs (or the attribute's fill value).
+
+        Args:
+            this_ping (int): The index of the ping.
+            samples (dict): The ping's sample data keyed by attribute name.
+        """
+
+        n_samples = 0
+        for data in samples.values():
+            n_samples = max(n_samples, min(data.shape[0], self.n_samples))
+
+        start = self._buffer_size
+        end = start + n_samples
+        self._grow_sample_buffers(end)
+        for name, buffer in self._sample_buffers.items():
+            if name in samples:
+                data = samples[name][0:n_samples]
+                buffer[start:start + data.shape[0]] = data
+                buffer[start + data.shape[0]:end] = self._fill_value(name)
             else:
-                # The array has the same number of samples.
-                self.angles_alongship_e[this_ping,:] = alongship_e
-                self.angles_athwartship_e[this_ping,:] = athwartship_e
+                buffer[start:end] = self._fill_value(name)
+
+        self.buffer_offset[this_ping] = start
+        self.buffer_count[this_ping] = n_samples
+        self._buffer_size = end
+
+
+    def _grow_sample_buffers(self, size):
+        """Grows the ragged sample buffers to hold at least size samples.
+
+        The buffers are at least doubled in size when they're grown so
+        appending pings one at a time takes amortized constant time.
+
+        Args:
+            size (int): The number of samples the buffers must hold.
+        """
+
+        for name, buffer in self._sample_buffers.items():
+            if buffer.shape[0] >= size:
+                continue
+            new_buffer = np.empty(max(size, 2 * buffer.shape[0]),
+                                  dtype=buffer.dtype)
+            new_buffer[0:self._buffer_size] = buffer[0:self._buffer_size]
+            self._sample_buffers[name] = new_buffer
+
+
+    def _append_sample_buffers(self, raw_data):
+        """Appends the ragged sample data of another RawData object to our
+        sample buffers.
+
+        The buffer_offset values of the other object's pings must be shifted
+        by the returned offset to point to the copied samples.
+
+        Args:
+            raw_data (RawData): The RawData object to copy the samples from.
+
+        Returns:
+            The position of the copied samples in our sample buffers.
+        """
+
+        start = self._buffer_size
+        end = start + raw_data._buffer_size
+        self._grow_sample_buffers(end)
+        for name, buffer in self._sample_buffers.items():
+            buffer[start:end] = \
+                    raw_data._sample_buffers[name][0:raw_data._buffer_size]
+        self._buffer_size = end
+
+        return start
+
+
+    def _has_sample_data(self, name):
+        """Returns True if the named sample data attribute exists.
+
+        Args:
+            name (str): The name of the sample data attribute.
+        """
+
+        return name in self._sample_buffers or hasattr(self, name)
+
+
+    def _sample_array(self, name, indices):
+        """Returns a copy of the sample data of a set of pings.
+
+        Ragged sample data are copied into a rectangular array of n_samples
+        samples padded with NaNs (or the attribute's fill value). Only the
+        requested pings and the samples that contain data are copied.
+
+        Args:
+            name (str): The name of the sample data attribute.
+            indices (array): The indices of the pings.
+
+        Returns:
+            A 2d array of the pings' sample data.
+        """
+
+        n_samples = self.n_samples - self._sample_slack
+        if name not in self._sample_buffers:
+            return getattr(self, name)[indices, 0:n_samples]
+
+        buffer = self._sample_buffers[name]
+        offsets = self.buffer_offset[indices]
+        counts = np.minimum(self.buffer_count[indices],
+                            n_samples).astype(np.int64)
+        data = np.full((counts.shape[0], n_samples),
+                       self._fill_value(name), dtype=buffer.dtype)
+
+        # Gather the samples of all of the pings at once.  The samples are
+        # assigned to the unpadded part of the rows in row major order.
+        starts = np.cumsum(counts) - counts
+        sample_idx = np.repeat(offsets - starts, counts) + \
+                np.arange(np.sum(counts))
+        data[np.arange(n_samples) < counts[:, np.newaxis]] = \
+                buffer[sample_idx]
+
+        return data
 
 
     def get_power(self, **kwargs):
@@ -1673,12 +3904,23 @@ class RawData(PingData):
         # Populate it with time and ping number.
         p_data.ping_time = self.ping_time[return_indices].copy()
 
-        # Get a reference to the data we're operating on.
-        if hasattr(self, property_name):
-            data = getattr(self, property_name)
+        # Get a copy of the data we're operating on.  Ragged data are padded,
+        # compact power data are converted to power and packed angles are
+        # split and converted to electrical angles here.
+        if (self.packed_angles and self._has_sample_data('angles_packed') and
+                property_name in ['angles_alongship_e',
+                                  'angles_athwartship_e']):
+            data = self._unpack_angles(
+                    self._sample_array('angles_packed', return_indices),
+                    self.angle_sample_count[return_indices],
+                    alongship=property_name == 'angles_alongship_e')
+        elif self._has_sample_data(property_name):
+            data = self._sample_array(property_name, return_indices)
         else:
             raise AttributeError("The attribute name " + property_name +
                                  " does not exist.")
+        if property_name == 'power' and self.compact_power:
+            data = self._indexed_to_power(data)
 
         # Populate the calibration parameters required for this method.
         # First, create a dict with key names that match the attributes names
@@ -1706,8 +3948,7 @@ class RawData(PingData):
             # There are at least 2 different sample intervals in the data.  We
             # must resample the data.  We'll deal with adjusting sample offsets
             # here too.
-            (output, sample_interval) = self._vertical_resample(data[
-                                                            return_indices],
+            (output, sample_interval) = self._vertical_resample(data,
                     cal_parms['sample_interval'], unique_sample_interval,
                                                             resample_interval,
                     cal_parms['sample_offset'], min_sample_offset,
@@ -1718,13 +3959,13 @@ class RawData(PingData):
             if unique_sample_offsets.shape[0] > 1:
                 # We have multiple sample offsets so we need to shift some of
                 # the samples.
-                output = self._vertical_shift(data[return_indices],
+                output = self._vertical_shift(data,
                         cal_parms['sample_offset'], unique_sample_offsets,
                                               min_sample_offset)
             else:
                 # The data all have the same sample intervals and sample
-                # offsets.  Simply copy the data as is.
-                output = data[return_indices].copy()
+                # offsets.  The data were copied above so use them as is.
+                output = data
 
             # Get the sample interval value to use for range conversion below.
             sample_interval = unique_sample_interval[0]
@@ -1786,6 +4027,53 @@ class RawData(PingData):
         return p_data, return_indices
 
 
+    def _indexed_to_power(self, power):
+        """Converts indexed power values to power in dB.
+
+        Args:
+            power (array): An array of indexed power values. Elements equal
+                to POWER_FILL are empty.
+
+        Returns:
+            An array of power values with NaNs in the empty elements.
+        """
+
+        output = power.astype(self.sample_dtype) * \
+                np.array(self.INDEX2POWER, dtype=self.sample_dtype)
+        output[power == self.POWER_FILL] = np.nan
+
+        return output
+
+
+    def _unpack_angles(self, angles, sample_counts, alongship=True):
+        """Converts packed angle values to electrical angles.
+
+        Args:
+            angles (array): An array of packed angle values. The upper 8 bits
+                are the alongship angle and the lower 8 bits are the
+                athwartship angle.
+            sample_counts (array): The number of angle samples in each ping.
+                The samples after these are empty.
+            alongship (bool): Set to True to return the alongship angles and
+                False to return the athwartship angles.
+
+        Returns:
+            An array of electrical angles with NaNs in the empty elements.
+        """
+
+        if alongship:
+            indexed = (angles >> 8).astype('int8')
+        else:
+            indexed = (angles & 0xFF).astype('int8')
+
+        output = indexed.astype(self.sample_dtype) * \
+                np.array(self.INDEX2ELEC, dtype=self.sample_dtype)
+        output[np.arange(output.shape[1]) >= sample_counts[:, np.newaxis]] = \
+                np.nan
+
+        return output
+
+
     def _convert_power(
             self, power_data, calibration, convert_to, linear,
             return_indices, tvg_correction):
@@ -2087,18 +4375,28 @@ class RawData(PingData):
         self.transmit_mode = np.empty((n_pings), np.uint8)
         self.sample_offset =  np.empty((n_pings), np.uint32)
         self.sample_count = np.empty((n_pings), np.uint32)
-        if self.store_power:
-            self.power = np.empty(
-                (n_pings, n_samples),
-                dtype=self.sample_dtype, order='C')
-            self.n_samples = n_samples
-
-        if self.store_angles:
-            self.angles_alongship_e = np.empty(
-                (n_pings, n_samples), dtype=self.sample_dtype, order='C')
-            self.angles_athwartship_e = np.empty(
-                (n_pings, n_samples), dtype=self.sample_dtype, order='C')
-            self.n_samples = n_samples
+        if self.store_angles and self.packed_angles:
+            self.angle_sample_count = np.empty((n_pings), np.uint32)
+
+        # Create the sample data arrays.  Ragged sample buffers start with
+        # room for a single ping and grow as pings are appended.
+        sample_dtypes = {'angles_packed': np.uint16}
+        if self.compact_power:
+            sample_dtypes['power'] = np.int16
+        if self.ragged:
+            self.buffer_offset = np.empty((n_pings), np.int64)
+            self.buffer_count = np.empty((n_pings), np.uint32)
+            self._sample_buffers = {}
+            self._buffer_size = 0
+        for name in self._sample_attributes:
+            dtype = sample_dtypes.get(name, self.sample_dtype)
+            if self.ragged:
+                self._sample_buffers[name] = np.empty((n_samples), dtype=dtype)
+            else:
+                setattr(self, name, np.empty((n_pings, n_samples), dtype=dtype,
+                                             order='C'))
+        self.n_samples = n_samples
+        self._sample_slack = 0
 
         # Check if we should initialize them.
         if initialize:
@@ -2120,11 +4418,14 @@ class RawData(PingData):
             self.transmit_mode.fill(0)
             self.sample_offset.fill(0)
             self.sample_count.fill(0)
-            if self.store_power:
-                self.power.fill(np.nan)
-            if self.store_angles:
-                self.angles_alongship_e.fill(np.nan)
-                self.angles_athwartship_e.fill(np.nan)
+            if self.store_angles and self.packed_angles:
+                self.angle_sample_count.fill(0)
+            if self.ragged:
+                self.buffer_offset.fill(0)
+                self.buffer_count.fill(0)
+            else:
+                for name in self._sample_attributes:
+                    getattr(self, name).fill(self._fill_value(name))
 
 
     def __str__(self):
@@ -2139,27 +4440,44 @@ class RawData(PingData):
         # Print some more info about the EK60 instance.
         n_pings = len(self.ping_time)
         if n_pings > 0:
+            # The oldest ping of full rolling arrays can be anywhere in the
+            # arrays.
+            first = 0
+            last = n_pings - 1
+            ring_index = self._ring_index()
+            if self.rolling_array and ring_index.shape[0] > 0:
+                first = ring_index[0]
+                last = ring_index[-1]
             msg = msg + "                channel(s): ["
             for channel in self.channel_id:
                 msg = msg + channel + ", "
             msg = msg[0:-2] + "]\n"
             msg = msg + "    frequency (first ping): " + str(
-                self.frequency[0]) + "\n"
+                self.frequency[first]) + "\n"
             msg = msg + " pulse length (first ping): " + str(
-                self.pulse_length[0]) + "\n"
+                self.pulse_length[first]) + "\n"
             msg = msg + "           data start time: " + str(
-                self.ping_time[0]) + "\n"
+                self.ping_time[first]) + "\n"
             msg = msg + "             data end time: " + str(
-                self.ping_time[n_pings-1]) + "\n"
+                self.ping_time[last]) + "\n"
             msg = msg + "           number of pings: " + str(n_pings) + "\n"
-            if self.store_power:
-                n_pings,n_samples = self.power.shape
-                msg = msg + ("    power array dimensions: (" + str(n_pings) +
-                             "," + str(n_samples) + ")\n")
-            if self.store_angles:
-                n_pings,n_samples = self.angles_alongship_e.shape
-                msg = msg + ("    angle array dimensions: (" + str(n_pings) +
-                             "," + str(n_samples) + ")\n")
+            if self.ragged:
+                msg = msg + ("   sample array dimensions: (" + str(n_pings) +
+                             "," + str(self.n_samples) + ") ragged, " +
+                             str(self._buffer_size) + " samples stored\n")
+            else:
+                if self.store_power:
+                    n_pings,n_samples = self.power.shape
+                    msg = msg + ("    power array dimensions: (" +
+                                 str(n_pings) + "," + str(n_samples) + ")\n")
+                if self.store_angles and self.packed_angles:
+                    n_pings,n_samples = self.angles_packed.shape
+                    msg = msg + ("    angle array dimensions: (" +
+                                 str(n_pings) + "," + str(n_samples) + ")\n")
+                elif self.store_angles:
+                    n_pings,n_samples = self.angles_alongship_e.shape
+                    msg = msg + ("    angle array dimensions: (" +
+                                 str(n_pings) + "," + str(n_samples) + ")\n")
         else:
             msg = msg + "  RawData object contains no data\n"
 
@@ -2170,14 +4488,19 @@ class ChannelMetadata(object):
     """
     The ChannelMetadata class stores the channel configuration data as well as
     some metadata about the file. One of these is created for each channel for
-    every .raw file read.
+    every .raw file read. Consecutive files with the same configuration share
+    the transceiver configuration of the first of them.
 
     References to instances of these objects are stored in the RawData class.
     """
 
     def __init__(self, file, config_datagram, survey_name, transect_name,
                  sounder_name, version, start_ping, start_time,
-                 extended_configuration=None):
+                 extended_configuration=None, config_hash=None):
+
+        # Store the hash of the configuration datagrams this object was
+        # created from.
+        self.config_hash = config_hash
 
         # Split the filename.
         file = os.path.normpath(file).split(os.path.sep)
@@ -2194,14 +4517,29 @@ class ChannelMetadata(object):
 
         # We will replicate the ConfigurationHeader struct here, since there
         # is no better place to store it.
-        self.survey_name = ''
-        self.transect_name = ''
-        self.sounder_name = ''
-        self.version = ''
+        self.survey_name = survey_name
+        self.transect_name = transect_name
+        self.sounder_name = sounder_name
+        self.version = version
 
         # Store the ME70 extended configuration XML string.
         self.extended_configuration = extended_configuration
 
+        self.set_configuration(config_datagram)
+
+
+    def set_configuration(self, config_datagram):
+        """Sets the transceiver configuration properties.
+
+        Args:
+            config_datagram (dict): The transceiver configuration from the
+                CON0 datagram. The dictionary and the tables in it are shared,
+                not copied, so files with the same configuration can share it.
+        """
+
+        # Store the transceiver configuration these properties are set from.
+        self.transceiver = config_datagram
+
         # The GPT firmware version used when recording this data.
         self.gpt_firmware_version = config_datagram['gpt_software_version']
 
@@ -2386,3 +4724,28 @@ class CalibrationParameters(object):
         """
         pass
 
+
+def _read_raw_file(args):
+    """Reads a single file for EK60.read_raw when reading in parallel.
+
+    This function is run in the worker processes and must be defined at the
+    module level so it can be pickled.
+
+    Args:
+        args (tuple): A tuple (filename, options, n_pings) where options is a
+            dictionary of the EK60 read_* attributes and n_pings is the value
+            of the ping counter at the start of the file.
+
+    Returns:
+        The EK60 object containing the data read from the file.
+    """
+
+    filename, options, n_pings = args
+
+    reader = EK60()
+    for name, value in options.items():
+        setattr(reader, name, value)
+    reader.n_pings = n_pings
+    reader.read_raw(filename)
+
+    return reader
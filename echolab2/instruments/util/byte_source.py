@@ -0,0 +1,537 @@
+# coding=utf-8
+
+#     National Oceanic and Atmospheric Administration (NOAA)
+#     Alaskan Fisheries Science Center (AFSC)
+#     Resource Assessment and Conservation Engineering (RACE)
+#     Midwater Assessment and Conservation Engineering (MACE)
+
+#  THIS SOFTWARE AND ITS DOCUMENTATION ARE CONSIDERED TO BE IN THE PUBLIC DOMAIN
+#  AND THUS ARE AVAILABLE FOR UNRESTRICTED PUBLIC USE. THEY ARE FURNISHED "AS IS."
+#  THE AUTHORS, THE UNITED STATES GOVERNMENT, ITS INSTRUMENTALITIES, OFFICERS,
+#  EMPLOYEES, AND AGENTS MAKE NO WARRANTY, EXPRESS OR IMPLIED, AS TO THE USEFULNESS
+#  OF THE SOFTWARE AND DOCUMENTATION FOR ANY PURPOSE. THEY ASSUME NO RESPONSIBILITY
+#  (1) FOR THE USE OF THE SOFTWARE AND DOCUMENTATION; OR (2) TO PROVIDE TECHNICAL
+#  SUPPORT TO USERS.
+
+'''
+.. module:: echolab2.instruments.util.byte_source
+
+    :synopsis:  Byte range sources for reading raw files that aren't on a
+                local file system
+
+    Provides ByteRangeSource, the interface for objects that can read byte ranges
+    of a file, sources for in-memory buffers, seekable file objects (such as
+    members of zip and tar archives) and HTTP servers that support range requests,
+    and RangeSourceIO, a raw I/O stream that reads a source through a block cache
+    so it can be used with RawSimradFile.
+
+    Sources can be passed to RawSimradFile (and EK60.read_raw) in place of a path.
+    bytes, bytearray and memoryview objects are read as in-memory buffers.
+
+$Id$
+'''
+
+from io import RawIOBase, SEEK_SET, SEEK_CUR, SEEK_END
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import urllib.request
+
+__all__ = ['ByteRangeSource', 'BufferSource', 'FileObjectSource',
+           'HTTPRangeSource', 'RangeSourceIO', 'as_byte_source', 'source_name']
+
+log = logging.getLogger(__name__)
+
+
+def as_byte_source(obj):
+    '''
+    :param obj: a path, ByteRangeSource or bytes-like object
+
+    :returns: a ByteRangeSource or None
+
+    Returns obj as a ByteRangeSource.  bytes-like objects are wrapped in a
+    BufferSource.  None is returned for paths (and anything else).
+    '''
+
+    if isinstance(obj, ByteRangeSource):
+        return obj
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        return BufferSource(obj)
+
+    return None
+
+
+def source_name(obj):
+    '''
+    :param obj: a path, ByteRangeSource or bytes-like object
+
+    :returns: str
+
+    Returns the name of a file or source for display and metadata.
+    '''
+
+    source = as_byte_source(obj)
+    if source is not None:
+        return source.name
+
+    return obj
+
+
+class ByteRangeSource(object):
+    '''
+    The interface for objects that read byte ranges of a file.
+
+    Subclasses must implement size and read_range.  If read_range can be called
+    from more than one thread at a time, set concurrent to True so RangeSourceIO
+    can make requests in parallel.
+    '''
+
+    #: A name for the source, used in place of the file name
+    name = '<byte source>'
+
+    #: True if read_range is thread safe and benefits from concurrent requests
+    concurrent = False
+
+
+    def size(self):
+        '''
+        Returns the size of the file in bytes.
+        '''
+
+        raise NotImplementedError
+
+
+    def read_range(self, start, stop):
+        '''
+        :param start: offset of the first byte to read
+        :type start: int
+
+        :param stop: offset one past the last byte to read
+        :type stop: int
+
+        Returns the bytes from start up to (but not including) stop.  Fewer bytes
+        are returned if stop is past the end of the file.
+        '''
+
+        raise NotImplementedError
+
+
+    def close(self):
+        pass
+
+
+class BufferSource(ByteRangeSource):
+    '''
+    Reads byte ranges of an in-memory buffer.
+    '''
+
+    name = '<buffer>'
+
+
+    def __init__(self, buffer, name=None):
+        '''
+        :param buffer: the file data
+        :type buffer: bytes-like
+
+        :param name: name of the source
+        :type name: str
+        '''
+
+        self._view = memoryview(buffer).cast('B')
+        if name is not None:
+            self.name = name
+
+
+    def size(self):
+        return self._view.nbytes
+
+
+    def read_range(self, start, stop):
+        return self._view[start:stop].tobytes()
+
+
+class FileObjectSource(ByteRangeSource):
+    '''
+    Reads byte ranges of a seekable binary file object, for example a member of
+    a zip archive opened with ZipFile.open or a tar member opened with
+    TarFile.extractfile.
+    '''
+
+    name = '<file object>'
+
+
+    def __init__(self, fileobj, name=None):
+        '''
+        :param fileobj: a seekable file object opened in binary mode
+
+        :param name: name of the source, defaults to the name of the file object
+        :type name: str
+        '''
+
+        self._fileobj = fileobj
+        self._lock = threading.Lock()
+        if name is None:
+            name = getattr(fileobj, 'name', None)
+        if name is not None:
+            self.name = str(name)
+
+
+    def size(self):
+
+        with self._lock:
+            pos = self._fileobj.tell()
+            size = self._fileobj.seek(0, SEEK_END)
+            self._fileobj.seek(pos, SEEK_SET)
+
+        return size
+
+
+    def read_range(self, start, stop):
+
+        with self._lock:
+            self._fileobj.seek(start, SEEK_SET)
+            return self._fileobj.read(max(stop - start, 0))
+
+
+    def close(self):
+        self._fileobj.close()
+
+
+class HTTPRangeSource(ByteRangeSource):
+    '''
+    Reads byte ranges of a file from an HTTP(S) server using range requests.
+    This works with object stores that serve files over HTTP (e.g. pre-signed
+    or public S3 and Google Cloud Storage URLs).
+
+    If the server doesn't support range requests, the whole file is downloaded
+    by the first request and the ranges are read from memory.
+    '''
+
+    concurrent = True
+
+
+    def __init__(self, url, headers=None, timeout=60):
+        '''
+        :param url: URL of the file
+        :type url: str
+
+        :param headers: extra headers sent with every request (e.g. authorization)
+        :type headers: dict
+
+        :param timeout: request timeout in seconds
+        :type timeout: float
+        '''
+
+        self.url = url
+        self.name = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self._size = None
+
+        #  the whole file, if the server ignores range requests
+        self._data = None
+        self._lock = threading.Lock()
+
+
+    def _request(self, method='GET', byte_range=None):
+
+        headers = dict(self.headers)
+        if byte_range is not None:
+            headers['Range'] = 'bytes=%d-%d' % byte_range
+        request = urllib.request.Request(self.url, headers=headers, method=method)
+
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+
+    def _keep_data(self, data):
+        '''
+        Keeps the whole file sent by a server that ignored a range request.
+        '''
+
+        with self._lock:
+            if self._data is None:
+                log.warning('%s does not support range requests, the whole ' +
+                        'file is read into memory', self.url)
+                self._data = data
+                self._size = len(data)
+
+
+    def size(self):
+
+        if self._size is None:
+            #  a one byte range request returns the size and tells us if the
+            #  server supports range requests
+            with self._request(byte_range=(0, 0)) as response:
+                if response.status != 206:
+                    self._keep_data(response.read())
+                    return self._size
+                length = response.headers['Content-Range'].split('/')[-1]
+            if length == '*':
+                with self._request('HEAD') as response:
+                    length = response.headers['Content-Length']
+            self._size = int(length)
+
+        return self._size
+
+
+    def read_range(self, start, stop):
+
+        if self._data is not None:
+            return self._data[start:stop]
+        if stop <= start:
+            return b''
+
+        with self._request(byte_range=(start, stop - 1)) as response:
+            data = response.read()
+            if response.status != 206:
+                #  the server ignored the range and sent the whole file
+                self._keep_data(data)
+                data = self._data[start:stop]
+
+        return data
+
+
+class RangeSourceIO(RawIOBase):
+    '''
+    A raw I/O stream that reads a ByteRangeSource.
+
+    Data are read in BLOCK_SIZE blocks which are kept in a least recently used
+    cache of CACHE_BLOCKS blocks.  When a block is read, the following
+    READ_AHEAD_BLOCKS blocks are requested in the background.  Runs of blocks
+    that have to be read are coalesced into requests of up to MAX_REQUEST_SIZE
+    bytes and, for concurrent sources, up to MAX_REQUESTS requests are made at a
+    time.
+    '''
+
+    #: Size of the cached blocks in bytes
+    BLOCK_SIZE = 256*1024
+
+    #: Maximum number of blocks kept in the cache
+    CACHE_BLOCKS = 64
+
+    #: Number of blocks requested ahead of the read position
+    READ_AHEAD_BLOCKS = 8
+
+    #: Maximum size of a single request in bytes
+    MAX_REQUEST_SIZE = 1024*1024
+
+    #: Maximum number of concurrent requests
+    MAX_REQUESTS = 4
+
+    #: Ranges passed to read_ranges that are this close are read with one request
+    COALESCE_GAP = 64*1024
+
+
+    def __init__(self, source, closefd=True):
+        '''
+        :param source: the byte source to read
+        :type source: ByteRangeSource
+
+        :param closefd: close the source when the stream is closed
+        :type closefd: bool
+        '''
+
+        RawIOBase.__init__(self)
+
+        self.source = source
+        self.name = source.name
+        self._closefd = closefd
+        self._pos = 0
+        self._size = None
+
+        #  cache entries are (future, offset) tuples where offset is the offset of
+        #  the block in the data returned by the future
+        self._cache = OrderedDict()
+        self._executor = None
+
+
+    def readable(self):
+        return True
+
+
+    def seekable(self):
+        return True
+
+
+    def size(self):
+        '''
+        Returns the size of the source in bytes.
+        '''
+
+        if self._size is None:
+            self._size = int(self.source.size())
+
+        return self._size
+
+
+    def tell(self):
+        return self._pos
+
+
+    def seek(self, offset, whence=SEEK_SET):
+
+        if whence == SEEK_SET:
+            pos = offset
+        elif whence == SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == SEEK_END:
+            pos = self.size() + offset
+        else:
+            raise ValueError('Illegal value for \'whence\' (%s)' % (str(whence)))
+
+        if pos < 0:
+            raise ValueError('Negative seek position %d' % pos)
+        self._pos = pos
+
+        return pos
+
+
+    def readinto(self, b):
+
+        view = memoryview(b).cast('B')
+        end = min(self._pos + len(view), self.size())
+        if end <= self._pos:
+            return 0
+
+        first = self._pos // self.BLOCK_SIZE
+        last = (end - 1) // self.BLOCK_SIZE
+        self._request_blocks(first, last)
+
+        n_read = 0
+        for block_number in range(first, last + 1):
+            block = self._get_block(block_number)
+            start = self._pos - block_number * self.BLOCK_SIZE
+            data = block[start:start + end - self._pos]
+            view[n_read:n_read + len(data)] = data
+            n_read += len(data)
+            self._pos += len(data)
+            if start + len(data) < len(block) or len(data) == 0:
+                break
+
+        self._trim_cache()
+
+        return n_read
+
+
+    def read_ranges(self, ranges):
+        '''
+        :param ranges: (start, stop) byte ranges to read
+        :type ranges: list
+
+        :returns: list of bytes
+
+        Reads a list of byte ranges without moving the stream position.  Ranges
+        within COALESCE_GAP bytes of each other are read with a single request and
+        the requests are made concurrently.
+        '''
+
+        order = sorted(range(len(ranges)), key=lambda i: ranges[i])
+
+        requests = []
+        for i in order:
+            start, stop = ranges[i]
+            if (requests and start - requests[-1][1] <= self.COALESCE_GAP and
+                    stop - requests[-1][0] <= self.MAX_REQUEST_SIZE):
+                requests[-1][1] = max(requests[-1][1], stop)
+                requests[-1][2].append(i)
+            else:
+                requests.append([start, stop, [i]])
+
+        futures = [self._submit(start, stop) for start, stop, _ in requests]
+
+        data = [None] * len(ranges)
+        for (start, stop, indices), future in zip(requests, futures):
+            request_data = future.result()
+            for i in indices:
+                data[i] = request_data[ranges[i][0] - start:ranges[i][1] - start]
+
+        return data
+
+
+    def close(self):
+
+        if not self.closed:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self._cache.clear()
+            if self._closefd:
+                self.source.close()
+
+        RawIOBase.close(self)
+
+
+    def _submit(self, start, stop):
+        '''
+        Requests the bytes from start to stop.  Returns a Future.
+        '''
+
+        if self.source.concurrent:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.MAX_REQUESTS)
+            return self._executor.submit(self.source.read_range, start, stop)
+
+        future = Future()
+        try:
+            future.set_result(self.source.read_range(start, stop))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+
+    def _request_blocks(self, first, last):
+        '''
+        Requests the blocks from first to last, that aren't in the cache, and the
+        read ahead blocks that follow them.
+        '''
+
+        n_blocks = (self.size() + self.BLOCK_SIZE - 1) // self.BLOCK_SIZE
+        blocks = range(first, min(last + self.READ_AHEAD_BLOCKS, n_blocks - 1) + 1)
+
+        #  coalesce runs of missing blocks into requests
+        max_run = max(self.MAX_REQUEST_SIZE // self.BLOCK_SIZE, 1)
+        runs = []
+        for block_number in blocks:
+            if block_number in self._cache:
+                continue
+            if (runs and runs[-1][-1] == block_number - 1 and
+                    len(runs[-1]) < max_run):
+                runs[-1].append(block_number)
+            else:
+                runs.append([block_number])
+
+        for run in runs:
+            start = run[0] * self.BLOCK_SIZE
+            future = self._submit(start, min((run[-1] + 1) * self.BLOCK_SIZE,
+                    self.size()))
+            for block_number in run:
+                self._cache[block_number] = (future, block_number *
+                        self.BLOCK_SIZE - start)
+
+        #  keep the blocks we're reading at the end of the cache
+        for block_number in range(first, last + 1):
+            self._cache.move_to_end(block_number)
+
+
+    def _get_block(self, block_number):
+        '''
+        Returns the data of a cached block, waiting for it if needed.
+        '''
+
+        future, offset = self._cache[block_number]
+        try:
+            data = future.result()
+        except Exception:
+            #  don't keep failed requests around
+            del self._cache[block_number]
+            raise
+
+        return memoryview(data)[offset:offset + self.BLOCK_SIZE]
+
+
+    def _trim_cache(self):
+
+        while len(self._cache) > self.CACHE_BLOCKS:
+            self._cache.popitem(last=False)
@@ -43,6 +43,7 @@ $Id$
 import datetime
 from pytz import utc as pytz_utc
 import logging
+import numpy as np
 
 
 #NT epoch is Jan 1st 1601
@@ -52,7 +53,13 @@ UTC_UNIX_EPOCH = datetime.datetime(1970, 1, 1, 0, 0, 0, tzinfo=pytz_utc)
 
 EPOCH_DELTA_SECONDS = (UTC_UNIX_EPOCH - UTC_NT_EPOCH).total_seconds()
 
-__all__ = ['nt_to_unix', 'unix_to_nt']
+#Number of 100ns NT intervals between the NT and Unix epochs
+EPOCH_DELTA_NT = 116444736000000000
+
+#Number of NT intervals in the datetime64 units we convert to
+_NT_INTERVALS = {'ms': 10000, 'us': 10}
+
+__all__ = ['nt_to_unix', 'unix_to_nt', 'nt_to_datetime64', 'datetime64_to_nt']
 
 log = logging.getLogger(__name__)
 
@@ -132,6 +139,56 @@ def unix_to_nt(unix_timestamp):
     return lowDateTime, highDateTime
 
 
+def nt_to_datetime64(low_date, high_date, unit='ms'):
+    '''
+    :param low_date: least significant 32 bits of the NT date
+    :type low_date: int or array of uint32
+
+    :param high_date: most significant 32 bits of the NT date
+    :type high_date: int or array of uint32
+
+    :param unit: datetime64 unit of the result, 'ms', 'us' or 'ns'
+    :type unit: str
+
+    Returns the NT date(s) as numpy datetime64 values.  This is the vectorized
+    counterpart of nt_to_unix.  The conversion uses integer arithmetic so it works
+    on whole arrays of datagram headers at once and doesn't lose precision.  Times
+    are truncated to the requested unit.
+
+    >>> nt_to_datetime64(19496896, 30196149)
+    numpy.datetime64('2011-12-23T20:54:03.964')
+    '''
+
+    nt_time = ((np.asarray(high_date).astype('int64') << 32) +
+            np.asarray(low_date).astype('int64') - EPOCH_DELTA_NT)
+
+    if unit == 'ns':
+        unix_time = nt_time * 100
+    else:
+        unix_time = nt_time // _NT_INTERVALS[unit]
+
+    return unix_time.astype('datetime64[%s]' % unit)
+
+
+def datetime64_to_nt(times):
+    '''
+    :param times: time(s) to convert
+    :type times: numpy datetime64 or array of datetime64
+
+    Returns a (low_date, high_date) tuple of uint32 values or arrays.  This is the
+    vectorized counterpart of unix_to_nt.
+
+    >>> datetime64_to_nt(np.datetime64('2011-12-23T20:54:03.964'))
+    (19496896, 30196149)
+    '''
+
+    nt_time = (np.asarray(times).astype('datetime64[ns]').astype('int64') // 100 +
+            EPOCH_DELTA_NT)
+
+    return ((nt_time & 0xFFFFFFFF).astype('uint32'),
+            (nt_time >> 32).astype('uint32'))
+
+
 def unix_to_datetime(unix_timestamp):
     '''
     :param unix_timestamp: Number of seconds since unix epoch (1/1/1970)
@@ -34,15 +34,68 @@
 $Id$
 '''
 
-from io import BufferedReader, FileIO, SEEK_SET, SEEK_CUR, SEEK_END
+from io import BufferedReader, BufferedWriter, FileIO, SEEK_SET, SEEK_CUR, SEEK_END, DEFAULT_BUFFER_SIZE
+import mmap
+import os
 import struct
 import logging
+import bisect
+import threading
+import time
+import zlib
+import bz2
+import lzma
+import numpy as np
 from . import parsers
+from .byte_source import RangeSourceIO, as_byte_source
 
-__all__ = ['RawSimradFile']
+__all__ = ['RawSimradFile', 'RawSimradMmapFile', 'RawSimradCompressedFile',
+           'RawFilePrefetcher']
 
 log = logging.getLogger(__name__)
 
+#: Leading bytes of the supported compressed file formats
+COMPRESSION_MAGIC = {'gzip': b'\x1f\x8b',
+                     'bz2': b'BZh',
+                     'xz': b'\xfd7zXZ\x00'}
+
+
+def compression_type(name):
+    '''
+    :param name: path to a file or a byte source
+    :type name: str
+
+    :returns: 'gzip', 'bz2', 'xz' or None
+
+    Identifies compressed files by their leading bytes.  None is returned for
+    uncompressed files and files that can't be read.
+    '''
+
+    source = as_byte_source(name)
+    try:
+        if source is not None:
+            magic = source.read_range(0, 6)
+        else:
+            with open(name, 'rb') as fh:
+                magic = fh.read(6)
+    except (IOError, OSError):
+        return None
+
+    for compression, compression_magic in COMPRESSION_MAGIC.items():
+        if magic.startswith(compression_magic):
+            return compression
+
+    return None
+
+
+class FilteredRawDatagram(bytes):
+    '''
+    The header of a RAW datagram rejected by RawSimradFile.raw_filter.  Its
+    sample data were skipped.  Datagrams decoded from it have their 'filtered'
+    key set to True.
+    '''
+
+
 class SimradEOF(Exception):
 
     def __init__(self, message='EOF Reached!'):
@@ -94,7 +147,8 @@ class RawSimradFile(BufferedReader):
     A low-level extension of the built in python file object allowing the reading/writing
     of SIMRAD RAW files on datagram by datagram basis (instead of at the byte level)
 
-
+    Files can also be read from a ByteRangeSource (see byte_source) or a bytes-like
+    object by passing it in place of the file name.
     '''
     #: Dict object with datagram header/python class key/value pairs
     DGRAM_TYPE_KEY = {'RAW': parsers.SimradRawParser(),
@@ -105,20 +159,120 @@ class RawSimradFile(BufferedReader):
                       'DEP': parsers.SimradDepthParser()}
 
 
+    #: Extension appended to the .raw file name to form the sidecar index name
+    INDEX_EXTENSION = '.idx'
+
+    #: Version of the sidecar index format.  Bump this if INDEX_DTYPE changes.
+    INDEX_VERSION = 1
+
+    #: Layout of a single datagram index entry.  channel and count are only
+    #: valid for RAW datagrams and are set to -1 for all other types.
+    INDEX_DTYPE = np.dtype([('offset', 'i8'),
+                            ('type', 'S4'),
+                            ('low_date', 'u4'),
+                            ('high_date', 'u4'),
+                            ('channel', 'i2'),
+                            ('count', 'i4')])
+
+    #: Byte offset of the sample count within a RAW0 datagram (after the
+    #: leading datagram size field)
+    _RAW_COUNT_OFFSET = 4 + parsers.SimradRawParser().header_size() - 4
+
+    #: Number of bytes read at a time when searching for the next valid datagram
+    RESYNC_WINDOW = 1024*1024
+
+    #: True if any part of the file can be read without reading the data before
+    #: it.  seek_time and peek_tail only save time for these files.
+    random_access = True
+
+    #: Largest datagram size considered plausible when resynchronizing
+    MAX_DGRAM_SIZE = 16*1024*1024
+
+    #: Range of plausible datagram timestamps (NT time) used when resynchronizing.
+    #: These are 1980-01-01 and 2100-01-01.
+    MIN_NT_TIME = 119600064000000000
+    MAX_NT_TIME = 157469184000000000
+
+
+    def __new__(cls, name, *args, **kwargs):
+
+        #  compressed files are read with RawSimradCompressedFile.  This includes
+        #  requests for a RawSimradMmapFile since compressed data can't be mapped.
+        #  Byte sources can't be mapped either and are read with RawSimradFile.
+        reading = 'r' in kwargs.get('mode', args[0] if args else 'rb')
+        if (reading and not issubclass(cls, RawSimradCompressedFile) and
+                compression_type(name) is not None):
+            new_cls = RawSimradCompressedFile
+        elif (reading and issubclass(cls, RawSimradMmapFile) and
+                as_byte_source(name) is not None):
+            new_cls = RawSimradFile
+        else:
+            return BufferedReader.__new__(cls)
+
+        fid = BufferedReader.__new__(new_cls)
+        if not issubclass(new_cls, cls):
+            #  Python only calls __init__ for instances of cls
+            fid.__init__(name, *args, **kwargs)
+        return fid
+
+
     def __init__(self, name, mode='rb', closefd=True, return_raw=False, buffer_size=1024*1024):
 
         #  9-28-18 RHT: Changed RawSimradFile to implement BufferedReader instead of
         #  io.FileIO to increase performance.
 
-        #  create a raw file object for the buffered reader
-        fio = FileIO(name, mode=mode, closefd=closefd)
+        #  create a raw file object for the buffered reader.  BufferedReader
+        #  requires a readable file so files opened for writing are opened for
+        #  reading and writing.
+        #  Byte sources (and bytes-like objects) are read through a RangeSourceIO
+        #  instead of a FileIO.  Sources belong to the caller and are left open
+        #  since they may be opened more than once.
+        writing = any([m in mode for m in 'wax'])
+        self._source = as_byte_source(name)
+        if self._source is not None:
+            if writing:
+                raise ValueError('Byte sources can only be opened for reading')
+            fio = RangeSourceIO(self._source, closefd=False)
+            name = self._source.name
+        else:
+            if writing:
+                mode = mode.replace('+', '') + '+'
+            fio = FileIO(name, mode=mode, closefd=closefd)
 
         #  initialize the superclass
         BufferedReader.__init__(self, fio, buffer_size=buffer_size)
+
+        #  datagrams are written through a separate buffered writer
+        if writing:
+            self._writer = BufferedWriter(fio, buffer_size=buffer_size)
+        else:
+            self._writer = None
         self._current_dgram_offset = 0
         self._total_dgram_count = None
         self._return_raw = return_raw
 
+        #  keep the path around so we can find our sidecar index
+        self._filename = name
+        self._index = None
+
+        #  raw_filter can be set to a callable that is passed the decoded header
+        #  of each RAW datagram (as a dict).  If it returns False, the sample data
+        #  are skipped and the datagram is returned with only its header and its
+        #  'filtered' key set to True.
+        self.raw_filter = None
+
+        #  sample_window can be set to a (start_sample, stop_sample, power, angles)
+        #  tuple to only read samples start_sample up to (but not including)
+        #  stop_sample of RAW datagrams.  stop_sample can be None to read to the
+        #  last sample.  power and angles control whether those sample blocks are
+        #  read.  The datagrams are returned with their offset, count and mode
+        #  fields updated to describe the samples that were read.
+        self.sample_window = None
+
+        #  stats can be set to a ReadStats object to count the datagrams and bytes
+        #  read and time the reading and parsing of the datagrams.
+        self.stats = None
+
 
     def _seek_bytes(self, bytes_, whence=0):
         '''
@@ -141,6 +295,15 @@ class RawSimradFile(BufferedReader):
         return BufferedReader.tell(self)
 
 
+    def _file_pos(self):
+        '''
+        Returns the position of the reader in the file on disk in bytes.  This
+        is the position in the compressed data for compressed files.
+        '''
+
+        return BufferedReader.tell(self)
+
+
     def _read_dgram_size(self):
         '''
         Attempts to read the size of the next datagram in the file.
@@ -211,7 +374,8 @@ class RawSimradFile(BufferedReader):
         else:
             dgram_type = buf
 
-        dgram_type = dgram_type.decode()
+        #  decode as latin_1 so garbage bytes in damaged files don't raise here
+        dgram_type = dgram_type.decode('latin_1')
 
         lowDateField, highDateField = self._read_timestamp()
 
@@ -226,6 +390,15 @@ class RawSimradFile(BufferedReader):
         return BufferedReader.read(self, k)
 
 
+    def _read_buffer(self, k):
+        '''
+        Reads the raw bytes of a datagram body.  Subclasses can override this to
+        return a buffer (such as a memoryview) without copying the data.
+        '''
+
+        return self._read_bytes(k)
+
+
     def _read_next_dgram(self):
         '''
         Attempts to read the next datagram from the file.
@@ -233,71 +406,193 @@ class RawSimradFile(BufferedReader):
         Returns the datagram as a raw string
         '''
 
-        old_file_pos = self._tell_bytes()
+        if self.stats is not None:
+            start_time = time.perf_counter()
 
-        #  We've come across one instance where the timestamp is (0L, 0L)
-        #  So... now we check every single datagram for this and skip if needed
+        #  Invalid datagrams are skipped by resynchronizing and trying again.  This
+        #  is done in a loop (and not recursively) since damaged files can contain
+        #  long runs of bad datagrams.
+        first_pass = True
+        while True:
 
-        try:
-            # _, dgram_type, (low_date, high_date) = self.peek()[:3]
-            header = self.peek()
+            #  every pass after the first is the result of an invalid datagram
+            if not first_pass and self.stats is not None:
+                self.stats.corrupt += 1
+            first_pass = False
 
-        except DatagramReadError as e:
-            e.message = 'Short read while getting raw file datagram header'
-            raise e
+            old_file_pos = self._tell_bytes()
 
-        if (header['low_date'], header['high_date']) == (0, 0):
-            log.warning('Skipping %s datagram w/ timestamp of (0, 0) at %sL:%d', header['type'], str(self._tell_bytes()), self.tell())
-            self.skip()
-            return self._read_next_dgram()
+            #  We've come across one instance where the timestamp is (0L, 0L)
+            #  So... now we check every single datagram for this and skip if needed
 
-        # _ = self._read_dgram_size()
-        self._seek_bytes(4, SEEK_CUR)
+            try:
+                # _, dgram_type, (low_date, high_date) = self.peek()[:3]
+                header = self.peek()
 
-        if header['size'] < 16:
-            log.warning('Invalid datagram header: size: %d, type: %s, nt_date: %s.  dgram_size < 16',
-                header['size'], header['type'], str((header['low_date'], header['high_date'])))
+            except DatagramReadError as e:
+                e.message = 'Short read while getting raw file datagram header'
+                raise e
 
-            self._find_next_datagram()
-            return self._read_next_dgram()
+            if (header['low_date'], header['high_date']) == (0, 0):
+                log.warning('Skipping %s datagram w/ timestamp of (0, 0) at %sL:%d', header['type'], str(self._tell_bytes()), self.tell())
+                self.skip()
+                continue
+
+            # _ = self._read_dgram_size()
+            self._seek_bytes(4, SEEK_CUR)
+
+            if not header['type'].isalnum():
+                log.warning('Invalid datagram header: type: %s @ %d', repr(header['type']),
+                    old_file_pos)
+
+                self._find_next_datagram(old_file_pos + 1)
+                continue
+
+            if header['size'] < 16:
+                log.warning('Invalid datagram header: size: %d, type: %s, nt_date: %s.  dgram_size < 16',
+                    header['size'], header['type'], str((header['low_date'], header['high_date'])))
+
+                self._find_next_datagram(old_file_pos + 1)
+                continue
+
+
+            #  If we have a RAW datagram filter or sample window, decode the RAW
+            #  header and skip past the sample data of the datagrams that are
+            #  rejected or only read the samples within the window.  Rejected
+            #  datagrams are returned as a FilteredRawDatagram header.
+            raw_dgram = None
+            if ((self.raw_filter is not None or self.sample_window is not None) and
+                    header['type'].startswith('RAW')):
+                raw_parser = self.DGRAM_TYPE_KEY['RAW']
+                header_size = raw_parser.header_size()
+                raw_header = self._read_bytes(min(header_size, header['size']))
+                if len(raw_header) == header_size:
+                    raw_values = raw_parser.header_from_string(raw_header)
+                    if self.raw_filter is not None and not self.raw_filter(raw_values):
+                        raw_dgram = FilteredRawDatagram(raw_header)
+                        self._seek_bytes(header['size'] - header_size, SEEK_CUR)
+                    elif self.sample_window is not None:
+                        raw_dgram = self._read_sample_window(raw_header, raw_values,
+                                header['size'])
+                if raw_dgram is None:
+                    self._seek_bytes(-len(raw_header), SEEK_CUR)
+
+            if raw_dgram is None:
+                raw_dgram = self._read_buffer(header['size'])
+                bytes_read = len(raw_dgram)
+            else:
+                bytes_read = header['size']
 
+            if bytes_read < header['size']:
+                #self._seek_bytes(old_file_pos, SEEK_SET)
+                #raise DatagramReadError('Short read while getting dgram data',
+                #                        (header['size'], len(raw_dgram)), (old_file_pos, self.tell()))
+                log.warning('Datagram %d (@%d) shorter than expected length:  %d < %d', self.tell(),
+                            old_file_pos, bytes_read, header['size'])
+                self._find_next_datagram(old_file_pos + 1)
+                continue
 
-        raw_dgram = self._read_bytes(header['size'])
-        bytes_read = len(raw_dgram)
+            try:
+                dgram_size_check = self._read_dgram_size()
 
-        if bytes_read < header['size']:
-            #self._seek_bytes(old_file_pos, SEEK_SET)
-            #raise DatagramReadError('Short read while getting dgram data',
-            #                        (header['size'], len(raw_dgram)), (old_file_pos, self.tell()))
-            log.warning('Datagram %d (@%d) shorter than expected length:  %d < %d', self.tell(),
-                        old_file_pos, bytes_read, header['size'])
-            self._find_next_datagram()
-            return self._read_next_dgram()
+            except DatagramReadError as e:
+                self._seek_bytes(old_file_pos, SEEK_SET)
+                e.message = 'Short read while getting trailing raw file datagram size for check'
+                raise e
 
-        try:
-            dgram_size_check = self._read_dgram_size()
+            if header['size'] != dgram_size_check:
+                # self._seek_bytes(old_file_pos, SEEK_SET)
+                log.warning('Datagram failed size check:  %d != %d @ (%d, %d)',
+                    header['size'], dgram_size_check, self._tell_bytes(), self.tell())
+                log.warning('Skipping to next datagram...')
+                self._find_next_datagram(old_file_pos + 1)
+                continue
+
+            if self.stats is not None:
+                self.stats.add_datagram(header['type'], len(raw_dgram) + 8)
+                parse_start = time.perf_counter()
+                self.stats.io_time += parse_start - start_time
+
+            if self._return_raw:
+                self._current_dgram_offset += 1
+                return raw_dgram
+            else:
+                nice_dgram = self._convert_raw_datagram(raw_dgram)
+                self._current_dgram_offset += 1
+                if self.stats is not None:
+                    self.stats.parse_time += time.perf_counter() - parse_start
+                return nice_dgram
 
-        except DatagramReadError as e:
-            self._seek_bytes(old_file_pos, SEEK_SET)
-            e.message = 'Short read while getting trailing raw file datagram size for check'
-            raise e
-
-        if header['size'] != dgram_size_check:
-            # self._seek_bytes(old_file_pos, SEEK_SET)
-            log.warning('Datagram failed size check:  %d != %d @ (%d, %d)',
-                header['size'], dgram_size_check, self._tell_bytes(), self.tell())
-            log.warning('Skipping to next datagram...')
-            self._find_next_datagram()
 
-            return self._read_next_dgram()
+    def _read_sample_window(self, raw_header, raw_values, dgram_size):
+        '''
+        :param raw_header: the RAW datagram header
+        :type raw_header: bytes
 
-        if self._return_raw:
-            self._current_dgram_offset += 1
-            return raw_dgram
-        else:
-            nice_dgram = self._convert_raw_datagram(raw_dgram)
-            self._current_dgram_offset += 1
-            return nice_dgram
+        :param raw_values: the decoded RAW datagram header
+        :type raw_values: dict
+
+        :param dgram_size: size of the datagram body
+        :type dgram_size: int
+
+        Reads the samples within sample_window from the sample blocks of the RAW
+        datagram whose header has just been read.  Returns the header, with the
+        offset, count and mode fields updated, followed by the samples that were
+        read.  The file pointer is left at the end of the datagram body.  None is
+        returned (and the file pointer is not moved) if the sample blocks don't fit
+        the datagram size or the datagram is truncated.
+        '''
+
+        start_sample, stop_sample, read_power, read_angles = self.sample_window
+        raw_parser = self.DGRAM_TYPE_KEY['RAW']
+        header_size = len(raw_header)
+        count = max(raw_values['count'], 0)
+        mode = raw_values['mode']
+
+        n_blocks = (mode & 1) + ((mode & 2) >> 1)
+        if header_size + 2 * count * n_blocks != dgram_size:
+            return None
+
+        first = min(start_sample, count)
+        last = count if stop_sample is None else min(max(stop_sample, first), count)
+        n_samples = last - first
+
+        body_pos = self._tell_bytes() - header_size
+        block_pos = body_pos + header_size
+        samples = []
+        new_mode = 0
+        if mode & 1:
+            if read_power:
+                self._seek_bytes(block_pos + 2 * first, SEEK_SET)
+                samples.append(self._read_bytes(2 * n_samples))
+                new_mode |= 1
+            block_pos += 2 * count
+        if mode & 2 and read_angles:
+            self._seek_bytes(block_pos + 2 * first, SEEK_SET)
+            samples.append(self._read_bytes(2 * n_samples))
+            new_mode |= 2
+
+        #  Check that the whole datagram, including the trailing size, is there.
+        self._seek_bytes(body_pos + dgram_size, SEEK_SET)
+        n_trailing = len(self._read_bytes(4))
+        if (n_trailing < 4 or
+                sum(len(x) for x in samples) < 2 * n_samples * len(samples)):
+            self._seek_bytes(body_pos + header_size, SEEK_SET)
+            return None
+        self._seek_bytes(-4, SEEK_CUR)
+
+        #  Pings without any samples to read are kept with a sample count of 0.
+        if new_mode == 0:
+            n_samples = 0
+
+        fields = raw_parser.header_dtype().fields
+        raw_header = bytearray(raw_header)
+        struct.pack_into('=h', raw_header, fields['mode'][1], new_mode)
+        struct.pack_into('=l', raw_header, fields['offset'][1],
+                raw_values['offset'] + start_sample)
+        struct.pack_into('=l', raw_header, fields['count'][1], n_samples)
+
+        return b''.join([bytes(raw_header)] + samples)
 
 
     def _convert_raw_datagram(self, raw_datagram_string):
@@ -309,7 +604,7 @@ class RawSimradFile(BufferedReader):
         Returns a formated datagram object using the data in raw_datagram_string
         '''
 
-        dgram_type = raw_datagram_string[:3].decode()
+        dgram_type = bytes(raw_datagram_string[:3]).decode()
         try:
             parser = self.DGRAM_TYPE_KEY[dgram_type]
         except KeyError:
@@ -318,6 +613,8 @@ class RawSimradFile(BufferedReader):
 
 
         nice_dgram = parser.from_string(raw_datagram_string)
+        if isinstance(raw_datagram_string, FilteredRawDatagram):
+            nice_dgram['filtered'] = True
         return nice_dgram
 
 
@@ -455,15 +752,292 @@ class RawSimradFile(BufferedReader):
         return dgram_list
 
 
-    def _find_next_datagram(self):
+    def read_batch(self, k):
+        '''
+        :param k: Maximum number of datagrams to read
+        :type k: int
+
+        Reads up to the next k datagrams and returns them as a list.  Runs of
+        RAW datagrams are decoded in bulk using SimradRawParser.from_strings.
+        An empty list is returned at the end of the file.
+        '''
+
+        raw_dgrams = []
+        return_raw = self._return_raw
+        self._return_raw = True
+        try:
+            for m in range(k):
+                try:
+                    raw_dgrams.append(self._read_next_dgram())
+                except Exception:
+                    #  mirror read(1) - errors before the end of the file are
+                    #  only raised if we don't have anything to return.
+                    if len(raw_dgrams) == 0 and not self.at_eof():
+                        raise
+                    break
+        finally:
+            self._return_raw = return_raw
+
+        return self._convert_batch(raw_dgrams)
+
+
+    def read_complete(self):
+        '''
+        Reads all of the complete datagrams from the current position to the end of
+        the file and returns them as a list.  This is intended for files that are
+        still being written.  A partially written datagram at the end of the file
+        is not read and the file pointer is left at its start so it can be read by a
+        later call once the rest of it has been written.  Like read_batch, runs
+        of RAW datagrams are decoded in bulk.
+        '''
+
+        raw_dgrams = []
+        return_raw = self._return_raw
+        self._return_raw = True
+        try:
+            #  get the current size of the file.  It may have grown since we opened it.
+            file_size = self._data_size()
+
+            while self.dgram_complete(file_size):
+                try:
+                    raw_dgrams.append(self._read_next_dgram())
+                except SimradEOF:
+                    break
+        finally:
+            self._return_raw = return_raw
+
+        return self._convert_batch(raw_dgrams)
+
+
+    def dgram_complete(self, file_size=None):
+        '''
+        :param file_size: Size of the file in bytes.  The current size is used if None.
+        :type file_size: int
+
+        Returns True if the datagram at the current position has been completely
+        written to the file.  Datagrams with an implausible size are reported as
+        complete so that reading them will resync.
+        '''
+
+        if file_size is None:
+            file_size = self._data_size()
+
+        dgram_pos = self._tell_bytes()
+        if dgram_pos + 4 > file_size:
+            return False
+
+        dgram_size = self._read_dgram_size()
+        self._seek_bytes(dgram_pos, SEEK_SET)
+        if 16 <= dgram_size <= self.MAX_DGRAM_SIZE:
+            return dgram_pos + dgram_size + 8 <= file_size
+
+        return True
+
+
+    def _data_size(self):
+        '''
+        Returns the current size of the file data in bytes.
+        '''
+
+        if self._source is not None:
+            return self.raw.size()
+
+        return os.fstat(self.fileno()).st_size
+
+
+    def _convert_batch(self, raw_dgrams):
+        '''
+        Converts a list of raw datagrams.  Runs of RAW datagrams are decoded in bulk
+        using SimradRawParser.from_strings.
+        '''
+
+        if self._return_raw:
+            return raw_dgrams
+
+        if self.stats is not None:
+            start_time = time.perf_counter()
+
+        dgram_list = []
+        raw_run = []
+        for raw_dgram in raw_dgrams:
+            if bytes(raw_dgram[:3]) == b'RAW':
+                raw_run.append(raw_dgram)
+            else:
+                if raw_run:
+                    dgram_list.extend(self._convert_raw_run(raw_run))
+                    raw_run = []
+                dgram_list.append(self._convert_raw_datagram(raw_dgram))
+        if raw_run:
+            dgram_list.extend(self._convert_raw_run(raw_run))
+
+        if self.stats is not None:
+            self.stats.parse_time += time.perf_counter() - start_time
+
+        return dgram_list
+
+
+    def _convert_raw_run(self, raw_run):
+        '''
+        Decodes a run of RAW datagrams in bulk and marks the ones rejected by
+        raw_filter.
+        '''
+
+        dgram_list = self.DGRAM_TYPE_KEY['RAW'].from_strings(raw_run)
+        for raw_dgram, dgram in zip(raw_run, dgram_list):
+            if isinstance(raw_dgram, FilteredRawDatagram):
+                dgram['filtered'] = True
+
+        return dgram_list
+
+
+    def write(self, data):
+        '''
+        :param data: datagram or list of datagrams to write
+        :type data: dict or list
+
+        Writes datagrams to the file.  The datagrams are dicts like those returned
+        by read and are packed by the parser for their type.  The file must be
+        opened in a write mode ('w', 'a' or 'x').
+        '''
+
+        if self._writer is None:
+            raise IOError('File %s is not open for writing' % (self._filename))
+
+        if isinstance(data, dict):
+            data = [data]
+
+        for dgram in data:
+            parser = self.DGRAM_TYPE_KEY[dgram['type'][:3]]
+            self._writer.write(parser.to_string(dgram))
+            self._current_dgram_offset += 1
+
+
+    def flush(self):
+
+        if self._writer is not None and not self._writer.closed:
+            self._writer.flush()
+
+
+    def close(self):
+        '''
+        Flushes any buffered datagrams and closes the file.
+        '''
+
+        if self._writer is not None and not self.closed:
+            self._writer.flush()
+
+        BufferedReader.close(self)
+
+
+    def _find_next_datagram(self, start_pos=None, quiet=False):
+        '''
+        :param start_pos: Byte offset to start searching from.  The search starts at
+            the current position if this is None.
+        :type start_pos: int
+
+        :param quiet: Set to True to search without logging.  This is used when
+            searching from arbitrary offsets in valid files.
+        :type quiet: bool
+
+        Searches the file for the next valid datagram and moves the file pointer to
+        its start.  The file is read in RESYNC_WINDOW sized chunks which are searched
+        for the datagram type tags.  A tag is only accepted if it is preceded by a
+        plausible datagram size, followed by a plausible timestamp and the size is
+        repeated at the end of the datagram.
+
+        :raises: SimradEOF if no valid datagram is found before the end of the file
+        '''
+
         old_file_pos = self._tell_bytes()
-        log.warning('Attempting to find next valid datagram...')
+        if start_pos is None:
+            start_pos = old_file_pos
+        if not quiet:
+            log.warning('Attempting to find next valid datagram...')
+
+        #  each search window overlaps the previous one by the length of the datagram
+        #  header (size, type and timestamp) so we don't miss headers that span windows
+        header_len = 16
+        search_pos = start_pos
+        while True:
+            self._seek_bytes(search_pos, SEEK_SET)
+            buf = self._read_bytes(self.RESYNC_WINDOW)
+
+            dgram_pos = None
+            for tag in self._dgram_tags():
+                indx = buf.find(tag, 4)
+                while indx >= 0 and (dgram_pos is None or indx - 4 < dgram_pos):
+                    if self._plausible_header(buf, indx - 4, search_pos):
+                        dgram_pos = indx - 4
+                        break
+                    indx = buf.find(tag, indx + 1)
+
+            if dgram_pos is not None:
+                self._seek_bytes(search_pos + dgram_pos, SEEK_SET)
+                if not quiet:
+                    log.warning('Found next datagram:  %s', self.peek())
+                    log.warning('Skipped ahead %d bytes', self._tell_bytes() - old_file_pos)
+                return
+
+            if len(buf) < self.RESYNC_WINDOW:
+                #  we've searched to the end of the file
+                self._seek_bytes(0, SEEK_END)
+                raise SimradEOF()
+
+            search_pos += len(buf) - header_len
+
+
+    def _dgram_tags(self):
+        '''
+        Returns the list of valid datagram type tags (e.g. b'RAW0') as bytes.
+        '''
+
+        tags = []
+        for dgram_type, parser in self.DGRAM_TYPE_KEY.items():
+            for version in parser._versions:
+                tags.append((dgram_type + str(version)).encode())
+
+        return tags
+
+
+    def _plausible_header(self, buf, indx, buf_pos):
+        '''
+        :param buf: bytes read from the file
+        :type buf: bytes
+
+        :param indx: offset of the candidate datagram (its leading size field) in buf
+        :type indx: int
+
+        :param buf_pos: byte offset of buf in the file
+        :type buf_pos: int
+
+        Checks if a candidate datagram found while resynchronizing looks valid.  The
+        size must be plausible, the timestamp must be within the range of dates we
+        expect and the trailing datagram size must match the leading size.
+        '''
+
+        if indx < 0 or indx + 16 > len(buf):
+            return False
+
+        dgram_size, = struct.unpack('=l', buf[indx:indx + 4])
+        if dgram_size < 16 or dgram_size > self.MAX_DGRAM_SIZE:
+            return False
+
+        low_date, high_date = struct.unpack('=2L', buf[indx + 8:indx + 16])
+        nt_time = (high_date << 32) + low_date
+        if not self.MIN_NT_TIME <= nt_time <= self.MAX_NT_TIME:
+            return False
 
-        while self.peek()['type'][:3] not in list(self.DGRAM_TYPE_KEY.keys()):
-            self._seek_bytes(1,1)
+        trailer_pos = indx + 4 + dgram_size
+        if trailer_pos + 4 <= len(buf):
+            size_check = buf[trailer_pos:trailer_pos + 4]
+        else:
+            #  the trailing size is beyond our window, read it from the file
+            self._seek_bytes(buf_pos + trailer_pos, SEEK_SET)
+            size_check = self._read_bytes(4)
+        if len(size_check) != 4:
+            return False
 
-        log.warning('Found next datagram:  %s', self.peek())
-        log.warning('Skipped ahead %d bytes', self._tell_bytes() - old_file_pos)
+        return struct.unpack('=l', size_check)[0] == dgram_size
 
 
     def tell(self):
@@ -557,19 +1131,23 @@ class RawSimradFile(BufferedReader):
         try:
             self._seek_bytes(-(8 + dgram_size_check), SEEK_CUR)
         except IOError:
-            raise DatagramSizeError
+            self._seek_bytes(old_file_pos, SEEK_SET)
+            raise DatagramSizeError('Trailing datagram size is past the start of the file',
+                (dgram_size_check, None), file_pos=(old_file_pos, self.tell()))
 
         try:
             dgram_size = self._read_dgram_size()
 
         except DatagramSizeError:
-            print('Error reading the datagram')
+            log.warning('Unable to read the size of the datagram before byte %d',
+                    old_file_pos)
             self._seek_bytes(old_file_pos, SEEK_SET)
             raise
 
         if dgram_size_check != dgram_size:
             self._seek_bytes(old_file_pos, SEEK_SET)
-            raise DatagramSizeError
+            raise DatagramSizeError('Leading and trailing datagram sizes differ',
+                (dgram_size_check, dgram_size), file_pos=(old_file_pos, self.tell()))
         else:
             self._seek_bytes(-4, SEEK_CUR)
 
@@ -590,7 +1168,7 @@ class RawSimradFile(BufferedReader):
                 new_dgram = next(self)
             except Exception:
                 log.debug('Caught EOF?')
-                raise StopIteration
+                return
 
             yield new_dgram
 
@@ -649,7 +1227,837 @@ class RawSimradFile(BufferedReader):
                 self.skip_back()
 
 
+    def peek_tail(self, k=8):
+        '''
+        :param k: Number of datagrams to return
+        :type k: int
+
+        :returns: list of datagram header dicts
+
+        Returns the headers of the last k datagrams in the file (last datagram first)
+        without reading the rest of the file.  The datagrams are found by stepping
+        back from the end of the file using the trailing datagram sizes.  Fewer
+        headers are returned if the end of the file is damaged or partially written.
+        The file position is restored afterwards.
+        '''
+
+        old_file_pos = self._tell_bytes()
+        old_dgram_offset = self.tell()
+
+        headers = []
+        try:
+            self._seek_bytes(0, SEEK_END)
+            while len(headers) < k and self._tell_bytes() > 0:
+                self.skip_back()
+                headers.append(self.peek())
+        except (IOError, ValueError, DatagramSizeError, DatagramReadError, SimradEOF):
+            pass
+        finally:
+            self._seek_bytes(old_file_pos, SEEK_SET)
+            self._current_dgram_offset = old_dgram_offset
+
+        return headers
+
+
+    def seek_time(self, nt_time):
+        '''
+        :param nt_time: NT time (100ns intervals since 1601-01-01)
+        :type nt_time: int
+
+        Moves the file pointer forward to a datagram before nt_time without reading
+        the datagrams in between.  The file is bisected by byte offset, searching
+        for the next valid datagram at each step, until the search interval is
+        smaller than RESYNC_WINDOW.  The file pointer will be at or before the first
+        datagram with a time of nt_time or later as long as the datagrams are in
+        time order.  The datagram count returned by tell is not updated.
+        '''
+
+        low_pos = self._tell_bytes()
+        high_pos = self._data_size()
+
+        while high_pos - low_pos > self.RESYNC_WINDOW:
+            mid_pos = (low_pos + high_pos) // 2
+            try:
+                self._find_next_datagram(mid_pos, quiet=True)
+                dgram_pos = self._tell_bytes()
+                header = self.peek()
+            except (SimradEOF, DatagramReadError):
+                high_pos = mid_pos
+                continue
+
+            if dgram_pos < high_pos and ((header['high_date'] << 32) +
+                    header['low_date']) < nt_time:
+                low_pos = dgram_pos
+            else:
+                high_pos = mid_pos
+
+        self._seek_bytes(low_pos, SEEK_SET)
+
+
     def reset(self):
         self._current_dgram_offset = 0
         self._total_dgram_count = None
         self._seek_bytes(0, SEEK_SET)
+
+
+    def index_filename(self):
+        '''
+        Returns the path of the sidecar index file for this raw file.
+        '''
+
+        return self._filename + self.INDEX_EXTENSION
+
+
+    def build_index(self):
+        '''
+        :returns: numpy structured array of type INDEX_DTYPE
+
+        Makes a single header-only pass through the file recording the byte offset,
+        type, NT timestamp, and (for RAW datagrams) the channel number and sample
+        count of every valid datagram.  Datagrams that fail the size check or have a
+        (0, 0) timestamp are left out of the index since _read_next_dgram would
+        skip them anyways.  The file position is restored afterwards.
+        '''
+
+        old_file_pos = self._tell_bytes()
+        old_dgram_offset = self.tell()
+        self._seek_bytes(0, SEEK_SET)
+
+        entries = []
+        while True:
+            offset = self._tell_bytes()
+            try:
+                header = self.peek()
+            except (SimradEOF, DatagramReadError):
+                break
+
+            channel = -1
+            count = -1
+            if header['type'].startswith('RAW'):
+                channel = header['channel']
+                self._seek_bytes(offset + self._RAW_COUNT_OFFSET, SEEK_SET)
+                buf = self._read_bytes(4)
+                if len(buf) == 4:
+                    count = struct.unpack('=l', buf)[0]
+                self._seek_bytes(offset, SEEK_SET)
+
+            try:
+                self.skip()
+            except (SimradEOF, DatagramReadError):
+                #  partial datagram at the end of the file
+                break
+
+            #  skip() will resync on a bad datagram - if we didn't land where
+            #  the header said we would, this datagram is corrupt.
+            if self._tell_bytes() != offset + header['size'] + 8:
+                continue
+
+            if (header['low_date'], header['high_date']) == (0, 0):
+                continue
+
+            entries.append((offset, header['type'].encode(), header['low_date'],
+                            header['high_date'], channel, count))
+
+        self._seek_bytes(old_file_pos, SEEK_SET)
+        self._current_dgram_offset = old_dgram_offset
+
+        return np.array(entries, dtype=self.INDEX_DTYPE)
+
+
+    def save_index(self, index):
+        '''
+        :param index: datagram index as returned by build_index
+        :type index: numpy structured array
+
+        Writes the index to the sidecar file along with the size and modification
+        time of this raw file so we can tell later if the index is stale.
+        '''
+
+        stat = os.stat(self._filename)
+        with open(self.index_filename(), 'wb') as fh:
+            np.savez(fh, index=index, file_size=stat.st_size,
+                     file_mtime=stat.st_mtime, version=self.INDEX_VERSION)
+
+
+    def load_index(self):
+        '''
+        :returns: the datagram index or None
+
+        Loads the sidecar index if it exists and matches the current size and
+        modification time of this raw file.  Returns None if there is no index or
+        it is out of date.
+        '''
+
+        #  byte sources don't have sidecar indexes
+        if self._source is not None:
+            return None
+
+        index_file = self.index_filename()
+        if not os.path.isfile(index_file):
+            return None
+
+        stat = os.stat(self._filename)
+        try:
+            with np.load(index_file) as sidecar:
+                if (int(sidecar['version']) != self.INDEX_VERSION or
+                        int(sidecar['file_size']) != stat.st_size or
+                        float(sidecar['file_mtime']) != stat.st_mtime):
+                    return None
+                return sidecar['index']
+        except Exception:
+            log.warning('Unable to read datagram index %s', index_file)
+            return None
+
+
+    def get_index(self, save=True):
+        '''
+        :param save: Write a new sidecar index if one has to be built
+        :type save: bool
+
+        :returns: numpy structured array of type INDEX_DTYPE
+
+        Returns the datagram index for this file, loading it from the sidecar file
+        if it is current and building (and optionally saving) it if it is not.
+        '''
+
+        if self._index is None:
+            self._index = self.load_index()
+
+            if self._index is None:
+                self._index = self.build_index()
+                if save and self._source is None:
+                    try:
+                        self.save_index(self._index)
+                    except (IOError, OSError):
+                        log.warning('Unable to write datagram index %s',
+                                self.index_filename())
+
+        return self._index
+
+
+    def seek_index(self, entry):
+        '''
+        :param entry: Index (into the array returned by get_index) of the datagram
+        :type entry: int
+
+        Moves the file pointer to the start of an indexed datagram.
+        '''
+
+        index = self.get_index()
+        self._seek_bytes(int(index['offset'][entry]), SEEK_SET)
+        self._current_dgram_offset = entry
+
+
+    def read_prefixes(self, entries, size):
+        '''
+        :param entries: Datagram index entries (a subset of the array returned by get_index)
+        :type entries: numpy structured array
+
+        :param size: Number of bytes to read from the start of each datagram body
+        :type size: int
+
+        :returns: list of byte strings
+
+        Reads the first size bytes of each of the indexed datagrams without reading
+        the rest of the datagram.  The file position is restored afterwards.
+        '''
+
+        #  the prefixes of byte sources are read with a batch of (coalesced and
+        #  concurrent) range requests.  The leading datagram size is skipped.
+        if (self._source is not None and
+                not isinstance(self, RawSimradCompressedFile)):
+            return self.raw.read_ranges([(offset + 4, offset + 4 + size)
+                    for offset in entries['offset'].tolist()])
+
+        old_file_pos = self._tell_bytes()
+
+        prefixes = []
+        for offset in entries['offset'].tolist():
+            #  skip the leading datagram size
+            self._seek_bytes(offset + 4, SEEK_SET)
+            prefixes.append(self._read_bytes(size))
+
+        self._seek_bytes(old_file_pos, SEEK_SET)
+
+        return prefixes
+
+
+    def read_headers(self, entries):
+        '''
+        :param entries: Datagram index entries of a single datagram type
+        :type entries: numpy structured array
+
+        :returns: numpy structured array of the datagram headers
+
+        Reads and decodes the fixed size headers of the indexed datagrams.  The
+        datagram bodies (e.g. RAW sample data) are not read.
+        '''
+
+        if entries.shape[0] == 0:
+            return np.empty((0,), dtype=self.DGRAM_TYPE_KEY['RAW'].header_dtype())
+
+        parser = self.DGRAM_TYPE_KEY[entries['type'][0][:3].decode()]
+        header_size = parser.header_size()
+
+        return np.frombuffer(b''.join(self.read_prefixes(entries, header_size)),
+                dtype=parser.header_dtype())
+
+
+class RawSimradMmapFile(RawSimradFile):
+    '''
+    A memory-mapped version of RawSimradFile.
+
+    The file is mapped into memory and datagram bodies are returned as memoryview
+    slices of the mapping instead of byte strings.  The RAW datagram parser
+    creates the power and angle arrays with np.frombuffer so the sample data are
+    views into the mapping and are not copied until they are stored.  Since the
+    sample arrays reference the mapping, they are read-only and must be copied if
+    they are to be kept after the file is closed.
+    '''
+
+    def __init__(self, name, mode='rb', closefd=True, return_raw=False):
+
+        #  we do our own "buffering" via the mapping so keep the reader's
+        #  buffer small
+        RawSimradFile.__init__(self, name, mode=mode, closefd=closefd,
+                return_raw=return_raw, buffer_size=DEFAULT_BUFFER_SIZE)
+
+        self._file_size = os.fstat(self.fileno()).st_size
+        self._pos = 0
+
+        #  mmap can't map an empty file
+        if self._file_size > 0:
+            self._mmap = mmap.mmap(self.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        else:
+            self._mmap = None
+            self._view = memoryview(b'')
+
+
+    def _seek_bytes(self, bytes_, whence=0):
+        '''
+        :param bytes_: byte offset
+        :type bytes_: int
+
+        :param whence:
+
+        Seeks the mapping by bytes instead of datagrams.
+        '''
+
+        if whence == SEEK_SET:
+            new_pos = bytes_
+        elif whence == SEEK_CUR:
+            new_pos = self._pos + bytes_
+        elif whence == SEEK_END:
+            new_pos = self._file_size + bytes_
+        else:
+            raise ValueError('Illegal value for \'whence\' (%s)' % (str(whence)))
+
+        if new_pos < 0:
+            raise IOError('Cannot seek to a negative byte offset')
+
+        self._pos = new_pos
+
+
+    def _tell_bytes(self):
+        '''
+        Returns the mapping pointer position in bytes.
+        '''
+
+        return self._pos
+
+
+    def _read_bytes(self, k):
+        '''
+        Reads raw bytes from the mapping.  This returns a copy and is intended
+        for reading the small header fields.
+        '''
+
+        buf = self._view[self._pos:self._pos + k].tobytes()
+        self._pos += len(buf)
+
+        return buf
+
+
+    def _read_buffer(self, k):
+        '''
+        Returns a memoryview of the next k bytes of the mapping without copying.
+        '''
+
+        buf = self._view[self._pos:self._pos + k]
+        self._pos += len(buf)
+
+        return buf
+
+
+    def _convert_raw_datagram(self, raw_datagram_string):
+        '''
+        Only the RAW parser works with buffers, the other datagrams are small
+        and are converted to bytes before parsing.
+        '''
+
+        if bytes(raw_datagram_string[:3]) != b'RAW':
+            raw_datagram_string = bytes(raw_datagram_string)
+
+        return RawSimradFile._convert_raw_datagram(self, raw_datagram_string)
+
+
+    def _bytes_remaining(self):
+        return self._file_size - self._pos
+
+
+    def _file_pos(self):
+        return self._pos
+
+
+    def at_eof(self):
+        return self._pos >= self._file_size
+
+
+    def close(self):
+        '''
+        Releases the mapping and closes the file.  If sample arrays that reference
+        the mapping still exist, the mapping is left for the garbage collector
+        to clean up.
+        '''
+
+        if self._mmap is not None:
+            try:
+                self._view.release()
+                self._mmap.close()
+            except BufferError:
+                log.debug('Mapping still referenced, leaving it to be garbage collected')
+            self._mmap = None
+
+        RawSimradFile.close(self)
+
+
+class RawSimradCompressedFile(RawSimradFile):
+    '''
+    A version of RawSimradFile that reads gzip, bz2 or xz compressed raw files.
+
+    The file is decompressed as it is read and only a window of the decompressed
+    data is kept in memory.  Restart points are recorded as the file is read so
+    seeking backwards (and forwards over data that has already been read) starts
+    decompressing from the nearest restart point instead of the start of the file.
+    A restart point is recorded at the start of every compressed stream and, for
+    gzip files, every RESTART_INTERVAL bytes of decompressed data.  bz2 and xz
+    decompressors can't be copied so these files only have restart points at
+    stream boundaries (e.g. files written by parallel compressors).
+
+    RawSimradFile will return an instance of this class when it is passed a
+    compressed file, so this class rarely needs to be used directly.
+    '''
+
+    #: Number of compressed bytes read at a time
+    READ_SIZE = 256*1024
+
+    #: Spacing of gzip restart points in bytes of decompressed data
+    RESTART_INTERVAL = 4*1024*1024
+
+    #: Number of decompressed bytes kept behind the read position
+    WINDOW_SIZE = 8*1024*1024
+
+
+    def __init__(self, name, mode='rb', closefd=True, return_raw=False,
+            buffer_size=DEFAULT_BUFFER_SIZE):
+
+        RawSimradFile.__init__(self, name, mode=mode, closefd=closefd,
+                return_raw=return_raw, buffer_size=buffer_size)
+
+        self.compression = compression_type(name)
+
+        #  restart points are (decompressed offset, compressed offset, decompressor)
+        #  tuples where the decompressor is None at the start of a stream.
+        self._restart_points = [(0, 0, None)]
+        self._restart_offsets = [0]
+
+        self._size = None
+        self._pos = 0
+        self._restore(self._restart_points[0])
+
+
+    @property
+    def random_access(self):
+        '''
+        Only gzip files have restart points within a compressed stream.  Reading
+        near the end of a bz2 or xz file, or bisecting it, decompresses the file
+        from the start.
+        '''
+
+        return self.compression == 'gzip'
+
+
+    def _new_decompressor(self):
+        '''
+        Returns a decompressor for the start of a compressed stream.
+        '''
+
+        if self.compression == 'gzip':
+            return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+        elif self.compression == 'bz2':
+            return bz2.BZ2Decompressor()
+        else:
+            return lzma.LZMADecompressor(format=lzma.FORMAT_XZ)
+
+
+    def _restore(self, restart_point):
+        '''
+        Resets the decompressor to a restart point.
+        '''
+
+        offset, compressed_offset, decompressor = restart_point
+        if decompressor is None:
+            self._decompressor = self._new_decompressor()
+        else:
+            #  copy the saved state so the restart point can be used again
+            self._decompressor = decompressor.copy()
+
+        BufferedReader.seek(self, compressed_offset, SEEK_SET)
+        self._compressed_pos = compressed_offset
+        self._pending = b''
+        self._window = bytearray()
+        self._window_start = offset
+        self._eof = False
+
+
+    def _add_restart_point(self, offset, compressed_offset, decompressor):
+
+        if offset > self._restart_offsets[-1]:
+            self._restart_points.append((offset, compressed_offset, decompressor))
+            self._restart_offsets.append(offset)
+
+
+    def _locate(self, pos):
+        '''
+        Restores the nearest restart point if pos is behind the window or if
+        there is a restart point between the end of the window and pos.
+        '''
+
+        restart_point = self._restart_points[bisect.bisect_right(
+                self._restart_offsets, pos) - 1]
+        if (pos < self._window_start or
+                restart_point[0] > self._window_start + len(self._window)):
+            self._restore(restart_point)
+
+
+    def _fill(self, end):
+        '''
+        Decompresses data until the window extends to the decompressed offset end
+        or the end of the file.  The file is decompressed to the end if end is None.
+        '''
+
+        while not self._eof and (end is None or
+                self._window_start + len(self._window) < end):
+
+            data = self._pending or BufferedReader.read(self, self.READ_SIZE)
+            self._pending = b''
+            if not data:
+                self._eof = True
+                break
+            self._compressed_pos += len(data)
+
+            try:
+                self._window += self._decompressor.decompress(data)
+            except (OSError, EOFError, zlib.error, lzma.LZMAError):
+                #  padding or garbage after the last stream
+                log.warning('Unable to decompress data at byte %d of %s',
+                        self._compressed_pos - len(data), self._filename)
+                self._eof = True
+                break
+            window_end = self._window_start + len(self._window)
+
+            if self._decompressor.eof:
+                #  start of the next stream
+                self._pending = self._decompressor.unused_data
+                self._compressed_pos -= len(self._pending)
+                self._decompressor = self._new_decompressor()
+                self._add_restart_point(window_end, self._compressed_pos, None)
+            elif (self.compression == 'gzip' and
+                    window_end - self._restart_offsets[-1] >= self.RESTART_INTERVAL):
+                self._add_restart_point(window_end, self._compressed_pos,
+                        self._decompressor.copy())
+
+            #  drop data from the front of the window but keep anything we're
+            #  in the middle of reading
+            keep_from = window_end - self.WINDOW_SIZE
+            if end is not None:
+                keep_from = min(keep_from, self._pos)
+            if keep_from > self._window_start:
+                del self._window[:keep_from - self._window_start]
+                self._window_start = keep_from
+
+        if self._eof:
+            self._size = self._window_start + len(self._window)
+
+
+    def _uncompressed_size(self):
+        '''
+        Returns the size of the decompressed data.  The file must be decompressed
+        to the end the first time this is called.
+        '''
+
+        if self._size is None:
+            self._fill(None)
+
+        return self._size
+
+
+    def _seek_bytes(self, bytes_, whence=0):
+        '''
+        :param bytes_: byte offset
+        :type bytes_: int
+
+        :param whence:
+
+        Seeks the decompressed data by bytes instead of datagrams.
+        '''
+
+        if whence == SEEK_SET:
+            new_pos = bytes_
+        elif whence == SEEK_CUR:
+            new_pos = self._pos + bytes_
+        elif whence == SEEK_END:
+            new_pos = self._uncompressed_size() + bytes_
+        else:
+            raise ValueError('Illegal value for \'whence\' (%s)' % (str(whence)))
+
+        if new_pos < 0:
+            raise IOError('Cannot seek to a negative byte offset')
+
+        #  data are decompressed when they are read
+        self._pos = new_pos
+
+
+    def _tell_bytes(self):
+        '''
+        Returns the position in the decompressed data in bytes.
+        '''
+
+        return self._pos
+
+
+    def _read_bytes(self, k):
+        '''
+        Reads raw bytes from the decompressed data.
+        '''
+
+        self._locate(self._pos)
+        self._fill(self._pos + k)
+
+        start = self._pos - self._window_start
+        buf = bytes(self._window[start:start + k])
+        self._pos += len(buf)
+
+        return buf
+
+
+    def _bytes_remaining(self):
+        return self._uncompressed_size() - self._pos
+
+
+    def _data_size(self):
+        return self._uncompressed_size()
+
+
+    def at_eof(self):
+        self._locate(self._pos)
+        self._fill(self._pos + 1)
+
+        return self._pos >= self._window_start + len(self._window)
+
+
+class RawFilePrefetcher(object):
+    '''
+    Reads ahead of a RawSimradFile in a background thread.
+
+    The files are read in order, CHUNK_SIZE bytes at a time, staying no more than
+    max_bytes ahead of the reader (across file boundaries).  The data that are
+    read are discarded.  Reading them pulls them into the operating system's file
+    cache so when the reader gets to them they are read from memory instead of the
+    disk or network.  This overlaps reading the files with parsing the datagrams,
+    which helps most when reading from network file systems or slow drives.
+
+    The reader's position is polled from the file object passed to set_reader.
+
+    Typical use:
+
+        with RawFilePrefetcher(filenames) as prefetcher:
+            for n, filename in enumerate(filenames):
+                with RawSimradFile(filename) as fid:
+                    prefetcher.set_reader(n, fid)
+                    ...
+    '''
+
+    #: Number of bytes read at a time
+    CHUNK_SIZE = 1024*1024
+
+    #: Seconds between checks of the reader position when max_bytes ahead
+    POLL_INTERVAL = 0.01
+
+
+    def __init__(self, filenames, max_bytes=64*1024*1024):
+        '''
+        :param filenames: the files that will be read, in the order they are read
+        :type filenames: list
+
+        :param max_bytes: maximum number of bytes to read ahead of the reader
+        :type max_bytes: int
+        '''
+
+        self.max_bytes = max_bytes
+
+        #  byte sources aren't prefetched, they do their own read ahead
+        self._filenames = [None if as_byte_source(filename) is not None else
+                filename for filename in filenames]
+        self._file_sizes = [None] * len(self._filenames)
+
+        #  the reader's file number, file object and last known position
+        self._reader_file = 0
+        self._reader = None
+        self._reader_pos = 0
+
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run,
+                name='RawFilePrefetcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def set_reader(self, file_number, fid):
+        '''
+        :param file_number: index of the file being read in the file list
+        :type file_number: int
+
+        :param fid: the file object that is reading the file
+
+        Sets the file the reader is currently reading.
+        '''
+
+        with self._condition:
+            self._reader_file = file_number
+            self._reader = fid
+            self._reader_pos = 0
+            self._condition.notify()
+
+
+    def close(self):
+        '''
+        Stops the prefetch thread.
+        '''
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def _file_size(self, file_number):
+
+        if self._filenames[file_number] is None:
+            self._file_sizes[file_number] = 0
+        elif self._file_sizes[file_number] is None:
+            try:
+                self._file_sizes[file_number] = os.path.getsize(
+                        self._filenames[file_number])
+            except OSError:
+                self._file_sizes[file_number] = 0
+
+        return self._file_sizes[file_number]
+
+
+    def _reader_position(self):
+        '''
+        Returns the (file number, byte offset) of the reader.  This must be
+        called with the condition held.
+        '''
+
+        if self._reader is not None:
+            try:
+                self._reader_pos = self._reader._file_pos()
+            except (ValueError, OSError):
+                #  the file has been closed
+                self._reader = None
+
+        return self._reader_file, self._reader_pos
+
+
+    def _bytes_ahead(self, reader, fetch):
+        '''
+        Returns the number of bytes between the reader and fetch positions.
+        '''
+
+        if fetch[0] == reader[0]:
+            return fetch[1] - reader[1]
+
+        n_bytes = self._file_size(reader[0]) - reader[1] + fetch[1]
+        for file_number in range(reader[0] + 1, fetch[0]):
+            n_bytes += self._file_size(file_number)
+
+        return n_bytes
+
+
+    def _run(self):
+
+        fetch_file, fetch_pos = 0, 0
+        fh, fh_file = None, None
+
+        try:
+            while True:
+                with self._condition:
+                    while not self._closed:
+                        reader = self._reader_position()
+
+                        #  don't bother with data the reader has already read
+                        if (fetch_file, fetch_pos) < reader:
+                            fetch_file, fetch_pos = reader
+
+                        if (fetch_file >= len(self._filenames) or
+                                self._bytes_ahead(reader, (fetch_file, fetch_pos))
+                                < self.max_bytes):
+                            break
+                        self._condition.wait(self.POLL_INTERVAL)
+
+                    if self._closed or fetch_file >= len(self._filenames):
+                        break
+
+                #  read the next chunk without holding the condition
+                if fh_file != fetch_file:
+                    if fh is not None:
+                        fh.close()
+                    fh_file = fetch_file
+                    try:
+                        if self._filenames[fetch_file] is not None:
+                            fh = open(self._filenames[fetch_file], 'rb')
+                        else:
+                            fh = None
+                    except (IOError, OSError):
+                        fh = None
+                if fh is None:
+                    data = b''
+                else:
+                    fh.seek(fetch_pos)
+                    data = fh.read(self.CHUNK_SIZE)
+
+                if data:
+                    fetch_pos += len(data)
+                else:
+                    fetch_file, fetch_pos = fetch_file + 1, 0
+
+        except Exception as e:
+            #  prefetching is only an optimization so never let it break reading
+            log.debug('Prefetching stopped: %s', e)
+
+        finally:
+            if fh is not None:
+                fh.close()
@@ -438,22 +438,25 @@ class nmea_data(object):
 
         """
 
+        #  the arrays can have room for more datagrams than they contain
+        nmea_times = self.nmea_times[0:self.n_raw]
+
         #  Ensure that we have times to work with.
         if start_time is None:
-            start_time = np.min(self.nmea_times)
+            start_time = np.min(nmea_times)
         if end_time is None:
-            end_time = np.max(self.nmea_times)
+            end_time = np.max(nmea_times)
 
         # Sort time index if returning time ordered indexes.
         if time_order:
-            primary_index = self.nmea_times.argsort()
+            primary_index = nmea_times.argsort()
         else:
-            primary_index = self.nmea_times
+            primary_index = np.arange(self.n_raw)
 
         # Determine the indices of the data that fall within the time span
         # provided.
-        mask = self.nmea_times[primary_index] >= start_time
-        mask = np.logical_and(mask, self.nmea_times[primary_index] <= end_time)
+        mask = nmea_times[primary_index] >= start_time
+        mask = np.logical_and(mask, nmea_times[primary_index] <= end_time)
 
         #  and return the indices that are included in the specified range
         return primary_index[mask]
@@ -34,9 +34,11 @@
 import numpy as np
 import logging
 import struct
+import hashlib
+from collections import OrderedDict
 import re
 import sys
-from .date_conversion import nt_to_unix
+from .date_conversion import nt_to_datetime64
 
 
 __all__ = ['SimradNMEAParser', 'SimradDepthParser', 'SimradBottomParser',
@@ -44,6 +46,21 @@ __all__ = ['SimradNMEAParser', 'SimradDepthParser', 'SimradBottomParser',
 
 log = logging.getLogger(__name__)
 
+#  Map struct format characters to numpy type codes.  Used to build numpy
+#  structured dtypes that match the datagram header formats.
+_NUMPY_TYPE_CODES = {'h': 'i2', 'H': 'u2', 'l': 'i4', 'L': 'u4',
+                     'f': 'f4', 'd': 'f8'}
+
+
+def _encode_strings(values):
+    '''
+    Encodes the str values in a list of datagram contents as bytes so they can
+    be packed using the struct 's' format.
+    '''
+
+    return [x.encode('latin_1') if isinstance(x, str) else x for x in values]
+
+
 class _SimradDatagramParser(object):
     '''
     '''
@@ -65,6 +82,24 @@ class _SimradDatagramParser(object):
     def header(self, version=0):
         return self._headers[version][:]
 
+    def header_dtype(self, version=0):
+        '''
+        Returns a numpy structured dtype with the same (packed) layout as the
+        datagram header so headers can be decoded with np.frombuffer.
+        '''
+
+        dtype_fields = []
+        for name, fmt in self._headers[version]:
+            count = int(fmt[:-1]) if len(fmt) > 1 else 1
+            if fmt[-1] == 's':
+                dtype_fields.append((name, 'S%d' % count))
+            elif count > 1:
+                dtype_fields.append((name, _NUMPY_TYPE_CODES[fmt[-1]], (count,)))
+            else:
+                dtype_fields.append((name, _NUMPY_TYPE_CODES[fmt[-1]]))
+
+        return np.dtype(dtype_fields)
+
 
     def validate_data_header(self, data):
 
@@ -89,12 +124,32 @@ class _SimradDatagramParser(object):
 
     def from_string(self, raw_string):
 
-        header = raw_string[:4]
+        header = bytes(raw_string[:4])
         if (sys.version_info.major > 2):
             header = header.decode()
         id_, version = self.validate_data_header(header)
         return self._unpack_contents(raw_string, version=version)
 
+    def header_from_string(self, raw_string):
+        '''
+        Decodes only the header of a datagram.  Returns a dict of the header fields.
+        This is used to inspect a datagram without reading or parsing its contents.
+        '''
+
+        header = bytes(raw_string[:4])
+        if (sys.version_info.major > 2):
+            header = header.decode()
+        id_, version = self.validate_data_header(header)
+
+        header_values = struct.unpack(self.header_fmt(version),
+                bytes(raw_string[:self.header_size(version)]))
+        data = dict(zip(self.header_fields(version), header_values))
+        for field in data:
+            if isinstance(data[field], bytes):
+                data[field] = data[field].decode('latin_1')
+
+        return data
+
     def to_string(self, data={}):
 
         id_, version = self.validate_data_header(data)
@@ -109,9 +164,10 @@ class _SimradDatagramParser(object):
 
     @classmethod
     def finalize_datagram(cls, datagram_content_str):
-        datagram_size = len(datagram_content_str)
-        final_fmt = '=l%dsl' % (datagram_size)
-        return struct.pack(final_fmt, datagram_size, datagram_content_str, datagram_size)
+        #  join the size fields instead of packing the contents with struct so
+        #  large datagrams are only copied once
+        datagram_size = struct.pack('=l', len(datagram_content_str))
+        return b''.join([datagram_size, datagram_content_str, datagram_size])
 
 class SimradDepthParser(_SimradDatagramParser):
     '''
@@ -120,7 +176,7 @@ class SimradDepthParser(_SimradDatagramParser):
         type:         string == 'DEP0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy datetime64[ms] of NT date, assumed to be UTC
         transceiver_count:  [long uint] with number of tranceivers
 
         depth:        [float], one value for each active channel
@@ -158,7 +214,7 @@ class SimradDepthParser(_SimradDatagramParser):
             if isinstance(data[field], bytes):
                 data[field] = data[field].decode()
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
             data_fmt    = '=3f'
@@ -206,7 +262,7 @@ class SimradDepthParser(_SimradDatagramParser):
             for indx in range(data['transceiver_count']):
                 datagram_contents.extend([data['depth'][indx], data['reflectivity'][indx], data['unused'][indx]])
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return struct.pack(datagram_fmt, *_encode_strings(datagram_contents))
 
 
 class SimradBottomParser(_SimradDatagramParser):
@@ -216,7 +272,7 @@ class SimradBottomParser(_SimradDatagramParser):
         type:         string == 'BOT0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        datetime:     datetime.datetime object of NT date converted to UTC
+        timestamp:    numpy datetime64[ms] of NT date, assumed to be UTC
         transceiver_count:  long uint with number of tranceivers
         depth:        [float], one value for each active channel
 
@@ -251,7 +307,7 @@ class SimradBottomParser(_SimradDatagramParser):
             if isinstance(data[field], bytes):
                 data[field] = data[field].decode()
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
             depth_fmt    = '=%dd' %(data['transceiver_count'],)
@@ -281,7 +337,7 @@ class SimradBottomParser(_SimradDatagramParser):
             datagram_fmt += '%dd' % (data['transceiver_count'])
             datagram_contents.extend(data['depth'])
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return struct.pack(datagram_fmt, *_encode_strings(datagram_contents))
 
 
 class SimradAnnotationParser(_SimradDatagramParser):
@@ -292,7 +348,7 @@ class SimradAnnotationParser(_SimradDatagramParser):
         type:         string == 'TAG0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:     datetime.datetime object of NT date, assumed to be UTC
+        timestamp:     numpy datetime64[ms] of NT date, assumed to be UTC
 
         text:         Annotation
 
@@ -328,7 +384,7 @@ class SimradAnnotationParser(_SimradDatagramParser):
             if isinstance(data[field], bytes):
                 data[field] = data[field].decode()
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
 #        if version == 0:
 #            data['text'] = raw_string[self.header_size(version):].strip('\x00')
@@ -367,7 +423,7 @@ class SimradAnnotationParser(_SimradDatagramParser):
             datagram_contents.append(tmp_string)
 
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return struct.pack(datagram_fmt, *_encode_strings(datagram_contents))
 
 
 
@@ -379,7 +435,7 @@ class SimradNMEAParser(_SimradDatagramParser):
         type:         string == 'NME0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:     datetime.datetime object of NT date, assumed to be UTC
+        timestamp:     numpy datetime64[ms] of NT date, assumed to be UTC
 
         nmea_string:  full (original) NMEA string
 
@@ -422,7 +478,7 @@ class SimradNMEAParser(_SimradDatagramParser):
             if isinstance(data[field], bytes):
                 data[field] = data[field].decode()
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
             if (sys.version_info.major > 2):
@@ -469,7 +525,7 @@ class SimradNMEAParser(_SimradDatagramParser):
             datagram_contents.append(tmp_string)
 
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return struct.pack(datagram_fmt, *_encode_strings(datagram_contents))
 
 
 class SimradConfigParser(_SimradDatagramParser):
@@ -479,7 +535,7 @@ class SimradConfigParser(_SimradDatagramParser):
         type:         string == 'CON0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy datetime64[ms] of NT date, assumed to be UTC
 
         survey_name                     [str]
         transect_name                   [str]
@@ -488,6 +544,9 @@ class SimradConfigParser(_SimradDatagramParser):
         spare0                          [str]
         transceiver_count               [long]
         transceivers                    [list] List of dicts representing Transducer Configs:
+        config_hash                     [str] hash of the datagram contents, excluding
+                                              the timestamp.  Datagrams with the same
+                                              configuration have the same hash.
 
         ME70 Data contains the following additional values (data contained w/in first 14
             bytes of the spare0 field)
@@ -559,11 +618,19 @@ class SimradConfigParser(_SimradDatagramParser):
 
     to_string(dict):    Returns raw string (including leading/trailing size fields)
                         ready for writing to disk
+
+    The configuration rarely changes between the files of a survey so the most
+    recently parsed configurations are cached, keyed by config_hash, and only the
+    timestamp is decoded for datagrams with a cached configuration.
     '''
 
+    #: Number of parsed configurations kept in the cache
+    CACHE_SIZE = 16
 
 
     def __init__(self):
+        self._cache = OrderedDict()
+
         headers = {0:[('type', '4s'),
                       ('low_date', 'L'),
                       ('high_date', 'L'),
@@ -666,6 +733,33 @@ class SimradConfigParser(_SimradDatagramParser):
 
     def _unpack_contents(self, raw_string, version):
 
+        #  the type and timestamp are the first 12 bytes
+        config_hash = hashlib.sha1(bytes(raw_string[:4]) +
+                bytes(raw_string[12:])).hexdigest()
+
+        cached = self._cache.get(config_hash)
+        if cached is None:
+            cached = self._parse_contents(raw_string, version)
+            cached['config_hash'] = config_hash
+            self._cache[config_hash] = cached
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(config_hash)
+
+        #  return a copy so changes to the datagram don't change the cache
+        data = dict(cached)
+        if 'transceivers' in data:
+            data['transceivers'] = dict((channel, dict(txcvr)) for channel, txcvr
+                    in data['transceivers'].items())
+        data['low_date'], data['high_date'] = struct.unpack('=LL', raw_string[4:12])
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
+
+        return data
+
+
+    def _parse_contents(self, raw_string, version):
+
         data = {}
         round6 = lambda x: round(x, ndigits=6)
         header_values = struct.unpack(self.header_fmt(version), raw_string[:self.header_size(version)])
@@ -677,7 +771,7 @@ class SimradConfigParser(_SimradDatagramParser):
             if (sys.version_info.major > 2) and isinstance(data[field], bytes):
                 data[field] = data[field].decode('latin_1')
 
-        data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+        data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
         if version == 0:
 
@@ -814,13 +908,13 @@ class SimradConfigParser(_SimradDatagramParser):
 
                     txcvr_contents.extend([txcvr['gpt_software_version'], txcvr['spare4']])
 
-                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *txcvr_contents)
+                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *_encode_strings(txcvr_contents))
 
                 elif _sounder_name_used == 'MBES':
                     for field in txcvr_header_fields:
                         txcvr_contents.append(txcvr[field])
 
-                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *txcvr_contents)
+                    txcvr_contents_str = struct.pack(txcvr_header_fmt, *_encode_strings(txcvr_contents))
 
                 else:
                     raise RuntimeError('Unknown _sounder_name_used (Should not happen, this is a bug!)')
@@ -835,7 +929,7 @@ class SimradConfigParser(_SimradDatagramParser):
             datagram_fmt += '%ds' %(len(data['beam_config']))
             datagram_contents.append(data['beam_config'])
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return struct.pack(datagram_fmt, *_encode_strings(datagram_contents))
 
 
 # class SimradConfig1Parser(_SimradDatagramParser):
@@ -859,7 +953,7 @@ class SimradRawParser(_SimradDatagramParser):
         type:         string == 'RAW0'
         low_date:     long uint representing LSBytes of 64bit NT date
         high_date:    long uint representing MSBytes of 64bit NT date
-        timestamp:    datetime.datetime object of NT date, assumed to be UTC
+        timestamp:    numpy datetime64[ms] of NT date, assumed to be UTC
 
         channel                         [short] Channel number
         mode                            [short] 1 = Power only, 2 = Angle only 3 = Power & Angle
@@ -930,28 +1024,89 @@ class SimradRawParser(_SimradDatagramParser):
                 if isinstance(data[field], bytes):
                     data[field] = data[field].decode()
 
-            data['timestamp'] = nt_to_unix((data['low_date'], data['high_date']))
+            data['timestamp'] = nt_to_datetime64(data['low_date'], data['high_date'])
 
-            if data['count'] > 0:
-                block_size = data['count'] * 2
-                indx = self.header_size(version)
+            self._unpack_samples(raw_string, data, self.header_size(version))
 
-                if int(data['mode']) & 0x1:
-                    data['power'] = np.fromstring(raw_string[indx:indx + block_size], dtype='int16')
-                    indx += block_size
-                else:
-                    data['power'] = None
+        return data
 
-                if int(data['mode']) & 0x2:
-                    data['angle'] = np.fromstring(raw_string[indx:indx + block_size], dtype='uint16')
-                else:
-                    data['angle'] = None
+    def from_strings(self, raw_strings, version=0):
+        '''
+        :param raw_strings: RAW datagrams (with leading/trailing datagram size stripped)
+        :type raw_strings: list
 
+        :returns: list of datagram dicts
+
+        Bulk version of from_string for runs of RAW datagrams.  The headers of all of
+        the datagrams are decoded with a single np.frombuffer call and the timestamps
+        are converted as an array.  The power and angle arrays are views into the
+        provided datagrams.
+        '''
+
+        if len(raw_strings) == 0:
+            return []
+
+        header_size = self.header_size(version)
+        headers = np.frombuffer(b''.join([bytes(raw[:header_size]) for raw in raw_strings]),
+                dtype=self.header_dtype(version))
+
+        timestamps = nt_to_datetime64(headers['low_date'], headers['high_date'])
+
+        #  tolist is by far the quickest way to get python values out of a
+        #  structured array.  We decode the string fields separately.  numpy
+        #  strips the trailing nulls of bytes fields so we pad the spare bytes
+        #  back to their full size, as from_string returns them.
+        fields = self.header_fields(version)
+        types = np.char.decode(headers['type'], 'latin_1').tolist()
+        spare_size = headers.dtype['spare0'].itemsize
+        spares = [spare.ljust(spare_size, '\x00') for spare in
+                np.char.decode(headers['spare0'], 'latin_1').tolist()]
+
+        datagrams = []
+        for indx, values in enumerate(headers.tolist()):
+            data = dict(zip(fields, values))
+            data['type'] = types[indx]
+            data['spare0'] = spares[indx]
+            data['timestamp'] = timestamps[indx]
+            self._unpack_samples(raw_strings[indx], data, header_size)
+            datagrams.append(data)
+
+        return datagrams
+
+    def _unpack_samples(self, raw_string, data, indx):
+        '''
+        Adds the power and angle arrays to the datagram dict.  The arrays are views
+        into raw_string starting at the byte offset indx.  If raw_string ends at the
+        header (the sample data were skipped when the datagram was read) power and
+        angle are set to None.
+        '''
+
+        if data['count'] > 0 and len(raw_string) <= indx:
+            data['power'] = None
+            data['angle'] = None
+
+        elif data['count'] > 0:
+            block_size = data['count'] * 2
+
+            #  Create the sample arrays as views into raw_string.  This avoids
+            #  copying the sample data and when raw_string is a memoryview of
+            #  a memory-mapped file the data are not even read until used.
+            if int(data['mode']) & 0x1:
+                data['power'] = np.frombuffer(raw_string, dtype='int16',
+                        count=data['count'], offset=indx)
+                indx += block_size
             else:
-                data['power'] = np.empty((0,), dtype='int16')
-                data['angle'] = np.empty((0,), dtype='uint16')
+                data['power'] = None
 
-        return data
+            if int(data['mode']) & 0x2:
+                data['angle'] = np.frombuffer(raw_string, dtype='uint16',
+                        count=data['count'], offset=indx)
+            else:
+                data['angle'] = None
+
+        else:
+            data['power'] = np.empty((0,), dtype='int16')
+            data['angle'] = np.empty((0,), dtype='uint16')
 
     def _pack_contents(self, data, version):
 
@@ -963,12 +1118,16 @@ class SimradRawParser(_SimradDatagramParser):
         if version == 0:
 
             if data['count'] > 0:
-                if (int(data['mode']) & 0x1) and (len(data.get('power', [])) != data['count']):
-                    log.warning("Data 'count' = %d, but contains %d power samples.  Ignoring power.")
+                n_power = 0 if data.get('power') is None else len(data['power'])
+                if (int(data['mode']) & 0x1) and (n_power != data['count']):
+                    log.warning("Data 'count' = %d, but contains %d power samples.  Ignoring power.",
+                        data['count'], n_power)
                     data['mode'] &= ~(1<<0)
 
-                if (int(data['mode']) & 0x2) and (len(data.get('angle', [])) != data['count']):
-                    log.warning("Data 'count' = %d, but contains %d angle samples.  Ignoring angle.")
+                n_angle = 0 if data.get('angle') is None else len(data['angle'])
+                if (int(data['mode']) & 0x2) and (n_angle != data['count']):
+                    log.warning("Data 'count' = %d, but contains %d angle samples.  Ignoring angle.",
+                        data['count'], n_angle)
                     data['mode'] &= ~(1<<1)
 
 
@@ -979,14 +1138,19 @@ class SimradRawParser(_SimradDatagramParser):
             for field in self.header_fields(version):
                 datagram_contents.append(data[field])
 
+            datagram_contents = [struct.pack(datagram_fmt,
+                    *_encode_strings(datagram_contents))]
+
+            #  The sample data are written directly from the arrays.  Packing
+            #  them with struct requires converting every sample to a python int.
             if data['count'] > 0:
 
                 if int(data['mode']) & 0x1:
-                    datagram_fmt += '%dh' % (data['count'])
-                    datagram_contents.extend(data['power'])
+                    datagram_contents.append(np.asarray(data['power'],
+                            dtype='int16').tobytes())
 
                 if int(data['mode']) & 0x2:
-                    datagram_fmt += '%dH' % (data['count'])
-                    datagram_contents.extend(data['angle'])
+                    datagram_contents.append(np.asarray(data['angle'],
+                            dtype='uint16').tobytes())
 
-        return struct.pack(datagram_fmt, *datagram_contents)
+        return b''.join(datagram_contents)
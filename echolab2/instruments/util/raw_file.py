@@ -35,11 +35,13 @@ $Id$
 '''
 
 from io import FileIO, SEEK_SET, SEEK_CUR, SEEK_END
+import mmap
+import os
 import struct
 import logging
 from . import parsers
 
-__all__ = ['RawSimradFile']
+__all__ = ['RawSimradFile', 'RawSimradMmapFile']
 
 log = logging.getLogger(__name__)
 
@@ -218,6 +220,15 @@ class RawSimradFile(FileIO):
         return FileIO.read(self, k)
 
 
+    def _read_buffer(self, k):
+        '''
+        Reads the raw bytes of a datagram body.  Subclasses can override this to
+        return a buffer (such as a memoryview) without copying the data.
+        '''
+
+        return self._read_bytes(k)
+
+
     def _read_next_dgram(self):
         '''
         Attempts to read the next datagram from the file.
@@ -254,7 +265,7 @@ class RawSimradFile(FileIO):
             return self._read_next_dgram()
 
 
-        raw_dgram = self._read_bytes(header['size'])
+        raw_dgram = self._read_buffer(header['size'])
         bytes_read = len(raw_dgram)
 
         if bytes_read < header['size']:
@@ -301,7 +312,7 @@ class RawSimradFile(FileIO):
         Returns a formated datagram object using the data in raw_datagram_string
         '''
 
-        dgram_type = raw_datagram_string[:3].decode()
+        dgram_type = bytes(raw_datagram_string[:3]).decode()
         try:
             parser = self.DGRAM_TYPE_KEY[dgram_type]
         except KeyError:
@@ -555,7 +566,8 @@ class RawSimradFile(FileIO):
             dgram_size = self._read_dgram_size()
 
         except DatagramSizeError:
-            print('Error reading the datagram')
+            log.warning('Unable to read the size of the datagram before byte %d',
+                    old_file_pos)
             self._seek_bytes(old_file_pos, SEEK_SET)
             raise
 
@@ -582,7 +594,7 @@ class RawSimradFile(FileIO):
                 new_dgram = next(self)
             except Exception:
                 log.debug('Caught EOF?')
-                raise StopIteration
+                return
 
             yield new_dgram
 
@@ -645,3 +657,125 @@ class RawSimradFile(FileIO):
         self._current_dgram_offset = 0
         self._total_dgram_count = None
         self._seek_bytes(0, SEEK_SET)
+
+
+class RawSimradMmapFile(RawSimradFile):
+    '''
+    A memory-mapped version of RawSimradFile.
+
+    The file is mapped into memory and datagram bodies are returned as memoryview
+    slices of the mapping instead of byte strings.  The RAW datagram parser
+    creates the power and angle arrays with np.frombuffer so the sample data are
+    views into the mapping and are not copied until they are stored.  Since the
+    sample arrays reference the mapping, they are read-only and must be copied if
+    they are to be kept after the file is closed.
+    '''
+
+    def __init__(self, name, mode='rb', closefd=True, return_raw=False):
+        RawSimradFile.__init__(self, name, mode=mode, closefd=closefd,
+                return_raw=return_raw)
+
+        self._file_size = os.fstat(self.fileno()).st_size
+        self._pos = 0
+
+        #  mmap can't map an empty file
+        if self._file_size > 0:
+            self._mmap = mmap.mmap(self.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        else:
+            self._mmap = None
+            self._view = memoryview(b'')
+
+
+    def _seek_bytes(self, bytes_, whence=0):
+        '''
+        :param bytes_: byte offset
+        :type bytes_: int
+
+        :param whence:
+
+        Seeks the mapping by bytes instead of datagrams.
+        '''
+
+        if whence == SEEK_SET:
+            new_pos = bytes_
+        elif whence == SEEK_CUR:
+            new_pos = self._pos + bytes_
+        elif whence == SEEK_END:
+            new_pos = self._file_size + bytes_
+        else:
+            raise ValueError('Illegal value for \'whence\' (%s)' % (str(whence)))
+
+        if new_pos < 0:
+            raise IOError('Cannot seek to a negative byte offset')
+
+        self._pos = new_pos
+
+
+    def _tell_bytes(self):
+        '''
+        Returns the mapping pointer position in bytes.
+        '''
+
+        return self._pos
+
+
+    def _read_bytes(self, k):
+        '''
+        Reads raw bytes from the mapping.  This returns a copy and is intended
+        for reading the small header fields.
+        '''
+
+        buf = self._view[self._pos:self._pos + k].tobytes()
+        self._pos += len(buf)
+
+        return buf
+
+
+    def _read_buffer(self, k):
+        '''
+        Returns a memoryview of the next k bytes of the mapping without copying.
+        '''
+
+        buf = self._view[self._pos:self._pos + k]
+        self._pos += len(buf)
+
+        return buf
+
+
+    def _convert_raw_datagram(self, raw_datagram_string):
+        '''
+        Only the RAW parser works with buffers, the other datagrams are small
+        and are converted to bytes before parsing.
+        '''
+
+        if bytes(raw_datagram_string[:3]) != b'RAW':
+            raw_datagram_string = bytes(raw_datagram_string)
+
+        return RawSimradFile._convert_raw_datagram(self, raw_datagram_string)
+
+
+    def _bytes_remaining(self):
+        return self._file_size - self._pos
+
+
+    def at_eof(self):
+        return self._pos >= self._file_size
+
+
+    def close(self):
+        '''
+        Releases the mapping and closes the file.  If sample arrays that reference
+        the mapping still exist, the mapping is left for the garbage collector
+        to clean up.
+        '''
+
+        if self._mmap is not None:
+            try:
+                self._view.release()
+                self._mmap.close()
+            except BufferError:
+                log.debug('Mapping still referenced, leaving it to be garbage collected')
+            self._mmap = None
+
+        RawSimradFile.close(self)
@@ -0,0 +1,166 @@
+# coding=utf-8
+
+#     National Oceanic and Atmospheric Administration (NOAA)
+#     Alaskan Fisheries Science Center (AFSC)
+#     Resource Assessment and Conservation Engineering (RACE)
+#     Midwater Assessment and Conservation Engineering (MACE)
+
+#  THIS SOFTWARE AND ITS DOCUMENTATION ARE CONSIDERED TO BE IN THE PUBLIC DOMAIN
+#  AND THUS ARE AVAILABLE FOR UNRESTRICTED PUBLIC USE. THEY ARE FURNISHED "AS IS."
+#  THE AUTHORS, THE UNITED STATES GOVERNMENT, ITS INSTRUMENTALITIES, OFFICERS,
+#  EMPLOYEES, AND AGENTS MAKE NO WARRANTY, EXPRESS OR IMPLIED, AS TO THE USEFULNESS
+#  OF THE SOFTWARE AND DOCUMENTATION FOR ANY PURPOSE. THEY ASSUME NO RESPONSIBILITY
+#  (1) FOR THE USE OF THE SOFTWARE AND DOCUMENTATION; OR (2) TO PROVIDE TECHNICAL
+#  SUPPORT TO USERS.
+
+'''
+.. module:: echolab2.instruments.util.read_stats
+
+    :synopsis:  Statistics collected while reading raw files
+
+    Provides ReadStats, which holds the datagram counts and the time spent in
+    each stage of reading.  RawSimradFile updates the stats object assigned to
+    its stats attribute and the instrument readers (e.g. EK60.read_raw) fill in
+    the rest.
+
+$Id$
+'''
+
+__all__ = ['ReadStats']
+
+
+class ReadStats(object):
+    '''
+    Statistics collected while reading one or more raw files.
+
+    Counts:
+
+        n_files:         number of files read
+        n_files_skipped: number of files skipped because they are outside of the
+                         read bounds
+        bytes_read:      bytes of datagram data read.  Sample data skipped by RAW
+                         filters and sample windows aren't counted.
+        datagrams:       dict of the number of datagrams read, keyed by type
+                         (e.g. 'RAW0')
+        skipped:         number of datagrams that weren't stored because they are
+                         outside of the read bounds or are for channels or pings
+                         that aren't being read.  This includes datagrams skipped
+                         using the datagram index which aren't read at all.
+        corrupt:         number of invalid datagrams skipped by resynchronizing
+        unknown:         dict of the number of datagrams of types the reader
+                         doesn't handle, keyed by type
+
+    Times, in seconds:
+
+        io_time:         reading datagrams from the files
+        parse_time:      converting datagrams to dicts
+        timestamp_time:  converting datagram timestamps to datetime64
+        append_time:     storing pings (RawData.append_ping)
+        wall_time:       total elapsed time of the read
+
+    The stage times are measured with time.perf_counter.  When files are read
+    in parallel the stage times of the files are added so they can be larger
+    than wall_time.
+    '''
+
+    #: Names of the timed reading stages
+    STAGES = ['io', 'parse', 'timestamp', 'append']
+
+
+    def __init__(self):
+
+        self.n_files = 0
+        self.n_files_skipped = 0
+        self.bytes_read = 0
+        self.datagrams = {}
+        self.skipped = 0
+        self.corrupt = 0
+        self.unknown = {}
+
+        self.io_time = 0.0
+        self.parse_time = 0.0
+        self.timestamp_time = 0.0
+        self.append_time = 0.0
+        self.wall_time = 0.0
+
+
+    def add_datagram(self, dgram_type, n_bytes):
+        '''
+        :param dgram_type: datagram type (e.g. 'RAW0')
+        :type dgram_type: str
+
+        :param n_bytes: number of bytes read
+        :type n_bytes: int
+
+        Counts a datagram that was read.
+        '''
+
+        self.datagrams[dgram_type] = self.datagrams.get(dgram_type, 0) + 1
+        self.bytes_read += n_bytes
+
+
+    def add_unknown(self, dgram_type):
+        '''
+        :param dgram_type: datagram type
+        :type dgram_type: str
+
+        Counts a datagram of a type the reader doesn't handle.
+        '''
+
+        self.unknown[dgram_type] = self.unknown.get(dgram_type, 0) + 1
+
+
+    def merge(self, other):
+        '''
+        :param other: stats to add to these stats
+        :type other: ReadStats
+
+        Adds the counts and times of another ReadStats object to this one.
+        '''
+
+        for name in ['n_files', 'n_files_skipped', 'bytes_read', 'skipped',
+                     'corrupt', 'wall_time'] + \
+                    ['%s_time' % stage for stage in self.STAGES]:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+        for counts, other_counts in [(self.datagrams, other.datagrams),
+                                     (self.unknown, other.unknown)]:
+            for dgram_type, count in other_counts.items():
+                counts[dgram_type] = counts.get(dgram_type, 0) + count
+
+
+    @property
+    def n_datagrams(self):
+        '''
+        Total number of datagrams read.
+        '''
+
+        return sum(self.datagrams.values())
+
+
+    def stage_times(self):
+        '''
+        :returns: dict
+
+        Returns the time spent in each stage, keyed by stage name.
+        '''
+
+        return {stage: getattr(self, '%s_time' % stage) for stage in self.STAGES}
+
+
+    def __str__(self):
+
+        lines = ['%d files read (%d skipped), %d bytes, %d datagrams in %.3f s' %
+                 (self.n_files, self.n_files_skipped, self.bytes_read,
+                  self.n_datagrams, self.wall_time)]
+        for dgram_type in sorted(self.datagrams):
+            lines.append('    %s: %d' % (dgram_type, self.datagrams[dgram_type]))
+        lines.append('%d datagrams skipped, %d corrupt' % (self.skipped,
+                                                            self.corrupt))
+        for dgram_type in sorted(self.unknown):
+            lines.append('    unknown %s: %d' % (dgram_type,
+                                                 self.unknown[dgram_type]))
+        for stage, stage_time in self.stage_times().items():
+            lines.append('%-10s %.3f s' % (stage, stage_time))
+
+        return '\n'.join(lines)
@@ -70,6 +70,18 @@ class PingData(object):
         # be set before any attributes are added.
         self.sample_dtype = 'float32'
 
+        # _fill_values maps the names of sample data attributes that can't
+        # store NaNs (i.e. integer arrays) to the value used to mark their
+        # empty samples.  Other attributes are filled with NaNs.
+        self._fill_values = {}
+
+        # _ping_buffers maps the names of data attributes to arrays with room
+        # for more pings than the attributes have.  The attributes are views
+        # of the first pings of their buffers so they can grow into the
+        # buffers without copying.  insert creates these buffers so inserting
+        # and appending pings doesn't copy all of the data every time.
+        self._ping_buffers = {}
+
         # Data_attributes is an internal list that contains the names of all
         # the class's "data attributes". The echolab2 package uses this
         # attribute list to generalize various functions that manipulate these
@@ -171,6 +183,7 @@ class PingData(object):
         try:
             self._data_attributes.remove(name)
             delattr(self, name)
+            self._ping_buffers.pop(name, None)
         except:
             pass
 
@@ -393,7 +406,7 @@ class PingData(object):
                 if remove:
                     attr[0:new_n_pings, :] = attr[keep_idx, :]
                 else:
-                    attr[del_idx, :] = np.nan
+                    attr[del_idx, :] = self._fill_value(attr_name)
             else:
                 if remove:
                     # Copy the data we're keeping into a contiguous block.
@@ -574,10 +587,18 @@ class PingData(object):
             obj_to_insert.resize(new_pings, my_samples)
 
         # Update the number of pings in the object we're inserting into
-        # and then resize it.
+        # and then resize it.  We reserve extra room for pings first so
+        # repeatedly appending to this object takes amortized linear time.
         my_pings = my_pings + new_pings
+        if my_samples == self.n_samples:
+            self._reserve(my_pings)
         self.resize(my_pings, my_samples)
 
+        # Generate the move index.  Only the pings that are shifted are
+        # moved, so when appending no pings are moved.
+        move_idx = np.flatnonzero(move_index != np.arange(move_index.shape[0]))
+        move_index = move_index[move_idx]
+
         # Work through our data properties, inserting the data from
         # obj_to_insert.
         for attribute in self._data_attributes:
@@ -590,16 +611,17 @@ class PingData(object):
             # Get a reference to our data_obj's attribute.
             data = getattr(self, attribute)
 
-            # Generate the move index.
-            move_idx = np.arange(move_index.shape[0])
-
             # Check if the obj_to_insert shares this attribute.
             if hasattr(obj_to_insert, attribute):
                 # Get a reference to our obj_to_insert's attribute.
                 data_to_insert = getattr(obj_to_insert, attribute)
 
-                # We have to handle the 2d and 1d differently.
-                if data.ndim == 1 and data.shape[0] != my_samples:
+                # We have to handle the 2d and 1d differently.  Vertical axis
+                # attributes of both objects have my_samples elements.
+                # Checking both objects keeps ping axis attributes from
+                # being skipped when we have my_samples pings.
+                if data.ndim == 1 and (data.shape[0] != my_samples or
+                                       data_to_insert.shape[0] != my_samples):
                     # Skip vertical axis attributes, but move the other 1d data
                     # move right to left to avoid overwriting data before
                     # moving.
@@ -640,6 +662,11 @@ class PingData(object):
         if not n_samples:
             n_samples = self.n_samples
 
+        # There is nothing to do if the arrays are already the right size.
+        if (n_pings == self.ping_time.shape[0] and
+                n_samples == self.n_samples):
+            return
+
         # Resize keeping the sample number the same.
         self.resize(n_pings, n_samples)
 
@@ -712,28 +739,50 @@ class PingData(object):
                 array (vertical axis).
         """
 
-        def _resize2d(data, ping_dim, sample_dim):
+        def _resize_array(data, shape, empty_value):
             """
-            _resize2d returns a new array of the specified dimensions with the
-            data from the provided array copied into it. This function is
-            used when we need to resize 2d arrays along the minor axis as
-            ndarray.resize and numpy.resize don't maintain the order of the
-            data in these cases.
+            _resize_array returns a new array of the specified shape with the
+            data from the provided array copied into it. Only the new elements
+            are initialized. We don't use ndarray.resize and numpy.resize
+            since they don't maintain the order of the data when 2d arrays
+            are resized along the minor axis and numpy.resize fills the new
+            elements with repeated copies of the data.
             """
 
-            # If the minor axis is changing, we have to either concatenate or
-            # copy into a new resized array.  We take the second approach
-            # for now, as there shouldn't be a performance differences between
-            # the two approaches.
-
-            # Create a new array.
-            new_array = np.empty((ping_dim, sample_dim))
-            # Fill it with NaNs.
-            new_array.fill(np.nan)
-            # Copy the data into our new array and return it.
-            new_array[0:data.shape[0], 0:data.shape[1]] = data
+            # Create a new array of the same type and copy the data that fit.
+            new_array = np.empty(shape, dtype=data.dtype)
+            keep = tuple(slice(0, min(new_dim, old_dim)) for new_dim, old_dim
+                         in zip(shape, data.shape))
+            new_array[keep] = data[keep]
+
+            # Fill the new elements along each axis with NaNs (or the
+            # attribute's empty value).
+            for axis in range(len(shape)):
+                if shape[axis] > data.shape[axis]:
+                    new_array[keep[:axis] + (slice(data.shape[axis], None),)] = \
+                            empty_value
             return new_array
 
+        def _resize_pings(attr_name, data, shape, empty_value):
+            """
+            _resize_pings resizes a data attribute along the ping axis. The
+            attribute grows into its ping buffer if the buffer has room.
+            """
+
+            if shape == data.shape:
+                return data
+
+            buffer = self._ping_buffers.get(attr_name)
+            if (buffer is not None and data.shape[0] < shape[0] <=
+                    buffer.shape[0] and self._is_buffer_view(data, buffer)):
+                new_array = buffer[0:shape[0]]
+                new_array[data.shape[0]:] = empty_value
+                return new_array
+
+            # Resizing to a new array releases the buffer.
+            self._ping_buffers.pop(attr_name, None)
+            return _resize_array(data, shape, empty_value)
+
         # Store the old sizes.
         old_sample_dim = self.n_samples
         old_ping_dim = self.ping_time.shape[0]
@@ -749,6 +798,7 @@ class PingData(object):
 
             # Get a reference to this attribute.
             attr = getattr(self, attr_name)
+            empty_value = self._empty_value(attr_name, attr.dtype)
 
             # Resize the arrays using a technique dependent on the array
             # dimension.
@@ -757,20 +807,25 @@ class PingData(object):
                 # to be handled differently.
                 if attr.shape[0] == old_sample_dim != new_sample_dim:
                     # Resize this sample axes attribute.
-                    attr = np.resize(attr,(new_sample_dim))
+                    attr = _resize_array(attr, (new_sample_dim,), empty_value)
                 elif attr.shape[0] == old_ping_dim != new_ping_dim:
                     # Resize this ping axes attribute.
-                    attr = np.resize(attr,(new_ping_dim))
+                    attr = _resize_pings(attr_name, attr, (new_ping_dim,),
+                                         empty_value)
             elif attr.ndim == 2:
                 # Resize this 2d sample data array.
                 if new_sample_dim == old_sample_dim:
-                    # If the minor axes isn't changing, we can use
-                    # np.resize() function.
-                    attr = np.resize(attr,(new_ping_dim, new_sample_dim))
+                    # If the minor axes isn't changing, the array can grow
+                    # into its ping buffer.
+                    attr = _resize_pings(attr_name, attr,
+                                         (new_ping_dim, new_sample_dim),
+                                         empty_value)
                 else:
-                    # If the minor axes is changing, we need to use our
-                    # resize2d function.
-                    attr = _resize2d(attr, new_ping_dim, new_sample_dim)
+                    # If the minor axes is changing, we need to copy the
+                    # data into a new array.
+                    self._ping_buffers.pop(attr_name, None)
+                    attr = _resize_array(attr, (new_ping_dim, new_sample_dim),
+                                         empty_value)
 
             #  Update the attribute.
             setattr(self, attr_name, attr)
@@ -785,6 +840,101 @@ class PingData(object):
         # permits, in other methods of this class.
 
 
+    def _fill_value(self, attr_name):
+        """Returns the value used to mark the empty samples of a sample data
+        attribute.
+
+        Args:
+            attr_name (str): The name of the attribute.
+
+        Returns:
+            The attribute's fill value or NaN if it doesn't have one.
+        """
+
+        return self._fill_values.get(attr_name, np.nan)
+
+
+    def _empty_value(self, attr_name, dtype):
+        """Returns the value used to initialize new elements of a data
+        attribute.
+
+        Sample data attributes with a fill value use it. Other attributes use
+        NaN (or NaT) if their type can store it, 0 for unsigned integers and
+        booleans, -1 for signed integers and None for objects.
+
+        Args:
+            attr_name (str): The name of the attribute.
+            dtype (dtype): The attribute's data type.
+
+        Returns:
+            The attribute's empty value.
+        """
+
+        if attr_name in self._fill_values:
+            return self._fill_values[attr_name]
+
+        dtype = np.dtype(dtype)
+        if dtype.kind in 'fc':
+            return np.nan
+        elif dtype.kind in 'mM':
+            return dtype.type('NaT')
+        elif dtype.kind in 'ub':
+            return 0
+        elif dtype.kind == 'i':
+            return -1
+        else:
+            return None
+
+
+    def _reserve(self, n_pings):
+        """Makes room for at least n_pings pings in the ping axis data
+        attributes.
+
+        Attributes that don't have room are copied into ping buffers that
+        have room for half again as many pings. The attributes keep their
+        size and become views of the start of their buffers. resize then
+        grows them into their buffers without copying the data.
+
+        Args:
+            n_pings (int): The number of pings to make room for.
+        """
+
+        ping_dim = self.ping_time.shape[0]
+        if n_pings <= ping_dim:
+            return
+        capacity = n_pings + n_pings // 2
+
+        for attr_name in self._data_attributes:
+            attr = getattr(self, attr_name)
+            if attr.shape[0] != ping_dim:
+                continue
+
+            # Check if this attribute already has room.
+            buffer = self._ping_buffers.get(attr_name)
+            if (buffer is not None and buffer.shape[0] >= n_pings and
+                    self._is_buffer_view(attr, buffer)):
+                continue
+
+            buffer = np.empty((capacity,) + attr.shape[1:], dtype=attr.dtype)
+            buffer[0:ping_dim] = attr
+            self._ping_buffers[attr_name] = buffer
+            setattr(self, attr_name, buffer[0:ping_dim])
+
+
+    @staticmethod
+    def _is_buffer_view(data, buffer):
+        """Returns True if data is a view of the first pings of buffer.
+
+        Args:
+            data (array): A data attribute.
+            buffer (array): The attribute's ping buffer.
+        """
+
+        return (data.base is buffer and data.ctypes.data == buffer.ctypes.data
+                and data.shape[1:] == buffer.shape[1:] and
+                data.strides == buffer.strides)
+
+
     def get_indices(self, start_ping=None, end_ping=None, start_time=None,
                     end_time=None, time_order=True):
         """Returns a boolean index array containing where the indices in the
@@ -812,6 +962,33 @@ class PingData(object):
             The indices that are included in the specified range.
         """
 
+        # The data arrays can have room for more pings than they contain.
+        ping_time = self.ping_time[0:max(self.n_pings, 0)]
+        return self._get_indices(ping_time, start_ping=start_ping,
+                                 end_ping=end_ping, start_time=start_time,
+                                 end_time=end_time, time_order=time_order)
+
+
+    def _get_indices(self, ping_time, start_ping=None, end_ping=None,
+                     start_time=None, end_time=None, time_order=True):
+        """Returns the indices of a ping_time vector in the range defined by
+        the times and/or ping numbers provided.
+
+        This is the implementation of get_indices. Subclasses that don't
+        store their pings in order can pass their ping times in order and
+        map the returned indices to their data arrays.
+
+        Args:
+            ping_time (array): The ping times.  The ping numbers count from
+                the first element.
+
+        The other arguments are described in get_indices.
+
+        Returns:
+            The indices into ping_time that are included in the specified
+            range.
+        """
+
         # Generate the ping number vector.  We start counting pings at 1.
         ping_number = np.arange(self.n_pings) + 1
 
@@ -825,18 +1002,18 @@ class PingData(object):
         if time_order:
             # Return indices in time order.  Note that empty ping times will be
             # sorted to the front.
-            primary_index = self.ping_time.argsort()
+            primary_index = ping_time.argsort()
         else:
             # Return indices in ping order.
             primary_index = ping_number - 1
 
         # Generate a boolean mask of the values to return.
         if start_time:
-            mask = self.ping_time[primary_index] >= start_time
+            mask = ping_time[primary_index] >= start_time
         elif start_ping >= 1:
             mask = ping_number[primary_index] >= start_ping
         if end_time:
-            mask = np.logical_and(mask, self.ping_time[primary_index] <=
+            mask = np.logical_and(mask, ping_time[primary_index] <=
                                   end_time)
         elif end_ping >= 2:
             mask = np.logical_and(mask, ping_number[primary_index] <= end_ping)
@@ -1076,6 +1253,7 @@ class PingData(object):
         obj.n_samples = self.n_samples
         obj.n_pings = self.n_pings
         obj._data_attributes = list(self._data_attributes)
+        obj._fill_values = dict(self._fill_values)
 
         # Work through the data attributes list, copying the values.
         for attr_name in obj._data_attributes:
@@ -1132,6 +1310,7 @@ class PingData(object):
         obj.n_pings = n_pings
 
         obj._data_attributes = list(self._data_attributes)
+        obj._fill_values = dict(self._fill_values)
 
         # Check if n_pings != self.n_pings.  If the new object's horizontal
         # axis is a different shape than this object's we can't copy
@@ -1176,9 +1355,13 @@ class PingData(object):
                     else:
                         data[:] = value
                 else:
-                    # Create the 2d array(s).
+                    # Create the 2d array(s).  Attributes that can't store
+                    # NaNs are filled with their fill value instead.
                     data = np.empty((n_pings, self.n_samples), dtype=attr.dtype)
-                    data[:, :] = value
+                    if attr_name in self._fill_values and np.isnan(value):
+                        data[:, :] = self._fill_values[attr_name]
+                    else:
+                        data[:, :] = value
 
             # Add the attribute to our empty object.  We can skip using
             # add_attribute here because we shouldn't need to check
@@ -712,16 +712,24 @@ class ProcessedData(PingData):
 
         # Get the existing vertical axis.
         if hasattr(self, 'range'):
-            vaxis = getattr(self, 'range')
+            vaxis_name = 'range'
         else:
-            vaxis = getattr(self, 'depth')
+            vaxis_name = 'depth'
+        vaxis = getattr(self, vaxis_name)
 
-        # Generate the new vertical axis.
-        vaxis = np.arange(new_sample_dim) * self.sample_thickness + vaxis[0]
+        # Generate the new vertical axis.  If the number of samples isn't
+        # changing we keep the existing axis.
+        if new_sample_dim != self.n_samples:
+            vaxis = (np.arange(new_sample_dim) * self.sample_thickness +
+                     vaxis[0]).astype(vaxis.dtype)
 
         # Call the parent method to resize the arrays (n_samples is updated
-        # here).
+        # here).  The parent can't tell the vertical axis from the ping axis
+        # attributes when the number of pings and samples are the same so we
+        # set the vertical axis ourselves.
         super(ProcessedData, self).resize(new_ping_dim, new_sample_dim)
+        setattr(self, vaxis_name, vaxis)
+        self._ping_buffers.pop(vaxis_name, None)
 
         # Update n_pings.
         self.n_pings = self.ping_time.shape[0]
@@ -0,0 +1,165 @@
+# coding=utf-8
+
+"""
+Fixtures that write small synthetic EK60 .raw files for the tests.
+
+The files contain a CON0 configuration datagram followed by an NME0 datagram
+and one RAW0 datagram per channel for every ping. The sample data are random
+but repeatable.
+"""
+
+import datetime
+import struct
+
+import numpy as np
+import pytest
+
+
+NT_EPOCH = datetime.datetime(1601, 1, 1)
+
+CHANNELS = (('GPT  38 kHz 009072033fa2 1-1 ES38B', 38000.),
+            ('GPT 120 kHz 00907203422d 1-1 ES120-7', 120000.))
+
+#: The start times of the files written by the raw_files fixture.
+FILE_START_TIMES = (datetime.datetime(2020, 1, 1, 0, 0, 0),
+                    datetime.datetime(2020, 1, 1, 0, 0, 30),
+                    datetime.datetime(2020, 1, 1, 0, 1, 0))
+
+#: The number of pings of each channel in each file.
+PINGS_PER_FILE = 20
+
+
+def _nt_time(time):
+    nt = int((time - NT_EPOCH).total_seconds() * 1e7)
+    return nt & 0xffffffff, nt >> 32
+
+
+def _datagram(content):
+    size = struct.pack('=l', len(content))
+    return size + content + size
+
+
+def _con0(time, channels):
+    low_date, high_date = _nt_time(time)
+    content = struct.pack('=4sLL128s128s128s30s98sl', b'CON0', low_date,
+            high_date, b'survey', b'transect', b'ER60', b'2.4.3', b'',
+            len(channels))
+    for channel_id, frequency in channels:
+        content += struct.pack('=128slfffffffffffffff5f8s5f8s5f8s16s28s',
+                channel_id.encode(), 1, frequency, 25.0, -20.0, 7.0, 7.0,
+                21.9, 21.9, 0.0, 0.0, 0, 0, 0, 0, 0, 0,
+                0.000256, 0.000512, 0.001024, 0.002048, 0.004096, b'',
+                *([25.0] * 5), b'', *([0.0] * 5), b'', b'070413', b'')
+    return _datagram(content)
+
+
+def _raw0(time, channel, count, frequency, seed, mode=3,
+          pulse_length=0.001024, transmit_mode=0):
+    low_date, high_date = _nt_time(time)
+    content = struct.pack('=4sLLhhfffffffffffffh6sll', b'RAW0', low_date,
+            high_date, channel, mode, 5.0, frequency, 1000., pulse_length,
+            2425., 0.000256, 1500., 0.01, 0, 0, 0, 10., 0, transmit_mode,
+            b'', 0, count)
+    rng = np.random.RandomState(seed)
+    power = rng.randint(-20000, 0, count).astype('<i2').tobytes()
+    angle = rng.randint(0, 65535, count).astype('<u2').tobytes()
+    if mode & 1:
+        content += power
+    if mode & 2:
+        content += angle
+    return _datagram(content)
+
+
+def _nme0(time, sentence):
+    low_date, high_date = _nt_time(time)
+    text = sentence.encode() + b'\x00'
+    text += b'\x00' * ((4 - len(text) % 4) % 4)
+    return _datagram(struct.pack('=4sLL', b'NME0', low_date, high_date) + text)
+
+
+def _bot0(time, depths):
+    low_date, high_date = _nt_time(time)
+    return _datagram(struct.pack('=4sLLL%dd' % len(depths), b'BOT0',
+            low_date, high_date, len(depths), *depths))
+
+
+def _dep0(time, depths, reflectivity):
+    low_date, high_date = _nt_time(time)
+    content = struct.pack('=4sLLL', b'DEP0', low_date, high_date, len(depths))
+    for depth, value in zip(depths, reflectivity):
+        content += struct.pack('=3f', depth, value, 0.0)
+    return _datagram(content)
+
+
+def write_bottom_file(filename, start_time, times, depths, reflectivity=None,
+                      channels=CHANNELS):
+    """Writes a synthetic .bot file, or a .out file if reflectivity is given.
+
+    Args:
+        filename (str): The path of the file to write.
+        start_time (datetime): The time of the configuration datagram.
+        times (list): The datetimes of the bottom detections.
+        depths (list): The depths of each detection, one per channel.
+        reflectivity (list): Optional reflectivity values of each detection,
+            one per channel. DEP0 datagrams are written if given and BOT0
+            datagrams if not.
+        channels (tuple): (channel ID, frequency) tuples of the channels.
+    """
+    data = _con0(start_time, channels)
+    for i, time in enumerate(times):
+        if reflectivity is None:
+            data += _bot0(time, depths[i])
+        else:
+            data += _dep0(time, depths[i], reflectivity[i])
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(data)
+
+
+def write_raw_file(filename, start_time, n_pings=PINGS_PER_FILE, counts=None,
+                   channels=CHANNELS, transmit_modes=None, pulse_lengths=None):
+    """Writes a synthetic .raw file with a ping per second.
+
+    Args:
+        filename (str): The path of the file to write.
+        start_time (datetime): The time of the configuration datagram.
+        n_pings (int): The number of pings of each channel.
+        counts (list): Optional list of the sample counts of each ping. By
+            default the counts cycle through 100, 110 and 120.
+        channels (tuple): (channel ID, frequency) tuples of the channels.
+        transmit_modes (list): Optional list of the transmit modes of each
+            ping. By default every ping has transmit mode 0.
+        pulse_lengths (list): Optional list of the pulse lengths of each
+            ping. By default every ping has a pulse length of 0.001024 s.
+    """
+    data = _con0(start_time, channels)
+    for ping in range(n_pings):
+        time = start_time + datetime.timedelta(seconds=ping + 0.5)
+        data += _nme0(time, '$GPGGA,%06d,1,2,3*00' % ping)
+        count = counts[ping] if counts is not None else 100 + (ping % 3) * 10
+        raw_options = {}
+        if transmit_modes is not None:
+            raw_options['transmit_mode'] = transmit_modes[ping]
+        if pulse_lengths is not None:
+            raw_options['pulse_length'] = pulse_lengths[ping]
+        for channel, (channel_id, frequency) in enumerate(channels, 1):
+            data += _raw0(time + datetime.timedelta(milliseconds=channel),
+                    channel, count, frequency, ping * 10 + channel,
+                    **raw_options)
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(data)
+
+
+@pytest.fixture(scope='session')
+def raw_files(tmp_path_factory):
+    """Three consecutive .raw files with the same configuration. The sample
+    counts of the third file change so its pings must be resized."""
+    path = tmp_path_factory.mktemp('raw')
+    filenames = []
+    for i, start_time in enumerate(FILE_START_TIMES):
+        filename = str(path / start_time.strftime('D%Y%m%d-T%H%M%S.raw'))
+        counts = None
+        if i == 2:
+            counts = [50] * 10 + [400] + [50] * 9
+        write_raw_file(filename, start_time, counts=counts)
+        filenames.append(filename)
+    return filenames
@@ -0,0 +1,118 @@
+# coding=utf-8
+
+import datetime
+
+import numpy as np
+import pytest
+
+from conftest import FILE_START_TIMES, write_bottom_file
+from echolab2.instruments import EK60
+
+
+def _detections():
+    """Returns the times and the depths of each channel of the detections,
+    and the expected detected_bottom index of each channel's detections.
+
+    The detections are in the first file. Channel 1 pings are 1 ms after the
+    whole half second and channel 2 pings are 2 ms after it, so each detection
+    only matches one channel.
+    """
+    start_time = FILE_START_TIMES[0]
+    times = []
+    expected = {1: {}, 2: {}}
+    for i, (ping, channel) in enumerate([(7, 1), (2, 1), (3, 2), (5, 1),
+                                         (5, 2), (2, 1), (11, 2)]):
+        times.append(start_time + datetime.timedelta(seconds=ping + 0.5,
+                milliseconds=channel))
+        # Ping 2 of channel 1 is detected twice and the last one is used.
+        expected[channel][ping] = i
+
+    # A detection that doesn't match any ping.
+    times.append(start_time + datetime.timedelta(seconds=4.7))
+
+    depths = [[10. + i, 20. + i] for i in range(len(times))]
+    return times, depths, expected
+
+
+@pytest.mark.parametrize('reflectivity', [False, True])
+@pytest.mark.parametrize('read_bot', [False, True])
+def test_bottom_detections(raw_files, tmp_path, reflectivity, read_bot):
+    times, depths, expected = _detections()
+    if reflectivity:
+        values = [[-30. - i, -40. - i] for i in range(len(times))]
+        filename = str(tmp_path / 'D20200101-T000000.out')
+    else:
+        values = None
+        filename = str(tmp_path / 'D20200101-T000000.bot')
+    write_bottom_file(filename, FILE_START_TIMES[0], times, depths,
+                      reflectivity=values)
+
+    ek60 = EK60.EK60()
+    if read_bot:
+        ek60.read_raw(raw_files[0])
+        ek60.read_bot(filename)
+    else:
+        ek60.read_raw([raw_files[0], filename])
+
+    for channel, channel_id in enumerate(ek60.channel_ids, 1):
+        raw_data = ek60.raw_data[channel_id]
+        expected_depths = np.full(raw_data.n_pings, np.nan)
+        expected_values = np.full(raw_data.n_pings, np.nan)
+        for ping, i in expected[channel].items():
+            expected_depths[ping] = depths[i][channel - 1]
+            if reflectivity:
+                expected_values[ping] = values[i][channel - 1]
+        assert np.array_equal(raw_data.detected_bottom, expected_depths,
+                              equal_nan=True)
+        if reflectivity:
+            assert np.allclose(raw_data.bottom_reflectivity, expected_values,
+                               equal_nan=True)
+        else:
+            assert not hasattr(raw_data, 'bottom_reflectivity')
+
+
+def test_append_bots(raw_files):
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files[0])
+    raw_data = ek60.raw_data[ek60.channel_ids[0]]
+    ping_time = raw_data.ping_time
+
+    # An exact match, a time between pings and the same ping twice.
+    detection_times = np.array([ping_time[4], ping_time[1] +
+            np.timedelta64(1, 'ms'), ping_time[9], ping_time[4]])
+    raw_data.append_bots(detection_times, [1., 2., 3., 4.],
+                         reflectivity=[-1., -2., -3., -4.])
+
+    expected_depths = np.full(raw_data.n_pings, np.nan)
+    expected_depths[[4, 9]] = [4., 3.]
+    assert np.array_equal(raw_data.detected_bottom, expected_depths,
+                          equal_nan=True)
+    expected_depths[[4, 9]] = [-4., -3.]
+    assert np.array_equal(raw_data.bottom_reflectivity, expected_depths,
+                          equal_nan=True)
+
+    # Later detections only replace the pings they match.
+    raw_data.append_bot(ping_time[0], 5.)
+    assert raw_data.detected_bottom[0] == 5.
+    assert raw_data.detected_bottom[4] == 4.
+    assert np.isnan(raw_data.bottom_reflectivity[0])
+
+    # No detections.
+    raw_data.append_bots(np.array([], dtype='datetime64[ms]'), [])
+    assert np.count_nonzero(~np.isnan(raw_data.detected_bottom)) == 3
+
+
+def test_raw_after_bottom(raw_files, tmp_path):
+    # Pings read after the .bot file have no detections.
+    times, depths, expected = _detections()
+    filename = str(tmp_path / 'D20200101-T000000.bot')
+    write_bottom_file(filename, FILE_START_TIMES[0], times, depths)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw([raw_files[0], filename, raw_files[1]])
+
+    raw_data = ek60.raw_data[ek60.channel_ids[0]]
+    assert raw_data.detected_bottom.shape[0] == raw_data.n_pings == 40
+    assert np.all(np.isnan(raw_data.detected_bottom[20:]))
+    assert np.count_nonzero(~np.isnan(raw_data.detected_bottom)) == \
+            len(expected[1])
@@ -0,0 +1,119 @@
+# coding=utf-8
+
+import functools
+import http.server
+import os
+import threading
+import zipfile
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.byte_source import (BufferSource,
+        FileObjectSource, HTTPRangeSource)
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves files with or without support for range requests and counts
+    the requests and bytes sent."""
+
+    support_ranges = True
+    requests = []
+
+    def send_head(self):
+        byte_range = self.headers.get('Range')
+        if not self.support_ranges or byte_range is None:
+            return super(RangeRequestHandler, self).send_head()
+
+        with open(self.translate_path(self.path), 'rb') as served_file:
+            data = served_file.read()
+        start, stop = byte_range.split('=')[1].split('-')
+        start, stop = int(start), min(int(stop), len(data) - 1)
+        self.send_response(206)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, stop,
+                len(data)))
+        self.send_header('Content-Length', str(stop - start + 1))
+        self.end_headers()
+        if self.command == 'HEAD':
+            return None
+        self.wfile.write(data[start:stop + 1])
+        self.requests.append(stop - start + 1)
+        return None
+
+    def copyfile(self, source, outputfile):
+        data = source.read()
+        outputfile.write(data)
+        self.requests.append(len(data))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(params=[True, False], ids=['ranges', 'no_ranges'])
+def http_url(request, raw_files):
+    handler = type('Handler', (RangeRequestHandler,),
+                   {'support_ranges': request.param, 'requests': []})
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+            functools.partial(handler, directory=os.path.dirname(
+            raw_files[0])))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield ('http://127.0.0.1:%d/%s' % (server.server_address[1],
+            os.path.basename(raw_files[0])), handler)
+    server.shutdown()
+    server.server_close()
+
+
+def _assert_same_data(ek60, reference):
+    assert ek60.channel_ids == reference.channel_ids
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == reference_data.n_pings
+        assert np.array_equal(raw_data.ping_time, reference_data.ping_time)
+        assert np.array_equal(raw_data.get_power().data,
+                reference_data.get_power().data, equal_nan=True)
+
+
+@pytest.fixture
+def reference(raw_files):
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files[0])
+    return ek60
+
+
+def test_buffer_source(raw_files, reference):
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(BufferSource(data, name=raw_files[0]))
+    _assert_same_data(ek60, reference)
+
+
+def test_file_object_source(raw_files, reference, tmp_path):
+    zip_filename = str(tmp_path / 'raw.zip')
+    with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.write(raw_files[0], os.path.basename(raw_files[0]))
+
+    with zipfile.ZipFile(zip_filename) as archive:
+        ek60 = EK60.EK60()
+        ek60.read_raw(FileObjectSource(archive.open(
+                os.path.basename(raw_files[0]))))
+    _assert_same_data(ek60, reference)
+
+
+def test_http_range_source(http_url, raw_files, reference):
+    url, handler = http_url
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(HTTPRangeSource(url))
+    _assert_same_data(ek60, reference)
+
+    # A server without range support only sends the file once.
+    if not handler.support_ranges:
+        assert handler.requests == [os.path.getsize(raw_files[0])]
+    else:
+        assert sum(handler.requests) <= 2 * os.path.getsize(raw_files[0])
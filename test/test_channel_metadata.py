@@ -0,0 +1,27 @@
+# coding=utf-8
+
+import os
+
+import pytest
+
+from echolab2.instruments import EK60
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_metadata_per_file(raw_files, workers):
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, workers=workers)
+
+    for raw_data in ek60.raw_data.values():
+        metadata = raw_data.channel_metadata[:raw_data.n_pings]
+        for i, filename in enumerate(raw_files):
+            file_metadata = metadata[i * 20:(i + 1) * 20]
+            assert all(md is file_metadata[0] for md in file_metadata)
+            assert file_metadata[0].data_file == os.path.basename(filename)
+            assert file_metadata[0].end_ping == (i + 1) * 20
+            if i > 0:
+                assert file_metadata[0].start_ping == i * 20
+                assert file_metadata[0] is not metadata[0]
+
+                # The files have the same configuration so they share it.
+                assert file_metadata[0].transceiver is metadata[0].transceiver
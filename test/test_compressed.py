@@ -0,0 +1,110 @@
+# coding=utf-8
+
+import bz2
+import gzip
+import lzma
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.ek60_raw_file import (RawSimradFile,
+        RawSimradCompressedFile)
+
+
+COMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+
+
+@pytest.fixture(params=sorted(COMPRESSORS))
+def compressed_file(request, raw_files, tmp_path):
+    filename = str(tmp_path / ('D20200101-T000000.raw' + request.param))
+    with open(raw_files[0], 'rb') as raw_file:
+        with COMPRESSORS[request.param](filename, 'wb') as compressed:
+            compressed.write(raw_file.read())
+    return filename
+
+
+@pytest.mark.parametrize('bounds', [{},
+        {'start_time': '2020-01-01 00:00:05',
+         'end_time': '2020-01-01 00:00:12'}])
+def test_read_compressed(raw_files, compressed_file, bounds):
+    reference = EK60.EK60()
+    reference.read_raw(raw_files[0], **bounds)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(compressed_file, **bounds)
+
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == reference_data.n_pings
+        assert np.array_equal(raw_data.ping_time, reference_data.ping_time)
+        assert np.array_equal(raw_data.get_power().data,
+                reference_data.get_power().data, equal_nan=True)
+
+
+def test_random_access(raw_files, compressed_file):
+    with RawSimradFile(raw_files[0], 'r') as fid:
+        assert fid.random_access
+    with RawSimradFile(compressed_file, 'r') as fid:
+        assert fid.random_access == compressed_file.endswith('.gz')
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'bz2'])
+def test_random_seeks(raw_files, tmp_path, compression, monkeypatch):
+    # Small restart intervals and windows so the file has many restart
+    # points and the window is trimmed as it is read.
+    monkeypatch.setattr(RawSimradCompressedFile, 'READ_SIZE', 512)
+    monkeypatch.setattr(RawSimradCompressedFile, 'RESTART_INTERVAL', 2048)
+    monkeypatch.setattr(RawSimradCompressedFile, 'WINDOW_SIZE', 4096)
+
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+
+    # bz2 files only have restart points between streams so this one is
+    # written as four streams.
+    filename = str(tmp_path / ('D20200101-T000000.raw.' + compression))
+    if compression == 'gzip':
+        with gzip.open(filename, 'wb') as compressed:
+            compressed.write(data)
+    else:
+        splits = np.linspace(0, len(data), 5).astype(int)
+        with open(filename, 'wb') as compressed:
+            for start, end in zip(splits, splits[1:]):
+                compressed.write(bz2.compress(data[start:end]))
+
+    with RawSimradFile(raw_files[0], 'r') as fid:
+        index = fid.get_index(save=False)
+        datagrams = []
+        for offset in index['offset']:
+            fid._seek_bytes(int(offset))
+            datagrams.append(fid.read(1))
+
+    rng = np.random.RandomState(0)
+    with RawSimradFile(filename, 'r') as fid:
+        assert isinstance(fid, RawSimradCompressedFile)
+
+        # Read through the file once so the restart points are known.  Only
+        # the end of the data is kept.
+        fid.read(1)
+        while not fid.at_eof():
+            fid.read(1)
+        assert len(fid._restart_points) >= 4
+        assert len(fid._window) < len(data) // 2
+
+        # Read byte ranges and datagrams in a random order.
+        for offset in rng.randint(0, len(data), 50):
+            fid._seek_bytes(int(offset))
+            assert fid._read_bytes(300) == data[offset:offset + 300]
+            assert len(fid._window) < len(data) // 2
+
+        for i in rng.permutation(index.shape[0]):
+            fid._seek_bytes(int(index['offset'][i]))
+            datagram = fid.read(1)
+            assert datagram['type'] == datagrams[i]['type']
+            assert datagram['timestamp'] == datagrams[i]['timestamp']
+            if datagram['type'].startswith('RAW'):
+                assert np.array_equal(datagram['power'],
+                                      datagrams[i]['power'])
+                assert np.array_equal(datagram['angle'],
+                                      datagrams[i]['angle'])
@@ -0,0 +1,38 @@
+# coding=utf-8
+
+import numpy as np
+
+from echolab2.instruments.util.date_conversion import (nt_to_unix,
+        unix_to_nt, nt_to_datetime64, datetime64_to_nt)
+
+
+def test_nt_to_datetime64():
+    assert nt_to_datetime64(19496896, 30196149) == \
+            np.datetime64('2011-12-23T20:54:03.964')
+
+    # The vectorized conversion matches the scalar conversion.
+    rng = np.random.RandomState(0)
+    nt_time = rng.randint(119600064000000000, 157469184000000000, 100,
+                          dtype=np.int64)
+    low_date = (nt_time & 0xFFFFFFFF).astype('uint32')
+    high_date = (nt_time >> 32).astype('uint32')
+    times = nt_to_datetime64(low_date, high_date, unit='us')
+
+    # nt_to_unix returns float seconds, which only resolve a few
+    # microseconds.
+    for i in range(nt_time.shape[0]):
+        unix_time = nt_to_unix((int(low_date[i]), int(high_date[i])),
+                               return_datetime=False)
+        assert abs(times[i].astype('int64') - unix_time * 1e6) < 10.0
+
+
+def test_datetime64_to_nt():
+    assert datetime64_to_nt(np.datetime64('2011-12-23T20:54:03.964')) == \
+            (19496896, 30196149)
+
+    times = np.arange('2020-01-01T00:00', '2020-01-01T01:00',
+                      dtype='datetime64[m]').astype('datetime64[ms]')
+    low_date, high_date = datetime64_to_nt(times)
+    assert np.array_equal(nt_to_datetime64(low_date, high_date), times)
+    assert unix_to_nt(times[10].astype(object)) == \
+            (low_date[10], high_date[10])
@@ -0,0 +1,126 @@
+# coding=utf-8
+
+import os
+
+import numpy as np
+
+from echolab2.instruments import EK60
+
+
+def test_follow_growing_file(raw_files, tmp_path):
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+
+    # Write the file in pieces that split datagrams, and follow it.
+    filename = str(tmp_path / 'D20200101-T000000.raw')
+    pieces = np.linspace(0, len(data), 6).astype(int)
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(data[0:pieces[1]])
+
+    ek60 = EK60.EK60()
+    n_pings = 0
+    written = 1
+    for new_pings in ek60.follow(filename, poll_interval=0.01,
+                                 idle_timeout=0.05):
+        n_pings += new_pings[ek60.channel_ids[0]]
+        raw_data = ek60.raw_data[ek60.channel_ids[0]]
+        assert raw_data.n_pings == n_pings
+
+        # The data can be used between polls.
+        assert raw_data.get_power().n_pings == n_pings
+        assert raw_data.snapshot().ping_time.shape[0] == n_pings
+
+        if written < len(pieces) - 1:
+            with open(filename, 'ab') as raw_file:
+                raw_file.write(data[pieces[written]:pieces[written + 1]])
+            written += 1
+
+    # The arrays keep their room for new pings between polls.
+    assert written == len(pieces) - 1
+    assert raw_data.ping_time.shape[0] > raw_data.n_pings
+
+    reference = EK60.EK60()
+    reference.read_raw(raw_files[0])
+    for channel_id in reference.channel_ids:
+        assert ek60.raw_data[channel_id].n_pings == 20
+        assert np.array_equal(ek60.raw_data[channel_id].get_power().data,
+                reference.raw_data[channel_id].get_power().data,
+                equal_nan=True)
+
+
+def test_follow_rollover(raw_files, tmp_path):
+    data = []
+    for filename in raw_files:
+        with open(filename, 'rb') as raw_file:
+            data.append(raw_file.read())
+    filenames = [str(tmp_path / os.path.basename(filename)) for filename in
+                 raw_files]
+
+    # Files with other extensions and earlier names are not followed.
+    (tmp_path / 'D20191231-T235959.raw').write_bytes(data[0])
+    (tmp_path / 'D20200101-T000015.bot').write_bytes(b'')
+
+    # Start with half of the first file.  Once it is being followed, finish
+    # it and start recording the next file, and then the one after that.
+    with open(filenames[0], 'wb') as raw_file:
+        raw_file.write(data[0][0:len(data[0]) // 2])
+
+    ek60 = EK60.EK60()
+    written = 0
+    for new_pings in ek60.follow(filenames[0], poll_interval=0.01,
+                                 idle_timeout=0.05):
+        if written < len(filenames):
+            with open(filenames[written], 'wb') as raw_file:
+                raw_file.write(data[written])
+            written += 1
+
+    assert written == len(filenames)
+    assert ek60.read_stats.n_files == len(filenames)
+
+    reference = EK60.EK60()
+    reference.read_raw(raw_files)
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == reference_data.n_pings
+        assert np.array_equal(raw_data.ping_time[0:raw_data.n_pings],
+                              reference_data.ping_time)
+        assert np.array_equal(raw_data.get_power().data,
+                reference_data.get_power().data, equal_nan=True)
+        assert [os.path.basename(md.data_file) for md in
+                raw_data.channel_metadata[0:raw_data.n_pings]] == \
+                [os.path.basename(md.data_file) for md in
+                 reference_data.channel_metadata]
+
+
+def test_next_raw_file(tmp_path):
+    for name in ['D20200101-T000000.raw', 'D20200101-T000030.raw',
+                 'D20200101-T000030.bot', 'D20200101-T000100.RAW']:
+        (tmp_path / name).write_bytes(b'')
+
+    ek60 = EK60.EK60()
+    assert ek60._next_raw_file(str(tmp_path / 'D20200101-T000000.raw')) == \
+            str(tmp_path / 'D20200101-T000030.raw')
+    assert ek60._next_raw_file(str(tmp_path / 'D20200101-T000030.raw')) == \
+            str(tmp_path / 'D20200101-T000100.RAW')
+    assert ek60._next_raw_file(str(tmp_path / 'D20200101-T000100.RAW')) is None
+
+
+def test_follow_options(raw_files, monkeypatch):
+    # The options that don't apply to a growing file are ignored.
+    def no_prefetcher(*args, **kwargs):
+        raise AssertionError('A growing file should not be prefetched')
+
+    monkeypatch.setattr(EK60, 'RawFilePrefetcher', no_prefetcher)
+    ek60 = EK60.EK60()
+    for new_pings in ek60.follow(raw_files[0], poll_interval=0.01,
+                                 idle_timeout=0.02, prefetch=True,
+                                 memory_map=True, workers=2):
+        pass
+
+    assert ek60.read_prefetch is None
+    assert ek60.read_memory_map is False
+    # The other fixture files are in the same directory so they are read too.
+    assert ek60.read_stats.n_files == len(raw_files)
+    for channel_id in ek60.channel_ids:
+        assert ek60.raw_data[channel_id].n_pings == 20 * len(raw_files)
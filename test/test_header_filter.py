@@ -0,0 +1,88 @@
+# coding=utf-8
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+
+from conftest import FILE_START_TIMES, write_raw_file
+
+
+N_PINGS = 20
+COUNTS = [0 if ping in (3, 4, 11, 12) else 100 for ping in range(N_PINGS)]
+TRANSMIT_MODES = [ping % 2 for ping in range(N_PINGS)]
+PULSE_LENGTHS = [0.000512 if ping % 3 == 0 else 0.001024 for ping in
+                 range(N_PINGS)]
+
+READ_OPTIONS = [{}, {'memory_map': True}, {'prescan': True},
+                {'use_index': True}]
+
+
+@pytest.fixture(scope='module')
+def mixed_file(tmp_path_factory):
+    """A file whose pings have different transmit modes and pulse lengths.
+    Some of the pings of each kind have no samples."""
+    filename = str(tmp_path_factory.mktemp('mixed') /
+                   'D20200101-T000000.raw')
+    write_raw_file(filename, FILE_START_TIMES[0], n_pings=N_PINGS,
+                   counts=COUNTS, transmit_modes=TRANSMIT_MODES,
+                   pulse_lengths=PULSE_LENGTHS)
+    return filename
+
+
+def _option_id(options):
+    return ','.join('%s=%s' % item for item in sorted(options.items()))
+
+
+@pytest.mark.parametrize('options', READ_OPTIONS, ids=_option_id)
+@pytest.mark.parametrize('header_filter, stored', [
+        ({'transmit_modes': [1]}, np.array(TRANSMIT_MODES) == 1),
+        ({'pulse_lengths': [0.000512]},
+         np.isclose(PULSE_LENGTHS, 0.000512))], ids=['transmit_modes',
+                                                     'pulse_lengths'])
+def test_header_filter(mixed_file, header_filter, stored, options):
+    reference = EK60.EK60()
+    reference.read_raw(mixed_file)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(mixed_file, **dict(header_filter, **options))
+
+    # Only the matching pings are stored, with and without samples.
+    assert np.any(stored & (np.array(COUNTS) == 0))
+    assert ek60.n_pings == reference.n_pings
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == np.count_nonzero(stored)
+        assert np.array_equal(raw_data.ping_time,
+                              reference_data.ping_time[stored])
+        assert np.array_equal(raw_data.sample_count,
+                              reference_data.sample_count[stored])
+        assert np.array_equal(raw_data.get_power().data,
+                reference_data.get_power().data[stored,
+                0:raw_data.power.shape[1]], equal_nan=True)
+
+
+@pytest.mark.parametrize('options', READ_OPTIONS, ids=_option_id)
+@pytest.mark.parametrize('end_ping', [3, 4, 5, 13])
+def test_end_ping(mixed_file, end_ping, options):
+    reference = EK60.EK60()
+    reference.read_raw(mixed_file)
+
+    # The RAW header filter skips the sample data once it is past the end
+    # ping. The pings stored are the same as the first pings of a full read.
+    ek60 = EK60.EK60()
+    ek60.read_raw(mixed_file, end_ping=end_ping, **options)
+
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == end_ping
+        assert np.array_equal(raw_data.ping_time,
+                              reference_data.ping_time[0:end_ping])
+        assert np.array_equal(raw_data.sample_count,
+                              reference_data.sample_count[0:end_ping])
+        assert np.array_equal(raw_data.get_power().data,
+                reference_data.get_power(end_ping=end_ping).data[:,
+                0:raw_data.power.shape[1]], equal_nan=True)
+    assert ek60.end_ping == end_ping
@@ -0,0 +1,104 @@
+# coding=utf-8
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.ek60_raw_file import RawSimradFile
+
+
+@pytest.fixture
+def indexed_files(raw_files, tmp_path):
+    """Copies of the raw files, so their index files are removed after
+    each test."""
+    filenames = []
+    for filename in raw_files:
+        filenames.append(shutil.copy(filename, str(tmp_path)))
+    return filenames
+
+
+def test_index_entries(indexed_files):
+    with RawSimradFile(indexed_files[0], 'r') as fid:
+        index = fid.get_index()
+        assert os.path.exists(fid.index_filename())
+        assert index.shape[0] == 1 + 20 * 3
+        assert index['type'][0] == b'CON0'
+
+        is_raw = np.char.startswith(index['type'], b'RAW')
+        assert np.array_equal(np.unique(index['channel'][is_raw]), [1, 2])
+        assert np.all(index['channel'][~is_raw] == -1)
+
+        # Each datagram can be read at its indexed offset.
+        for entry in index[is_raw][0:5]:
+            fid._seek_bytes(int(entry['offset']))
+            datagram = fid.read(1)
+            assert datagram['channel'] == entry['channel']
+            assert datagram['count'] == entry['count']
+
+    with RawSimradFile(indexed_files[0], 'r') as fid:
+        assert np.array_equal(fid.load_index(), index)
+
+
+def test_stale_index(indexed_files):
+    with RawSimradFile(indexed_files[0], 'r') as fid:
+        fid.get_index()
+    with open(indexed_files[0], 'ab') as raw_file:
+        raw_file.write(b'\0' * 8)
+    with RawSimradFile(indexed_files[0], 'r') as fid:
+        assert fid.load_index() is None
+
+
+@pytest.mark.parametrize('bounds', [{},
+        {'start_time': '2020-01-01 00:00:25',
+         'end_time': '2020-01-01 00:01:05'},
+        {'start_ping': 15, 'end_ping': 45},
+        {'channel_ids': ['GPT 120 kHz 00907203422d 1-1 ES120-7']}])
+def test_read_with_index(indexed_files, bounds):
+    reference = EK60.EK60()
+    reference.read_raw(indexed_files, **bounds)
+
+    # Read twice, building and then loading the index.
+    for i in range(2):
+        ek60 = EK60.EK60()
+        ek60.read_raw(indexed_files, use_index=True, **bounds)
+
+        assert ek60.channel_ids == reference.channel_ids
+        for channel_id in reference.channel_ids:
+            raw_data = ek60.raw_data[channel_id]
+            reference_data = reference.raw_data[channel_id]
+            assert raw_data.n_pings == reference_data.n_pings
+            assert np.array_equal(raw_data.ping_time,
+                    reference_data.ping_time)
+            assert np.array_equal(raw_data.get_power().data,
+                    reference_data.get_power().data, equal_nan=True)
+
+
+@pytest.mark.parametrize('bounds', [
+        {'start_time': '2020-01-01 00:00:25'},
+        {'end_time': '2020-01-01 00:00:42'},
+        {'start_time': '2020-01-01 00:00:33',
+         'end_time': '2020-01-01 00:00:42'},
+        {'start_time': '2020-01-01 00:05:00'}])
+def test_index_time_slice(indexed_files, bounds, monkeypatch):
+    # With a small tolerance the index is sliced within the files.
+    monkeypatch.setattr(EK60.EK60, 'TIME_BOUND_TOLERANCE',
+                        np.timedelta64(2, 's'))
+    reference = EK60.EK60()
+    reference.read_raw(indexed_files, **bounds)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(indexed_files, use_index=True, **bounds)
+
+    assert ek60.n_pings == reference.n_pings
+    assert ek60.end_time == reference.end_time
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == reference_data.n_pings
+        assert np.array_equal(raw_data.ping_time, reference_data.ping_time)
+        assert [(md.start_ping, md.end_ping) for md in
+                raw_data.channel_metadata] == [(md.start_ping, md.end_ping)
+                for md in reference_data.channel_metadata]
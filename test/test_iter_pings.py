@@ -0,0 +1,101 @@
+# coding=utf-8
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.ek60_raw_file import RawSimradFile
+
+
+@pytest.mark.parametrize('block_size', [1, 7, 25, 100])
+@pytest.mark.parametrize('bounds', [{},
+        {'start_time': '2020-01-01 00:00:10',
+         'end_time': '2020-01-01 00:01:03'},
+        {'start_ping': 5, 'end_ping': 33}])
+def test_iter_pings(raw_files, block_size, bounds):
+    reference = EK60.EK60()
+    reference.read_raw(raw_files, **bounds)
+
+    ping_times = {}
+    power = {}
+    ek60 = EK60.EK60()
+    for block in ek60.iter_pings(raw_files, block_size=block_size, **bounds):
+        for channel_id, raw_data in block.items():
+            assert 0 < raw_data.n_pings <= block_size
+            ping_times.setdefault(channel_id, []).append(raw_data.ping_time)
+            power.setdefault(channel_id, []).append(
+                    raw_data.get_power().data)
+
+    assert sorted(ping_times) == sorted(reference.channel_ids)
+    assert ek60.nmea_data.n_raw == reference.nmea_data.n_raw
+    for channel_id in reference.channel_ids:
+        reference_data = reference.raw_data[channel_id]
+        assert np.array_equal(np.concatenate(ping_times[channel_id]),
+                reference_data.ping_time)
+
+        # The blocks are only as wide as their longest ping.
+        reference_power = reference_data.get_power().data
+        start = 0
+        for block_power in power[channel_id]:
+            end = start + block_power.shape[0]
+            assert np.array_equal(block_power, reference_power[start:end,
+                    0:block_power.shape[1]], equal_nan=True)
+            assert np.all(np.isnan(reference_power[start:end,
+                    block_power.shape[1]:]))
+            start = end
+        assert start == reference_data.n_pings
+
+
+@pytest.mark.parametrize('bounds', [
+        {'start_time': '2020-01-01 00:01:10'},
+        {'start_time': '2020-01-01 00:00:10',
+         'end_time': '2020-01-01 00:00:15'}])
+def test_iter_pings_skips(raw_files, monkeypatch, bounds):
+    # A small window so the files are bisected by seek_time.
+    monkeypatch.setattr(RawSimradFile, 'RESYNC_WINDOW', 1024)
+    monkeypatch.setattr(EK60.EK60, 'TIME_BOUND_TOLERANCE',
+            np.timedelta64(2, 's'))
+    reference = EK60.EK60()
+    reference.read_raw(raw_files, **bounds)
+
+    # Files outside of the bounds are skipped, the start of the file is
+    # skipped and reading stops at the end time like read_raw.
+    ek60 = EK60.EK60()
+    ping_times = {}
+    for block in ek60.iter_pings(raw_files, block_size=10, **bounds):
+        for channel_id, raw_data in block.items():
+            ping_times.setdefault(channel_id, []).append(raw_data.ping_time)
+
+    assert ek60.read_stats.n_files == reference.read_stats.n_files
+    assert (ek60.read_stats.n_files_skipped ==
+            reference.read_stats.n_files_skipped)
+    assert ek60.read_stats.datagrams == reference.read_stats.datagrams
+    assert (ek60.read_stats.datagrams['RAW0'] <
+            2 * 20 * (3 - ek60.read_stats.n_files_skipped))
+    for channel_id in reference.channel_ids:
+        assert np.array_equal(np.concatenate(ping_times[channel_id]),
+                reference.raw_data[channel_id].ping_time)
+
+
+def test_iter_pings_prefetch(raw_files, monkeypatch):
+    readers = []
+
+    class RecordingPrefetcher(EK60.RawFilePrefetcher):
+        def set_reader(self, file_number, fid):
+            readers.append(file_number)
+            super(RecordingPrefetcher, self).set_reader(file_number, fid)
+
+    monkeypatch.setattr(EK60, 'RawFilePrefetcher', RecordingPrefetcher)
+    reference = EK60.EK60()
+    reference.read_raw(raw_files)
+
+    ek60 = EK60.EK60()
+    ping_times = {}
+    for block in ek60.iter_pings(raw_files, block_size=7, prefetch=4096):
+        for channel_id, raw_data in block.items():
+            ping_times.setdefault(channel_id, []).append(raw_data.ping_time)
+
+    assert readers == [0, 1, 2]
+    for channel_id in reference.channel_ids:
+        assert np.array_equal(np.concatenate(ping_times[channel_id]),
+                reference.raw_data[channel_id].ping_time)
@@ -0,0 +1,91 @@
+# coding=utf-8
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.ek60_raw_file import RawSimradFile
+
+
+CHANNEL_ID = 'GPT  38 kHz 009072033fa2 1-1 ES38B'
+
+
+@pytest.fixture(scope='module')
+def reference(raw_files):
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, channel_ids=[CHANNEL_ID])
+    return ek60.raw_data[CHANNEL_ID]
+
+
+@pytest.fixture(scope='module')
+def datagrams(raw_files):
+    """The channel 1 RAW0 datagrams of the raw files."""
+    datagrams = []
+    for filename in raw_files:
+        with RawSimradFile(filename, 'r') as fid:
+            fid.read(1)
+            while not fid.at_eof():
+                datagram = fid.read(1)
+                if datagram['type'] == 'RAW0' and datagram['channel'] == 1:
+                    datagrams.append(datagram)
+    return datagrams
+
+
+def _append(raw_data, datagrams, metadata):
+    raw_data.current_metadata = metadata
+    for datagram in datagrams:
+        raw_data.append_ping(dict(datagram))
+
+
+def test_geometric_growth(reference, datagrams, monkeypatch):
+    sizes = []
+    resize = EK60.RawData.resize
+
+    def record_resize(self, n_pings, n_samples):
+        sizes.append((n_pings, n_samples))
+        resize(self, n_pings, n_samples)
+
+    monkeypatch.setattr(EK60.RawData, 'resize', record_resize)
+    raw_data = EK60.RawData(CHANNEL_ID, n_pings=4, n_samples=10,
+                            chunk_width=4)
+    _append(raw_data, datagrams * 10, reference.channel_metadata[0])
+
+    # The arrays grow by half of their size so they are resized a handful
+    # of times for 600 pings, where growing by chunk_width would resize them
+    # 150 times.
+    assert raw_data.n_pings == 600
+    assert len(sizes) < 25
+    assert all(new[0] >= old[0] for old, new in zip(sizes, sizes[1:]))
+
+    # The pings, and only the samples that contain data, are returned.
+    power = raw_data.get_power(end_ping=60).data
+    assert np.array_equal(power, reference.get_power().data, equal_nan=True)
+
+
+@pytest.mark.parametrize('compact_power', [False, True])
+@pytest.mark.parametrize('n_pings', [7, 30, 100])
+def test_rolling(reference, datagrams, n_pings, compact_power):
+    raw_data = EK60.RawData(CHANNEL_ID, n_pings=n_pings, n_samples=400,
+                            rolling=True, compact_power=compact_power)
+    _append(raw_data, datagrams, reference.channel_metadata[0])
+
+    # The arrays hold the newest n_pings pings.
+    n_kept = min(n_pings, 60)
+    assert raw_data.ping_time.shape[0] == n_pings
+    assert raw_data.n_pings == n_kept
+    ping_time = reference.ping_time[60 - n_kept:]
+    assert np.array_equal(raw_data.ping_time[raw_data.get_indices()],
+                          ping_time)
+
+    reference_power = reference.get_power(start_ping=61 - n_kept).data
+    assert np.allclose(raw_data.get_power().data, reference_power,
+                       equal_nan=True, atol=1e-4)
+    assert np.allclose(raw_data.get_power(start_ping=2, end_ping=4).data,
+                       reference_power[1:4], equal_nan=True, atol=1e-4)
+    assert np.allclose(raw_data.get_power(start_time=ping_time[2]).data,
+                       reference_power[2:], equal_nan=True, atol=1e-4)
+
+    snapshot = raw_data.snapshot()
+    assert np.array_equal(snapshot.ping_time, ping_time)
+    assert np.allclose(snapshot.get_power().data, reference_power,
+                       equal_nan=True, atol=1e-4)
@@ -0,0 +1,54 @@
+# coding=utf-8
+
+import datetime
+
+import numpy as np
+
+from echolab2.instruments.util.parsers import SimradRawParser
+
+from conftest import _raw0
+
+
+def _raw_strings():
+    """RAW0 datagrams, without their size fields, with power and angles,
+    with only power, and without samples."""
+    time = datetime.datetime(2020, 1, 1, 0, 0, 0, 500000)
+    datagrams = [_raw0(time, 1, 100, 38000., 1),
+                 _raw0(time, 2, 120, 120000., 2, mode=1),
+                 _raw0(time, 1, 0, 38000., 3),
+                 _raw0(time, 2, 0, 120000., 4, mode=1),
+                 _raw0(time + datetime.timedelta(milliseconds=1001), 1, 80,
+                       38000., 5, pulse_length=0.000512, transmit_mode=1)]
+    return [datagram[4:-4] for datagram in datagrams]
+
+
+def test_from_strings():
+    parser = SimradRawParser()
+    raw_strings = _raw_strings()
+    datagrams = parser.from_strings(raw_strings)
+
+    assert len(datagrams) == len(raw_strings)
+    for raw_string, datagram in zip(raw_strings, datagrams):
+        reference = parser.from_string(raw_string)
+        assert sorted(datagram) == sorted(reference)
+        for field, value in reference.items():
+            if isinstance(value, np.ndarray):
+                assert datagram[field].dtype == value.dtype
+                assert np.array_equal(datagram[field], value)
+            else:
+                assert datagram[field] == value, field
+
+        # The header decode gives the same header fields.
+        header = parser.header_from_string(raw_string)
+        for field in parser.header_fields(0):
+            assert header[field] == reference[field], field
+
+    assert datagrams[1]['power'].shape == (120,)
+    assert datagrams[1]['angle'] is None
+    assert datagrams[2]['power'].shape == (0,)
+    assert datagrams[4]['timestamp'] == \
+            np.datetime64('2020-01-01T00:00:01.501')
+
+
+def test_from_strings_empty():
+    assert SimradRawParser().from_strings([]) == []
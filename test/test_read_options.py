@@ -0,0 +1,107 @@
+# coding=utf-8
+
+"""
+Checks that the read options that change how the files are read, but not
+what is read, give the same data as a plain read.
+"""
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+
+
+READ_OPTIONS = [{'memory_map': True},
+                {'prescan': True},
+                {'workers': 2},
+                {'workers': 2, 'prescan': True},
+                {'prefetch': True},
+                {'prefetch': 4096},
+                {'compact_power': True},
+                {'packed_angles': True},
+                {'ragged': True},
+                {'compact_power': True, 'packed_angles': True,
+                 'ragged': True}]
+
+BOUNDS = [{},
+          {'start_time': '2020-01-01 00:00:10',
+           'end_time': '2020-01-01 00:00:40'},
+          {'start_ping': 5, 'end_ping': 30},
+          {'start_sample': 10, 'end_sample': 60},
+          {'frequencies': [38000.]}]
+
+
+def _option_id(options):
+    return ','.join('%s=%s' % item for item in sorted(options.items()))
+
+
+@pytest.mark.parametrize('bounds', BOUNDS, ids=_option_id)
+@pytest.mark.parametrize('options', READ_OPTIONS, ids=_option_id)
+def test_read_options(raw_files, options, bounds):
+    reference = EK60.EK60()
+    reference.read_raw(raw_files, **bounds)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, **dict(bounds, **options))
+
+    assert ek60.channel_ids == reference.channel_ids
+    assert ek60.nmea_data.n_raw == reference.nmea_data.n_raw
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.n_pings == reference_data.n_pings
+        assert np.array_equal(raw_data.ping_time, reference_data.ping_time)
+        assert np.array_equal(raw_data.sample_count,
+                reference_data.sample_count)
+
+        # Compact power data are converted to dB in a different order so they
+        # can differ in the last bits.
+        assert np.allclose(raw_data.get_power().data,
+                reference_data.get_power().data, equal_nan=True, atol=1e-4)
+        assert np.allclose(raw_data.get_Sv().data,
+                reference_data.get_Sv().data, equal_nan=True, atol=1e-4)
+        for angles, reference_angles in zip(
+                raw_data.get_electrical_angles(),
+                reference_data.get_electrical_angles()):
+            assert np.array_equal(angles.data, reference_angles.data,
+                    equal_nan=True)
+        assert [md.data_file for md in raw_data.channel_metadata] == \
+                [md.data_file for md in reference_data.channel_metadata]
+
+
+
+@pytest.mark.parametrize('options', READ_OPTIONS, ids=_option_id)
+def test_time_span(raw_files, options):
+    # The first file ends more than TIME_BOUND_TOLERANCE before the start time
+    # so it is skipped. There are no pings in the window.
+    bounds = {'start_time': '2020-01-01 00:01:25',
+              'end_time': '2020-01-01 00:01:28'}
+    reference = EK60.EK60()
+    reference.read_raw(raw_files, **bounds)
+
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, **dict(bounds, **options))
+
+    assert reference.start_time == np.datetime64('2020-01-01T00:00:30')
+    assert ek60.start_time == reference.start_time
+    assert ek60.end_time == reference.end_time
+    assert ek60.n_pings == reference.n_pings
+
+@pytest.mark.parametrize('options', [{}, {'memory_map': True}],
+                         ids=_option_id)
+def test_sample_window(raw_files, options):
+    reference = EK60.EK60()
+    reference.read_raw(raw_files)
+
+    # Only the samples in the window are read.
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, start_sample=10, end_sample=60, **options)
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.power.shape[1] == 51
+        assert np.all(raw_data.sample_offset == 10)
+        assert np.array_equal(raw_data.power,
+                reference_data.power[:, 10:61], equal_nan=True)
+        assert np.array_equal(raw_data.angles_alongship_e,
+                reference_data.angles_alongship_e[:, 10:61], equal_nan=True)
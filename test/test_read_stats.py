@@ -0,0 +1,36 @@
+# coding=utf-8
+
+import os
+
+import pytest
+
+from echolab2.instruments import EK60
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_read_stats(raw_files, workers):
+    file_stats = []
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, workers=workers,
+                  stats_callback=lambda *args: file_stats.append(args))
+
+    stats = ek60.read_stats
+    assert stats.n_files == 3
+    assert stats.datagrams == {'CON0': 3, 'NME0': 60, 'RAW0': 120}
+    assert stats.bytes_read == sum(os.path.getsize(filename) for filename in
+            raw_files)
+    assert stats.corrupt == 0
+    assert stats.wall_time > 0
+
+    assert sorted(args[0] for args in file_stats) == sorted(raw_files)
+    assert sum(args[1].datagrams['RAW0'] for args in file_stats) == 120
+
+
+def test_skipped_files(raw_files):
+    ek60 = EK60.EK60()
+    # The first two files end more than TIME_BOUND_TOLERANCE before the
+    # start time.
+    ek60.read_raw(raw_files, start_time='2020-01-01 00:01:55')
+
+    assert ek60.read_stats.n_files_skipped == 2
+    assert ek60.read_stats.n_files == 1
@@ -0,0 +1,129 @@
+# coding=utf-8
+
+import struct
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+from echolab2.instruments.util.ek60_raw_file import (RawSimradFile,
+        RawSimradMmapFile)
+
+
+def _datagram_offsets(data):
+    offsets = []
+    offset = 0
+    while offset < len(data):
+        offsets.append(offset)
+        offset += struct.unpack('=l', data[offset:offset + 4])[0] + 8
+    return offsets
+
+
+@pytest.mark.parametrize('garbage', [b'\xff' * 3000,
+        b'\x00' * 50000, struct.pack('=l', 12345) * 100])
+def test_resync(raw_files, tmp_path, garbage):
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+
+    # Insert garbage between two datagrams in the middle of the file.
+    offsets = _datagram_offsets(data)
+    split = offsets[len(offsets) // 2]
+    filename = str(tmp_path / 'damaged.raw')
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(data[0:split] + garbage + data[split:])
+
+    reference = EK60.EK60()
+    reference.read_raw(raw_files[0])
+    ek60 = EK60.EK60()
+    ek60.read_raw(filename)
+
+    assert ek60.read_stats.corrupt > 0
+    assert ek60.nmea_data.n_raw == reference.nmea_data.n_raw
+    for channel_id in reference.channel_ids:
+        assert np.array_equal(ek60.raw_data[channel_id].ping_time,
+                reference.raw_data[channel_id].ping_time)
+        assert np.array_equal(ek60.raw_data[channel_id].get_power().data,
+                reference.raw_data[channel_id].get_power().data,
+                equal_nan=True)
+
+
+def _datagram_headers(data, offsets):
+    headers = []
+    for offset in offsets:
+        dgram_type, low_date, high_date = struct.unpack('=4sLL',
+                data[offset + 4:offset + 16])
+        headers.append((dgram_type.decode(), (high_date << 32) + low_date))
+    return headers
+
+
+@pytest.mark.parametrize('raw_file_class', [RawSimradFile,
+        RawSimradMmapFile])
+def test_seek_time(raw_files, monkeypatch, raw_file_class):
+    # Use a window much smaller than the file so the file is bisected.
+    monkeypatch.setattr(RawSimradFile, 'RESYNC_WINDOW', 1024)
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+    offsets = _datagram_offsets(data)
+    headers = _datagram_headers(data, offsets)
+
+    for target in [1, len(offsets) // 3, len(offsets) // 2, len(offsets) - 1]:
+        nt_time = headers[target][1]
+        with raw_file_class(raw_files[0], 'r') as fid:
+            fid.read(1)
+            fid.seek_time(nt_time)
+            position = fid._tell_bytes()
+
+            # The file is positioned at a datagram before the target and
+            # within the search window of it.
+            assert position in offsets
+            assert position <= offsets[target]
+            assert offsets[target] - position <= 2 * 1024
+            header = fid.peek()
+            assert ((header['high_date'] << 32) + header['low_date'] <
+                    nt_time or position == offsets[1])
+
+    # Times past the end of the file leave the file near its end.
+    with raw_file_class(raw_files[0], 'r') as fid:
+        fid.read(1)
+        fid.seek_time(headers[-1][1] + 1)
+        assert len(data) - fid._tell_bytes() <= 2 * 1024
+
+
+@pytest.mark.parametrize('raw_file_class', [RawSimradFile,
+        RawSimradMmapFile])
+def test_peek_tail(raw_files, tmp_path, raw_file_class):
+    with open(raw_files[0], 'rb') as raw_file:
+        data = raw_file.read()
+    offsets = _datagram_offsets(data)
+    headers = _datagram_headers(data, offsets)
+
+    with raw_file_class(raw_files[0], 'r') as fid:
+        fid.read(1)
+        position = fid._tell_bytes()
+        tail = fid.peek_tail(5)
+        assert [(header['type'], (header['high_date'] << 32) +
+                header['low_date']) for header in tail] == headers[:-6:-1]
+
+        # The file position is restored.
+        assert fid._tell_bytes() == position
+        assert fid.tell() == 1
+
+    # Damage the leading size of the third datagram from the end. Only the
+    # datagrams after it are returned.
+    damaged = bytearray(data)
+    damaged[offsets[-3]:offsets[-3] + 4] = struct.pack('=l', 12345)
+    filename = str(tmp_path / 'damaged.raw')
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(damaged)
+    with raw_file_class(filename, 'r') as fid:
+        tail = fid.peek_tail(5)
+        assert [(header['type'], (header['high_date'] << 32) +
+                header['low_date']) for header in tail] == headers[:-3:-1]
+        assert fid._tell_bytes() == 0
+
+    # A partially written last datagram.
+    filename = str(tmp_path / 'truncated.raw')
+    with open(filename, 'wb') as raw_file:
+        raw_file.write(data[:-10])
+    with raw_file_class(filename, 'r') as fid:
+        assert fid.peek_tail(5) == []
@@ -0,0 +1,68 @@
+# coding=utf-8
+
+"""
+Checks how the compact, packed and ragged storage options store the sample
+data. test_read_options checks that they return the same data.
+"""
+
+import numpy as np
+
+from echolab2.instruments import EK60
+
+
+def _read(raw_files, **kwargs):
+    reference = EK60.EK60()
+    reference.read_raw(raw_files)
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files, **kwargs)
+    return ek60, reference
+
+
+def test_compact_power(raw_files):
+    ek60, reference = _read(raw_files, compact_power=True)
+
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.power.dtype == np.int16
+        assert raw_data.power.nbytes * 2 == reference_data.power.nbytes
+        assert np.allclose(raw_data.get_Sv(start_ping=5, end_ping=25).data,
+                reference_data.get_Sv(start_ping=5, end_ping=25).data,
+                equal_nan=True, atol=1e-4)
+
+
+def test_packed_angles(raw_files):
+    ek60, reference = _read(raw_files, packed_angles=True)
+
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+        assert raw_data.angles_packed.dtype == np.uint16
+        assert not hasattr(raw_data, 'angles_alongship_e')
+        assert raw_data.angles_packed.nbytes * 4 == \
+                reference_data.angles_alongship_e.nbytes + \
+                reference_data.angles_athwartship_e.nbytes
+        for angles, reference_angles in zip(
+                raw_data.get_physical_angles(start_ping=5, end_ping=25),
+                reference_data.get_physical_angles(start_ping=5,
+                end_ping=25)):
+            assert np.array_equal(angles.data, reference_angles.data,
+                    equal_nan=True)
+
+
+def test_ragged(raw_files):
+    ek60, reference = _read(raw_files, ragged=True)
+
+    for channel_id in reference.channel_ids:
+        raw_data = ek60.raw_data[channel_id]
+        reference_data = reference.raw_data[channel_id]
+
+        # Only the samples of each ping are stored.
+        assert not hasattr(raw_data, 'power')
+        assert raw_data._sample_buffers['power'].shape[0] == \
+                np.sum(reference_data.sample_count)
+        assert np.array_equal(raw_data.buffer_count,
+                reference_data.sample_count)
+        assert np.array_equal(raw_data.get_power(start_ping=45).data,
+                reference_data.get_power(start_ping=45).data,
+                equal_nan=True)
@@ -0,0 +1,32 @@
+# coding=utf-8
+
+import numpy as np
+
+from echolab2.instruments import EK60
+
+
+def test_scan(raw_files):
+    ek60 = EK60.EK60()
+    file_info = ek60.scan(raw_files)
+
+    # Scanning doesn't read any data.
+    assert ek60.n_channels == 0
+    assert ek60.raw_data == {}
+
+    reference = EK60.EK60()
+    reference.read_raw(raw_files)
+    assert sorted(file_info) == sorted(raw_files)
+    for i, filename in enumerate(raw_files):
+        info = file_info[filename]
+        assert info['survey_name'] == 'survey'
+        assert info['nmea_types'] == ['GPGGA']
+        assert sorted(info['channels']) == sorted(reference.channel_ids)
+        for channel_id, channel_info in info['channels'].items():
+            ping_time = reference.raw_data[channel_id].ping_time[
+                    i * 20:(i + 1) * 20]
+            assert channel_info['n_pings'] == 20
+            assert channel_info['first_ping_time'] == ping_time[0]
+            assert channel_info['last_ping_time'] == ping_time[-1]
+            assert np.array_equal(channel_info['sample_counts'],
+                    np.unique(reference.raw_data[channel_id].sample_count[
+                    i * 20:(i + 1) * 20]))
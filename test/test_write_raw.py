@@ -0,0 +1,74 @@
+# coding=utf-8
+
+import numpy as np
+import pytest
+
+from echolab2.instruments import EK60
+
+
+@pytest.fixture(scope='module')
+def ek60(raw_files):
+    ek60 = EK60.EK60()
+    ek60.read_raw(raw_files)
+    return ek60
+
+
+def _assert_same_pings(written, ek60):
+    for channel_id, raw_data in written.raw_data.items():
+        reference_data = ek60.raw_data[channel_id]
+        pings = np.searchsorted(reference_data.ping_time, raw_data.ping_time)
+        assert np.array_equal(reference_data.ping_time[pings],
+                raw_data.ping_time)
+        assert np.array_equal(reference_data.sample_count[pings],
+                raw_data.sample_count)
+
+        # The written file is only as wide as its longest ping.
+        n_samples = raw_data.get_power().data.shape[1]
+        assert np.allclose(raw_data.get_power().data,
+                reference_data.get_power().data[pings, 0:n_samples],
+                equal_nan=True)
+        for angles, reference_angles in zip(
+                raw_data.get_electrical_angles(),
+                reference_data.get_electrical_angles()):
+            assert np.array_equal(angles.data,
+                    reference_angles.data[pings, 0:n_samples], equal_nan=True)
+
+
+def test_write_all(ek60, tmp_path):
+    filename = str(tmp_path / 'all.raw')
+    ek60.write_raw(filename)
+
+    written = EK60.EK60()
+    written.read_raw(filename)
+    assert written.channel_ids == ek60.channel_ids
+    assert written.nmea_data.n_raw == ek60.nmea_data.n_raw
+    for channel_id in ek60.channel_ids:
+        assert written.raw_data[channel_id].n_pings == \
+                ek60.raw_data[channel_id].n_pings
+    _assert_same_pings(written, ek60)
+
+
+def test_write_subset(ek60, tmp_path):
+    channel_id = ek60.channel_ids[1]
+    filename = str(tmp_path / 'subset.raw')
+    ek60.write_raw(filename, channel_ids=[channel_id],
+                   start_time='2020-01-01 00:00:35',
+                   end_time='2020-01-01 00:01:05')
+
+    written = EK60.EK60()
+    written.read_raw(filename)
+    assert written.channel_ids == [channel_id]
+    assert written.raw_data[channel_id].n_pings == 20
+    _assert_same_pings(written, ek60)
+
+    # The written file can be read like any other file.
+    reread = EK60.EK60()
+    reread.read_raw(filename, start_ping=5, end_ping=10)
+    assert np.array_equal(reread.raw_data[channel_id].ping_time,
+            written.raw_data[channel_id].ping_time[4:10])
+
+
+def test_write_empty_subset(ek60, tmp_path):
+    with pytest.raises(ValueError):
+        ek60.write_raw(str(tmp_path / 'empty.raw'),
+                       start_time='2021-01-01 00:00:00')